@@ -1,5 +1,6 @@
 from django.contrib import admin
-from . import models
+from django.db.models import Q, Sum
+from . import metrics, models
 
 # Brand the admin
 admin.site.site_header = "Eastern Technical University"
@@ -11,6 +12,7 @@ class ResultInline(admin.TabularInline):
 	model = models.Result
 	extra = 0
 	readonly_fields = ('recorded_at',)
+	autocomplete_fields = ('course',)
 
 
 @admin.register(models.Student)
@@ -21,6 +23,7 @@ class StudentAdmin(admin.ModelAdmin):
     ordering = ('-enrollment_date', 'student_id')
     date_hierarchy = 'enrollment_date'
     inlines = (ResultInline,)
+    autocomplete_fields = ('user',)
     
     fieldsets = (
         ('Basic Information', {
@@ -32,15 +35,14 @@ class StudentAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        # GPA is summed from the stored grade points in the list query itself
+        return super().get_queryset(request).with_gpa()
+
     def get_gpa(self, obj):
-        grades = obj.results.all()
-        if not grades:
-            return 'N/A'
-        grade_points = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
-        total_points = sum(grade_points.get(g.grade, 0) * g.course.credits for g in grades)
-        total_credits = sum(g.course.credits for g in grades)
-        return f"{total_points / total_credits:.2f}" if total_credits else 'N/A'
+        return f"{obj.gpa:.2f}" if obj.gpa is not None else 'N/A'
     get_gpa.short_description = 'GPA'
+    get_gpa.admin_order_field = 'gpa'
 
     actions = ['mark_inactive', 'export_as_csv']
     # Admin actions
@@ -50,6 +52,7 @@ class StudentAdmin(admin.ModelAdmin):
         queryset.update(is_active=False)
     mark_inactive.short_description = "Mark selected students as inactive"
     
+    @metrics.timed_export('admin_students_csv')
     def export_as_csv(self, request, queryset):
         import csv
         from django.http import HttpResponse
@@ -78,8 +81,7 @@ class StudentAdmin(admin.ModelAdmin):
         """Admin action: link Student.user to User by matching email (case-insensitive).
         Skips students with no email or ambiguous matches.
         """
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
+        from .identity import users_with_email
         matched = 0
         skipped = 0
         ambiguous = 0
@@ -90,14 +92,14 @@ class StudentAdmin(admin.ModelAdmin):
             if not student.email:
                 skipped += 1
                 continue
-            try:
-                user = User.objects.get(email__iexact=student.email)
-            except User.DoesNotExist:
+            users = list(users_with_email(student.email)[:2])
+            if not users:
                 skipped += 1
                 continue
-            except User.MultipleObjectsReturned:
+            if len(users) > 1:
                 ambiguous += 1
                 continue
+            user = users[0]
             student.user = user
             student.save()
             matched += 1
@@ -107,26 +109,48 @@ class StudentAdmin(admin.ModelAdmin):
 
 @admin.register(models.Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name', 'credits', 'get_enrolled_count')
+    list_display = ('code', 'name', 'credits', 'get_enrolled_count', 'get_pass_rate')
     list_filter = ('credits',)
     search_fields = ('code', 'name')
     ordering = ('code',)
+
+    def get_queryset(self, request):
+        # Graded/passed totals come from the grade-distribution cube, not Result
+        return super().get_queryset(request).annotate(
+            graded_total=Sum('grade_distribution__count'),
+            passed_total=Sum('grade_distribution__count', filter=~Q(grade_distribution__grade__in=models.FAILING_GRADES)),
+        )
     
     def get_enrolled_count(self, obj):
-        return obj.results.count()
+        return obj.graded_total or 0
     get_enrolled_count.short_description = 'Enrolled Students'
 
+    def get_pass_rate(self, obj):
+        if not obj.graded_total:
+            return 'N/A'
+        return f"{100 * (obj.passed_total or 0) / obj.graded_total:.1f}%"
+    get_pass_rate.short_description = 'Pass Rate'
+
+
+@admin.register(models.Term)
+class TermAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'ordinal', 'start_date', 'end_date')
+    search_fields = ('code', 'name')
+    ordering = ('-ordinal', 'code')
+
 
 @admin.register(models.Result)
 class ResultAdmin(admin.ModelAdmin):
-    list_display = ('student', 'course', 'grade', 'semester', 'recorded_at', 'get_grade_status')
-    list_filter = ('grade', 'semester', 'course', 'recorded_at')
+    list_display = ('student', 'course', 'grade', 'term', 'recorded_at', 'get_grade_status')
+    list_filter = ('grade', 'term', 'course', 'recorded_at')
     search_fields = ('student__student_id', 'student__first_name', 'student__last_name', 'course__code')
     date_hierarchy = 'recorded_at'
+    autocomplete_fields = ('student', 'course')
+    readonly_fields = ('recorded_at',)
     
     fieldsets = (
         ('Result Information', {
-            'fields': ('student', 'course', 'grade', 'semester')
+            'fields': ('student', 'course', 'grade', 'term')
         }),
         ('Additional Information', {
             'fields': ('remarks', 'recorded_at'),
@@ -142,8 +166,9 @@ class ResultAdmin(admin.ModelAdmin):
         return '✗ Fail'
     get_grade_status.short_description = 'Status'
     
-    actions = ['export_results', 'recalculate_gpas']
+    actions = ['export_results', 'recalculate_standing']
     
+    @metrics.timed_export('admin_results_csv')
     def export_results(self, request, queryset):
         import csv
         from django.http import HttpResponse
@@ -156,7 +181,7 @@ class ResultAdmin(admin.ModelAdmin):
 
         writer = csv.DictWriter(response, fieldnames=fieldnames)
         writer.writeheader()
-        for r in queryset.select_related('student', 'course'):
+        for r in queryset.select_related('student', 'course', 'term'):
             writer.writerow({
                 'student_id': r.student.student_id,
                 'student_name': f"{r.student.first_name} {r.student.last_name}",
@@ -170,10 +195,38 @@ class ResultAdmin(admin.ModelAdmin):
         return response
     export_results.short_description = "Export selected results"
     
-    def recalculate_gpas(self, request, queryset):
-        students = set(result.student for result in queryset)
-        for student in students:
-            # GPA calculation will be triggered on save
-            student.save()
-        self.message_user(request, f"Recalculated GPAs for {len(students)} students")
-    recalculate_gpas.short_description = "Recalculate GPAs"
+    def recalculate_standing(self, request, queryset):
+        from .standing import evaluate_term
+        pairs = queryset.filter(term__isnull=False).values_list('term_id', 'student_id').distinct().order_by()
+        terms = {}
+        for term_id, student_id in pairs:
+            terms.setdefault(term_id, set()).add(student_id)
+        evaluated = sum(
+            evaluate_term(term, workers=1, students=models.Student.objects.filter(pk__in=terms[term.pk]))
+            for term in models.Term.objects.filter(pk__in=terms)
+        )
+        self.message_user(request, f"Recalculated academic standing for {evaluated} student-terms")
+    recalculate_standing.short_description = "Recalculate academic standing"
+
+
+@admin.register(models.Publication)
+class PublicationAdmin(admin.ModelAdmin):
+    list_display = ('course', 'term', 'is_published', 'published_at', 'published_by', 'created_at')
+    list_filter = ('term', 'published_at')
+    search_fields = ('course__code', 'course__name', 'term__code')
+    autocomplete_fields = ('course',)
+    readonly_fields = ('published_at', 'published_by', 'created_at')
+    list_select_related = ('course', 'term', 'published_by')
+
+    def is_published(self, obj):
+        return obj.is_published
+    is_published.boolean = True
+    is_published.short_description = 'Published'
+
+    actions = ['publish_selected']
+
+    def publish_selected(self, request, queryset):
+        from .publication import publish
+        students = publish(queryset.filter(published_at__isnull=True), user=request.user)
+        self.message_user(request, f"Published results for {len(students)} students")
+    publish_selected.short_description = "Publish selected results"
@@ -0,0 +1,108 @@
+"""Grade-distribution queries answered from the GradeDistribution cube."""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    FAILING_GRADES, GRADE_POINTS, GradeDistribution, Publication, Result, Student, canonical_term_code,
+)
+
+COHORT_FIELDS = ('program', 'department', 'faculty')
+GRADE_ORDER = [code for code, _ in Result.GRADE_CHOICES]
+
+
+def student_cohort(student_id):
+    """Return the (program, department, faculty) cell coordinates for a student."""
+    row = Student.objects.filter(pk=student_id).values_list(*COHORT_FIELDS).first()
+    return tuple(value or '' for value in row) if row else ('', '', '')
+
+
+def student_cohorts(student_ids):
+    """Bulk version of ``student_cohort`` returning ``{student_id: cohort}``."""
+    rows = Student.objects.filter(pk__in=set(student_ids)).values_list('pk', *COHORT_FIELDS)
+    return {pk: tuple(value or '' for value in cohort) for pk, *cohort in rows}
+
+
+def adjust_cell(course_id, term_id, grade, cohort, delta):
+    """Add ``delta`` to one cube cell, creating it on first use."""
+    key = dict(course_id=course_id, term_id=term_id, grade=grade, **dict(zip(COHORT_FIELDS, cohort)))
+    if GradeDistribution.objects.filter(**key).update(count=F('count') + delta) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            GradeDistribution.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Someone else created the cell between our UPDATE and INSERT
+        GradeDistribution.objects.filter(**key).update(count=F('count') + delta)
+
+
+def rebuild_grade_distribution(batch_size=1000):
+    """Recompute the whole cube from Result and return the number of cells."""
+    rows = (
+        Result.objects
+        .values('course_id', 'term_id', 'grade')
+        .annotate(
+            cohort_program=Coalesce('student__program', Value('')),
+            cohort_department=Coalesce('student__department', Value('')),
+            cohort_faculty=Coalesce('student__faculty', Value('')),
+        )
+        .values('course_id', 'term_id', 'grade', 'cohort_program', 'cohort_department', 'cohort_faculty')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    cells = [
+        GradeDistribution(
+            course_id=row['course_id'], term_id=row['term_id'], grade=row['grade'],
+            program=row['cohort_program'], department=row['cohort_department'],
+            faculty=row['cohort_faculty'], count=row['n'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        GradeDistribution.objects.all().delete()
+        GradeDistribution.objects.bulk_create(cells, batch_size=batch_size)
+    return len(cells)
+
+
+def summarize(counts):
+    """Turn ``{grade: count}`` into histogram, pass rate and mean grade points."""
+    histogram = {grade: counts.get(grade, 0) for grade in GRADE_ORDER}
+    total = sum(histogram.values())
+    passed = sum(n for grade, n in histogram.items() if grade not in FAILING_GRADES)
+    points = sum(GRADE_POINTS[grade] * n for grade, n in histogram.items())
+    return {
+        'histogram': histogram,
+        'total': total,
+        'passed': passed,
+        'pass_rate': round(passed / total, 4) if total else None,
+        'mean_grade_points': round(points / total, 2) if total else None,
+    }
+
+
+def _cells(semester=None, published_only=False, **cohort):
+    qs = GradeDistribution.objects.filter(count__gt=0)
+    if published_only:
+        # The cube counts drafts too; drop the cells of (course, term) pairs held as drafts
+        qs = qs.exclude(Exists(Publication.objects.filter(
+            course=OuterRef('course'), term=OuterRef('term'), published_at__isnull=True,
+        )))
+    if semester is not None:
+        qs = qs.filter(term__code=canonical_term_code(semester))
+    return qs.filter(**{field: value for field, value in cohort.items() if field in COHORT_FIELDS})
+
+
+def course_stats(course_id, semester=None, published_only=False, **cohort):
+    """Grade statistics for one course, optionally narrowed to a semester/cohort or to published results."""
+    rows = _cells(semester, published_only, **cohort).filter(course_id=course_id).values('grade').annotate(n=Sum('count'))
+    stats = summarize({row['grade']: row['n'] for row in rows})
+    stats.update(course=course_id, semester=semester, **{f: cohort.get(f) for f in COHORT_FIELDS})
+    return stats
+
+
+def stats_for_courses(course_ids, semester=None):
+    """Grade statistics for several courses in a single query, keyed by course id."""
+    counts = {course_id: {} for course_id in course_ids}
+    rows = _cells(semester).filter(course_id__in=course_ids).values('course_id', 'grade').annotate(n=Sum('count'))
+    for row in rows:
+        counts[row['course_id']][row['grade']] = row['n']
+    return {course_id: summarize(grades) for course_id, grades in counts.items()}
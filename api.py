@@ -1,22 +1,203 @@
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets
 from rest_framework import filters
-from .models import Student, Course, Result
-from .serializers import StudentSerializer, CourseSerializer, ResultSerializer
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from . import analytics, api_cache, changefeed, publication
+from .models import CohortRank, Student, Course, Result, canonical_term_code
+from .renderers import NDJSONRenderer, ORJSONRenderer
+from .serializers import CohortRankSerializer, FastListSerializer, StudentSerializer, CourseSerializer, ResultSerializer
 
-class StudentViewSet(viewsets.ModelViewSet):
+
+class FastListMixin:
+    """Serve list requests from ``values_list()`` rows via FastListSerializer.
+
+    With the NDJSON renderer the whole filtered queryset is streamed one row
+    per line instead of being paginated.
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer, NDJSONRenderer]
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        fast = FastListSerializer.for_class(self.get_serializer_class())
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        if isinstance(request.accepted_renderer, NDJSONRenderer):
+            stream = NDJSONRenderer.lines(fast.iter_rows(rows.iterator(chunk_size=self.stream_chunk_size)))
+            return StreamingHttpResponse(stream, content_type=NDJSONRenderer.media_type)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.data(page))
+        return Response(fast.data(rows))
+
+
+class CachedResponseMixin:
+    """Answer repeated GETs from the API response cache (see ``api_cache``).
+
+    View-level permission checks run on every request, before the cache is
+    consulted. On a detail route a cache hit still loads the object through
+    ``get_object()`` whenever a permission class defines object-level
+    checks, so those run too; only building the data is skipped.
+    ``cache_tags`` names the surrogate keys a response depends on, and
+    ``cache_variant`` anything else about the user that changes the data.
+    """
+
+    def _checks_objects(self):
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def cached(self, request, build, *args, **kwargs):
+        if not api_cache.timeout():
+            return build(request, *args, **kwargs)
+        key = api_cache.cache_key(request, self.cache_variant(request))
+        entry = api_cache.lookup(key)
+        if entry is not None:
+            if (self.lookup_url_kwarg or self.lookup_field) in self.kwargs and self._checks_objects():
+                self.get_object()  # raises NotFound / PermissionDenied
+            response = Response(entry[0], status=entry[1])
+            response['X-Cache'] = 'HIT'
+            return response
+        response = build(request, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response, Response):
+            api_cache.store(key, response.data, response.status_code, self.cache_tags(request, response.data))
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def cache_tags(self, request, data):
+        """Surrogate keys of the response. Untagged entries only expire with the timeout."""
+        return []
+
+    def cache_variant(self, request):
+        return ''
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, super().retrieve, *args, **kwargs)
+
+
+class StudentViewSet(CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all().order_by('student_id')
     serializer_class = StudentSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['student_id', 'first_name', 'last_name', 'email']
 
-class CourseViewSet(viewsets.ModelViewSet):
+    def cache_tags(self, request, data):
+        return [f"student:{self.kwargs['pk']}"] if 'pk' in self.kwargs else ['students']
+
+    @action(detail=True, methods=['get'])
+    def rank(self, request, pk=None):
+        """Precomputed GPA rank and percentile within program, department and faculty."""
+        student = self.get_object()
+        try:
+            cohort_rank = CohortRank.objects.get(student=student)
+        except CohortRank.DoesNotExist:
+            raise NotFound('This student has no ranked results yet.')
+        return Response(CohortRankSerializer(cohort_rank).data)
+
+class CourseViewSet(CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all().order_by('code')
     serializer_class = CourseSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['code', 'name']
 
-class ResultViewSet(viewsets.ModelViewSet):
-    queryset = Result.objects.all().select_related('student', 'course').order_by('-recorded_at')
+    def cache_tags(self, request, data):
+        if 'pk' not in self.kwargs:
+            return ['courses']
+        tags = [f"course:{self.kwargs['pk']}"]
+        if self.action == 'stats':
+            semester = request.query_params.get('semester')
+            if semester:
+                tags.append(f'results:semester:{canonical_term_code(semester)}')
+            else:
+                tags.append(f"results:course:{self.kwargs['pk']}")
+            if any(field in request.query_params for field in analytics.COHORT_FIELDS):
+                tags.append('students')  # a student changing cohort moves their results between cells
+        return tags
+
+    def cache_variant(self, request):
+        return 'drafts' if publication.sees_drafts(request.user) else 'published'
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Grade histogram, pass rate and mean, filterable by semester and cohort."""
+        return self.cached(request, self._stats)
+
+    def _stats(self, request):
+        course = self.get_object()
+        params = request.query_params
+        cohort = {field: params[field] for field in analytics.COHORT_FIELDS if field in params}
+        return Response(analytics.course_stats(
+            course.pk, semester=params.get('semester'),
+            published_only=not publication.sees_drafts(request.user), **cohort,
+        ))
+
+class ResultViewSet(CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Result.objects.all().select_related('student', 'course', 'term').order_by('-recorded_at')
     serializer_class = ResultSerializer
     filter_backends = [filters.SearchFilter]
-    search_fields = ['student__student_id', 'course__code', 'grade', 'semester']
\ No newline at end of file
+    search_fields = ['student__student_id', 'course__code', 'grade', 'term__code', 'term__name']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        semester = self.request.query_params.get('semester')
+        if semester and self.action == 'list':
+            queryset = queryset.filter(term__code=canonical_term_code(semester))
+        if not publication.sees_drafts(self.request.user):
+            queryset = queryset.published()
+        return queryset
+
+    def cache_tags(self, request, data):
+        # Rows embed their student and course, so edits to those expire result pages too
+        if 'pk' in self.kwargs:
+            return [f"result:{self.kwargs['pk']}", f"student:{data['student']['id']}", f"course:{data['course']['id']}"]
+        semester = request.query_params.get('semester')
+        scope = f'results:semester:{canonical_term_code(semester)}' if semester else 'results'
+        return [scope, 'students', 'courses']
+
+    def cache_variant(self, request):
+        return 'drafts' if publication.sees_drafts(request.user) else 'published'
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Result, student and course changes after the ``since`` cursor, oldest first."""
+        params = request.query_params
+        try:
+            cursor = int(params.get('since', 0))
+            limit = int(params.get('limit', 100))
+        except ValueError:
+            raise ValidationError('since and limit must be integers')
+        models = [name for name in params.get('models', '').split(',') if name]
+        unknown = set(models) - set(changefeed.FEED_MODELS)
+        if unknown:
+            raise ValidationError(f"Unknown models: {', '.join(sorted(unknown))}")
+
+        entries, objects, next_cursor, has_more = changefeed.changes_since(
+            cursor, limit, models, published_only=not publication.sees_drafts(request.user),
+        )
+        serializer_classes = {'result': ResultSerializer, 'student': StudentSerializer, 'course': CourseSerializer}
+        results = []
+        for entry in entries:
+            obj = objects.get(entry.model, {}).get(entry.object_id)
+            results.append({
+                'cursor': entry.pk,
+                'model': entry.model,
+                'id': entry.object_id,
+                'action': entry.action,
+                'changed_at': entry.changed_at,
+                'data': serializer_classes[entry.model](obj).data if obj is not None else None,
+            })
+        return Response({'results': results, 'next_cursor': next_cursor, 'has_more': has_more})
+
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Hit and miss counters of the API response cache."""
+    return Response(api_cache.stats())
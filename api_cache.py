@@ -0,0 +1,99 @@
+"""Server-side cache for read-only API responses with surrogate-key invalidation.
+
+A cached GET stores the response data together with the surrogate keys
+("tags") it was built from, such as ``course:5``, ``students`` or
+``results:semester:2025-2``, and the current version of each. A tag is
+invalidated by bumping its version (see ``cache_versions``), so an entry is
+served only while every one of its tags still has the version it was stored
+with; nothing has to find and delete entries. Signal handlers invalidate the
+tags a write touches once the transaction commits.
+
+Entries are keyed by host, path, normalized query string, accepted media
+type and the requester's permission scope. Enable with
+``ETU_API_CACHE_TIMEOUT`` (seconds, default 0 = off).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+from .cache_versions import bump_version, get_versions
+
+HITS_KEY = 'etu:api:hits'
+MISSES_KEY = 'etu:api:misses'
+
+
+def timeout():
+    return getattr(settings, 'ETU_API_CACHE_TIMEOUT', 0)
+
+
+def permission_scope(user):
+    """Requests with the same scope may share cached responses."""
+    if not user or not user.is_authenticated:
+        return 'anon'
+    if user.is_superuser:
+        return 'superuser'
+    permissions = ','.join(sorted(user.get_all_permissions()))
+    return hashlib.sha1(f'{user.is_staff}:{permissions}'.encode()).hexdigest()[:16]
+
+
+def cache_key(request, variant=''):
+    query = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    media_type = getattr(request, 'accepted_media_type', '')
+    raw = f'{request.get_host()}{request.path}?{query}|{media_type}|{permission_scope(request.user)}|{variant}'
+    return 'etu:api:response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _count(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def lookup(key):
+    """``(data, status)`` stored under ``key`` if all its tags are current, else None."""
+    entry = cache.get(key)
+    if entry is not None and get_versions('api', entry['tags']) == entry['tags']:
+        _count(HITS_KEY)
+        metrics.record_cache('api', True)
+        return entry['data'], entry['status']
+    _count(MISSES_KEY)
+    metrics.record_cache('api', False)
+    return None
+
+
+def store(key, data, status, tags):
+    cache.set(key, {
+        'data': data,
+        'status': status,
+        'tags': get_versions('api', sorted(set(tags))),
+    }, timeout())
+
+
+def invalidate(*tags):
+    """Expire every entry tagged with any of ``tags`` once the current transaction commits."""
+    tags = set(tags)
+    if tags:
+        transaction.on_commit(lambda: [bump_version('api', tag) for tag in tags])
+
+
+def stats():
+    hits, misses = cache.get(HITS_KEY, 0), cache.get(MISSES_KEY, 0)
+    return {
+        'enabled': bool(timeout()),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def result_tags(result_id, course_id, term_code):
+    """Tags of the cached responses a change to one result can affect."""
+    tags = {'results', f'result:{result_id}', f'results:course:{course_id}'}
+    if term_code:
+        tags.add(f'results:semester:{term_code}')
+    return tags
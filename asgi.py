@@ -0,0 +1,12 @@
+"""ASGI entry point, e.g. ``uvicorn eturesultapp.asgi:application``.
+
+The async dashboards and API lists in ``async_views`` only overlap their
+queries when served through this (or another ASGI) application.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ETU_Ruslts.settings')
+
+application = get_asgi_application()
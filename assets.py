@@ -0,0 +1,64 @@
+"""Third-party CSS/JS that the templates used to load from public CDNs.
+
+``python manage.py build_assets`` downloads the pinned files below into
+``static/eturesultapp/vendor/`` and then runs collectstatic. Templates refer
+to them by name with ``{% asset "bootstrap.css" %}``, which resolves to the
+(fingerprinted) static URL once the file has been vendored and falls back to
+the CDN URL on a fresh checkout. Set ``ETU_SELF_HOST_ASSETS = False`` to
+always use the CDN.
+"""
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.templatetags.static import static
+
+VENDOR_DIR = Path(__file__).resolve().parent / 'static' / 'eturesultapp' / 'vendor'
+VENDOR_PREFIX = 'eturesultapp/vendor/'
+
+JSDELIVR = 'https://cdn.jsdelivr.net/npm/'
+CDNJS = 'https://cdnjs.cloudflare.com/ajax/libs/'
+FONTAWESOME = CDNJS + 'font-awesome/6.4.0/'
+
+# Template name -> (CDN url, path under VENDOR_DIR)
+VENDOR_ASSETS = {
+    'bootstrap.css': (JSDELIVR + 'bootstrap@5.1.3/dist/css/bootstrap.min.css', 'bootstrap-5.1.3/bootstrap.min.css'),
+    'bootstrap.js': (JSDELIVR + 'bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js', 'bootstrap-5.1.3/bootstrap.bundle.min.js'),
+    'bootstrap-5.3.css': (JSDELIVR + 'bootstrap@5.3.2/dist/css/bootstrap.min.css', 'bootstrap-5.3.2/bootstrap.min.css'),
+    'bootstrap-5.3.js': (JSDELIVR + 'bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js', 'bootstrap-5.3.2/bootstrap.bundle.min.js'),
+    'fontawesome.css': (FONTAWESOME + 'css/all.min.css', 'fontawesome-6.4.0/css/all.min.css'),
+    'chart.js': (JSDELIVR + 'chart.js@3.9.1/dist/chart.min.js', 'chart.js-3.9.1/chart.min.js'),
+}
+
+# Files referenced from vendored CSS (Font Awesome loads ../webfonts/*).
+VENDOR_SUPPORT_FILES = [
+    (FONTAWESOME + f'webfonts/{font}.{ext}', f'fontawesome-6.4.0/webfonts/{font}.{ext}')
+    for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+    for ext in ('woff2', 'ttf')
+]
+
+# ManifestStaticFilesStorage fails on source maps we do not ship.
+_SOURCE_MAP = re.compile(rb'\n?/[/*][#@] sourceMappingURL=[^\n*]*(\*/)?')
+
+
+def vendor_files():
+    """Every ``(url, relative_path)`` pair ``build_assets`` needs to fetch."""
+    return list(VENDOR_ASSETS.values()) + VENDOR_SUPPORT_FILES
+
+
+def strip_source_map(content):
+    return _SOURCE_MAP.sub(b'', content)
+
+
+@lru_cache(maxsize=None)
+def is_vendored(path):
+    return (VENDOR_DIR / path).is_file()
+
+
+def asset_url(name):
+    """URL for a vendored asset, or its CDN URL if it has not been fetched."""
+    cdn_url, path = VENDOR_ASSETS[name]
+    if getattr(settings, 'ETU_SELF_HOST_ASSETS', True) and is_vendored(path):
+        return static(VENDOR_PREFIX + path)
+    return cdn_url
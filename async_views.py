@@ -0,0 +1,188 @@
+"""Async dashboards and read-only API lists for ASGI deployments.
+
+Django's async ORM methods (``acount()``, ``aget()`` ...) all run on the
+single thread-sensitive executor, so ``asyncio.gather`` over them still
+issues the queries one after another. ``gather`` below instead runs each
+independent query on its own worker thread, with that thread's own database
+connection, and returns once all of them have finished. Inside a
+transaction (``ATOMIC_REQUESTS``, tests) it falls back to running them in
+order on the request's connection so uncommitted rows stay visible.
+
+``result_events`` streams result notifications to student dashboards (see
+``push``); it only works under ASGI.
+
+Serve with ``uvicorn eturesultapp.asgi:application`` (or daphne/hypercorn).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import analytics, identity, models, push
+from .api import CourseViewSet, ResultViewSet, StudentViewSet
+from .serializers import FastListSerializer
+from .views import get_current_semester
+
+
+def _in_transaction():
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def _run_query(query):
+    try:
+        return query()
+    finally:
+        # Worker threads outlive the request; honour CONN_MAX_AGE like request_finished does.
+        close_old_connections()
+
+
+async def gather(**queries):
+    """Run zero-argument query callables concurrently and return ``{name: result}``."""
+    if await sync_to_async(_in_transaction)():
+        return await sync_to_async(lambda: {name: query() for name, query in queries.items()})()
+    results = await asyncio.gather(*(
+        sync_to_async(_run_query, thread_sensitive=False)(query) for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+_render = sync_to_async(render)
+
+
+@login_required
+async def dashboard(request):
+    """Async counterpart of ``views.DashboardView``; the template only renders the totals."""
+    context = await gather(
+        total_students=models.Student.objects.filter(is_active=True).count,
+        total_courses=models.Course.objects.count,
+        total_results=models.Result.objects.count,
+    )
+    context.update(current_semester=get_current_semester(), show_sidebar=True)
+    return await _render(request, 'eturesultapp/dashboard.html', context)
+
+
+async def admin_dashboard(request):
+    """Async counterpart of ``views.admin_dashboard_view``."""
+    user = await request.auser()
+    if not user.is_superuser:
+        return redirect('eturesultapp:dashboard')
+    context = await gather(
+        total_students=models.Student.objects.count,
+        total_courses=models.Course.objects.filter(is_active=True).count,
+        total_lecturers=models.Lecturer.objects.count,
+        total_results=models.Result.objects.count,
+        recent_results=lambda: list(
+            models.Result.objects.select_related('student', 'course').order_by('-recorded_at')[:5]
+        ),
+    )
+    return await _render(request, 'eturesultapp/admin_dashboard.html', context)
+
+
+def _lecturer_course_stats(lecturer):
+    courses = list(lecturer.courses.all())
+    grade_stats = analytics.stats_for_courses([course.pk for course in courses])
+    return [(course, grade_stats[course.pk]) for course in courses]
+
+
+async def lecturer_dashboard(request):
+    """Async counterpart of ``views.lecturer_dashboard_view``."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect('eturesultapp:dashboard')
+    try:
+        lecturer = await models.Lecturer.objects.aget(user=user)
+    except models.Lecturer.DoesNotExist:
+        return redirect('eturesultapp:dashboard')
+    context = await gather(
+        total_students=models.Student.objects.count,
+        total_courses=models.Course.objects.filter(is_active=True).count,
+        course_stats=lambda: _lecturer_course_stats(lecturer),
+    )
+    context['lecturer'] = lecturer
+    context['total_results'] = sum(stats['total'] for _, stats in context['course_stats'])
+    return await _render(request, 'eturesultapp/lecturer_dashboard.html', context)
+
+
+def _release_connections():
+    # A stream stays open for hours; don't keep this request's connections meanwhile.
+    if not _in_transaction():
+        connections.close_all()
+
+
+async def result_events(request):
+    """Server-sent events telling a student's dashboard that their results changed."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be tied up for the life of the stream; 204 tells EventSource not to reconnect.
+        return HttpResponse(status=204)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=403)
+    student = (await gather(student=lambda: identity.student_for_user(user)))['student']
+    await sync_to_async(_release_connections)()
+    if student is None:
+        return HttpResponse(status=404)
+    response = StreamingHttpResponse(push.result_events(student.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _search(queryset, fields, search):
+    """Same matching as DRF's SearchFilter: every term must hit some field."""
+    for term in search.replace(',', ' ').split():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def _list_view(viewset):
+    """Build an async, paginated, read-only list view mirroring a DRF viewset's list."""
+    async def view(request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+        queryset = _search(viewset.queryset.all(), viewset.search_fields, request.GET.get('search', ''))
+        fast = FastListSerializer.for_class(viewset.serializer_class)
+        page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+        try:
+            page_number = int(request.GET.get('page', 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            return JsonResponse({'detail': 'Invalid page.'}, status=404)
+        offset = (page_number - 1) * page_size
+        # The count and the page rows are independent, so fetch them together.
+        data = await gather(
+            count=queryset.count,
+            rows=lambda: fast.data(fast.values(queryset)[offset:offset + page_size]),
+        )
+        count = data['count']
+        if page_number > 1 and offset >= count:
+            return JsonResponse({'detail': 'Invalid page.'}, status=404)
+        url = request.build_absolute_uri()
+        previous = None
+        if page_number > 1:
+            previous = replace_query_param(url, 'page', page_number - 1) if page_number > 2 else remove_query_param(url, 'page')
+        return JsonResponse({
+            'count': count,
+            'next': replace_query_param(url, 'page', page_number + 1) if offset + page_size < count else None,
+            'previous': previous,
+            'results': data['rows'],
+        })
+    view.__name__ = f'async_{viewset.queryset.model._meta.model_name}_list'
+    view.__doc__ = f'Async read-only list of {viewset.queryset.model._meta.verbose_name_plural}.'
+    return view
+
+
+student_list = _list_view(StudentViewSet)
+course_list = _list_view(CourseViewSet)
+result_list = _list_view(ResultViewSet)
@@ -0,0 +1,34 @@
+"""Authentication backend that keeps users' permission sets in the shared cache.
+
+Django's ModelBackend reloads a user's group and direct permissions from the
+auth tables on every request that checks one. Roles (``create_roles``,
+``create_lecturer``) rarely change, so CachedPermissionBackend stores each
+user's effective permission set in the cache under the ``user:<pk>`` and
+``permissions`` data versions. Signal handlers bump the first when the
+user, their groups or their direct permissions change and the second when
+any group's permissions, a group or a permission is changed or deleted::
+
+    AUTHENTICATION_BACKENDS = ['eturesultapp.backends.CachedPermissionBackend']
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from . import metrics
+from .cache_versions import get_version
+
+
+class CachedPermissionBackend(ModelBackend):
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            key = f"etu:perms:{user_obj.pk}:{get_version('user', user_obj.pk)}:{get_version('permissions')}"
+            permissions = cache.get(key)
+            metrics.record_cache('permissions', permissions is not None)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                cache.set(key, permissions, getattr(settings, 'ETU_PERMISSION_CACHE_TIMEOUT', 3600))
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
@@ -0,0 +1,339 @@
+"""Streaming backup and restore of the results data.
+
+``dumpdata``/``loaddata`` build one JSON document in memory and restore it
+row by row through ``save()`` and its signals. ``backup`` instead writes one
+gzip-compressed JSON Lines file per table, with one JSON array of column
+values per row. It reads each table in primary-key chunks, and several
+tables are dumped at once on worker threads, each with its own connection.
+A ``manifest.json`` records every file's columns, row count and SHA-256.
+
+``restore`` checks the manifest against the files and the current schema
+first. It then loads the tables in foreign-key order with ``bulk_create``
+in a single transaction, keeping the stored primary keys and timestamps.
+Afterwards it rebuilds the derived grade cube and cohort ranks and clears
+the cache. The backup covers Term, the User rows linked to students and
+lecturers with their group memberships and direct permissions, Student,
+Course, Publication, Lecturer, the lecturer/course table and Result.
+Standing, the change log and the mail outbox are not included.
+
+Groups and permissions themselves are not restored; the manifest records
+their names and a restore maps memberships onto the groups and permissions
+of the same name in the target database (``create_roles`` makes them).
+Membership rows get new keys, since the rows of users outside the backup
+keep theirs. ``published_by`` is cleared when that user is not there.
+
+Threads read in parallel without a shared snapshot, so take backups from a
+read replica (``--database replica``) or when no results are being entered.
+"""
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import metrics
+from .analytics import rebuild_grade_distribution
+from .models import (
+    AcademicStanding, CohortRank, Course, GradeDistribution, Lecturer, Publication, Result, Student, Term,
+)
+from .ranking import refresh_cohort_ranks
+
+FORMAT = 2
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 5000
+# Tables whose rows may also belong to users outside the backup
+USER_TABLES = ('user', 'user_groups', 'user_permissions')
+
+
+class BackupError(Exception):
+    pass
+
+
+def tables():
+    """``[(label, model, queryset filter)]`` in foreign-key (restore) order."""
+    User = get_user_model()
+    people = Q(student__isnull=False) | Q(lecturer__isnull=False)
+    return [
+        ('term', Term, Q()),
+        ('user', User, people),
+        ('user_groups', User.groups.through, Q(user__in=User.objects.filter(people))),
+        ('user_permissions', User.user_permissions.through, Q(user__in=User.objects.filter(people))),
+        ('course', Course, Q()),
+        ('publication', Publication, Q()),
+        ('student', Student, Q()),
+        ('lecturer', Lecturer, Q()),
+        ('lecturer_courses', Lecturer.courses.through, Q()),
+        ('result', Result, Q()),
+    ]
+
+
+def columns(model):
+    """Stored columns of ``model``; generated columns are recomputed by the database."""
+    return [field for field in model._meta.concrete_fields if not field.generated]
+
+
+def _dump(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dump_table(label, model, condition, directory, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE):
+    """Write one table to ``<label>.jsonl.gz`` and return its manifest entry."""
+    fields = columns(model)
+    attnames = [field.attname for field in fields]
+    pk_index = attnames.index(model._meta.pk.attname)
+    path = os.path.join(directory, f'{label}.jsonl.gz')
+    queryset = model._base_manager.using(using).filter(condition).order_by('pk').values_list(*attnames)
+    rows, last = 0, None
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as out:
+        while True:
+            chunk = queryset.filter(pk__gt=last) if last is not None else queryset
+            chunk = list(chunk[:chunk_size])
+            for row in chunk:
+                out.write(json.dumps([_dump(value) for value in row], separators=(',', ':')))
+                out.write('\n')
+            rows += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+            last = chunk[-1][pk_index]
+    return {
+        'file': os.path.basename(path),
+        'columns': attnames,
+        'rows': rows,
+        'sha256': _sha256(path),
+    }
+
+
+def _dump_in_thread(job):
+    try:
+        return dump_table(*job)
+    finally:
+        connections.close_all()  # this worker thread's connections only
+
+
+@metrics.timed_export('backup')
+def backup(directory, using=DEFAULT_DB_ALIAS, workers=4, chunk_size=CHUNK_SIZE):
+    """Dump every table into ``directory`` and return the manifest written."""
+    os.makedirs(directory, exist_ok=True)
+    jobs = [(label, model, condition, directory, using, chunk_size) for label, model, condition in tables()]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(_dump_in_thread, jobs))
+    else:
+        entries = [dump_table(*job) for job in jobs]
+    manifest = {
+        'format': FORMAT,
+        'created_at': timezone.now().isoformat(),
+        'tables': {label: entry for (label, *_), entry in zip(jobs, entries)},
+        'groups': dict(Group.objects.using(using).values_list('pk', 'name')),
+        'permissions': {
+            pk: f'{app_label}.{codename}' for pk, app_label, codename in
+            Permission.objects.using(using).values_list('pk', 'content_type__app_label', 'codename')
+        },
+    }
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(directory):
+    """Load the manifest and check it against the files and the current schema."""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as exc:
+        raise BackupError(f'Cannot read {MANIFEST} in {directory}: {exc}')
+    if manifest.get('format') != FORMAT:
+        raise BackupError(f"Unsupported backup format {manifest.get('format')!r}")
+    for label, model, _ in tables():
+        entry = manifest['tables'].get(label)
+        if entry is None:
+            raise BackupError(f'The backup has no {label} table')
+        expected = [field.attname for field in columns(model)]
+        if entry['columns'] != expected:
+            raise BackupError(
+                f'{label} was backed up with columns {entry["columns"]}, the current schema has {expected}'
+            )
+        path = os.path.join(directory, entry['file'])
+        if not os.path.exists(path):
+            raise BackupError(f'{entry["file"]} is missing')
+        if _sha256(path) != entry['sha256']:
+            raise BackupError(f'{entry["file"]} does not match its checksum')
+    return manifest
+
+
+def read_rows(directory, entry):
+    with gzip.open(os.path.join(directory, entry['file']), 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+@contextmanager
+def _stored_timestamps(model):
+    """Let bulk_create write the stored ``auto_now``/``auto_now_add`` values."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def load_table(model, directory, entry, using=DEFAULT_DB_ALIAS, batch_size=CHUNK_SIZE, remap=None, keep_pk=True):
+    """Bulk-insert one table's file and return the number of rows.
+
+    ``remap`` maps column names to functions applied to the stored value.
+    Without ``keep_pk`` the database assigns new primary keys.
+    """
+    fields = {field.attname: field for field in columns(model)}
+    remap = remap or {}
+    converters = [remap.get(name, fields[name].to_python) for name in entry['columns']]
+    skip = set() if keep_pk else {model._meta.pk.attname}
+    rows, batch = 0, []
+    with _stored_timestamps(model):
+        for values in read_rows(directory, entry):
+            batch.append(model(**{
+                name: convert(value) for name, convert, value in zip(entry['columns'], converters, values)
+                if name not in skip
+            }))
+            if len(batch) >= batch_size:
+                model._base_manager.using(using).bulk_create(batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            model._base_manager.using(using).bulk_create(batch)
+            rows += len(batch)
+    if rows != entry['rows']:
+        raise BackupError(f'{entry["file"]} holds {rows} rows, the manifest says {entry["rows"]}')
+    return rows
+
+
+def _restored_tables():
+    """App tables emptied by ``replace``, including rows derived from them."""
+    return [
+        Result, AcademicStanding, CohortRank, GradeDistribution, Publication,
+        Lecturer.courses.through, Lecturer, Student, Course, Term,
+    ]
+
+
+def conflicts(directory, manifest, using=DEFAULT_DB_ALIAS):
+    """Names of tables that already hold rows the restore would collide with."""
+    found = [
+        model._meta.db_table for label, model, _ in tables()
+        if label not in USER_TABLES and model._base_manager.using(using).exists()
+    ]
+    if clashing_users(directory, manifest, using).exists():
+        found.append(get_user_model()._meta.db_table)
+    return found
+
+
+def clashing_users(directory, manifest, using=DEFAULT_DB_ALIAS):
+    User = get_user_model()
+    entry = manifest['tables']['user']
+    pk_index = entry['columns'].index(User._meta.pk.attname)
+    name_index = entry['columns'].index(User.USERNAME_FIELD)
+    ids, names = set(), set()
+    for values in read_rows(directory, entry):
+        ids.add(values[pk_index])
+        names.add(values[name_index])
+    return User._base_manager.using(using).filter(Q(pk__in=ids) | Q(**{f'{User.USERNAME_FIELD}__in': names}))
+
+
+def _by_name(directory, manifest, label, column, kind, targets):
+    """Remap ``column`` of ``label`` from the backed-up ids to ``targets`` ids of the same name."""
+    names = manifest[kind]
+    entry = manifest['tables'][label]
+    index = entry['columns'].index(column)
+    used = {str(values[index]) for values in read_rows(directory, entry)}
+    missing = sorted(names.get(pk, f'#{pk}') for pk in used if names.get(pk) not in targets)
+    if missing:
+        raise BackupError(f"These {kind} do not exist in this database: {', '.join(missing)}")
+    return {column: lambda pk: targets[names[str(pk)]]}
+
+
+def _auth_remaps(directory, manifest, using):
+    groups = dict(Group.objects.using(using).values_list('name', 'pk'))
+    permissions = {
+        f'{app_label}.{codename}': pk for pk, app_label, codename in
+        Permission.objects.using(using).values_list('pk', 'content_type__app_label', 'codename')
+    }
+    return {
+        'user_groups': _by_name(directory, manifest, 'user_groups', 'group_id', 'groups', groups),
+        'user_permissions': _by_name(directory, manifest, 'user_permissions', 'permission_id', 'permissions', permissions),
+    }
+
+
+def restore(directory, replace=False, progress=None):
+    """Load a backup into the primary database and return ``{label: rows}``.
+
+    Raises BackupError if the backup is damaged, or if the tables already
+    hold data and ``replace`` is not set. With ``replace`` the app tables
+    are emptied and colliding users deleted first.
+    """
+    manifest = read_manifest(directory)
+    using = DEFAULT_DB_ALIAS
+    remaps = _auth_remaps(directory, manifest, using)
+    restored = {}
+    with transaction.atomic(using=using):
+        if replace:
+            connection = connections[using]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sql_flush(
+                    no_style(), [model._meta.db_table for model in _restored_tables()], allow_cascade=True,
+                ):
+                    cursor.execute(sql)
+            clashing_users(directory, manifest, using).delete()
+        else:
+            found = conflicts(directory, manifest, using)
+            if found:
+                raise BackupError(f"These tables already hold data: {', '.join(found)}")
+        for label, model, _ in tables():
+            remap = remaps.get(label)
+            if label == 'publication':
+                users = set(get_user_model()._base_manager.using(using).values_list('pk', flat=True))
+                remap = {'published_by_id': lambda pk: pk if pk in users else None}
+            restored[label] = load_table(
+                model, directory, manifest['tables'][label], using,
+                remap=remap, keep_pk=label not in USER_TABLES[1:],
+            )
+            if progress:
+                progress(label, restored[label])
+        connection = connections[using]
+        sequences = connection.ops.sequence_reset_sql(no_style(), [model for _, model, _ in tables()])
+        if sequences:
+            with connection.cursor() as cursor:
+                for sql in sequences:
+                    cursor.execute(sql)
+        rebuild_grade_distribution()
+        refresh_cohort_ranks()
+    # Cached fragments, API responses and permission sets describe the old data.
+    cache.clear()
+    return restored
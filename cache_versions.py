@@ -0,0 +1,59 @@
+"""Per-entity data versions used to key cached template fragments.
+
+A fragment that depends on some data includes that data's version in its
+cache key (see the ``fragment_cache`` and ``data_version`` template tags).
+Signal handlers bump the version whenever the data changes, so stale
+fragments are simply never looked up again instead of waiting for a TTL.
+
+Scopes in use: ``site`` (dashboard totals), ``courses`` (any course row),
+``student_results:<student pk>``, ``lecturer:<lecturer pk>``,
+``user:<user pk>`` (also keys the user's cached permission set),
+``permissions`` (any group's permissions) and ``api:<tag>`` (surrogate
+keys of cached API responses, see ``api_cache``).
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(scope, obj_id):
+    return f'etu:version:{scope}:{obj_id}'
+
+
+def _fresh_version():
+    # Versions start from the clock so that a key lost to eviction can never
+    # come back with a number an old fragment was cached under.
+    return int(time.time() * 1000)
+
+
+def get_version(scope, obj_id=0):
+    key = _key(scope, obj_id)
+    version = cache.get(key)
+    if version is None:
+        version = _fresh_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(scope, obj_ids):
+    """``{obj_id: version}`` for several ids of one scope in a single cache round trip."""
+    keys = {_key(scope, obj_id): obj_id for obj_id in obj_ids}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, obj_id in keys.items():
+        versions[obj_id] = found[key] if key in found else get_version(scope, obj_id)
+    return versions
+
+
+def set_versions(scope, versions):
+    """Move several ids of one scope to the given ``{obj_id: version}`` at once."""
+    cache.set_many({_key(scope, obj_id): version for obj_id, version in versions.items()}, None)
+
+
+def bump_version(scope, obj_id=0):
+    key = _key(scope, obj_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
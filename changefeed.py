@@ -0,0 +1,84 @@
+"""Append-only change log for Result, Student and Course.
+
+Signal handlers call ``record_change`` for single-object writes; bulk write
+paths call ``record_changes`` with the affected ids. Consumers read the log
+with ``changes_since`` (exposed as ``/api/results/changes/``) and keep the
+last cursor they saw.
+"""
+from django.db.models import Exists, OuterRef
+
+from .models import ChangeLogEntry, Course, Result, Student
+
+FEED_MODELS = {
+    'result': Result,
+    'student': Student,
+    'course': Course,
+}
+MAX_PAGE_SIZE = 1000
+
+
+def record_change(instance, action):
+    ChangeLogEntry.objects.create(model=instance._meta.model_name, object_id=instance.pk, action=action)
+
+
+def record_changes(model, object_ids, action, batch_size=1000):
+    """Log the same action for many objects of ``model`` in one bulk insert and return the entries."""
+    name = model._meta.model_name
+    return ChangeLogEntry.objects.bulk_create(
+        [ChangeLogEntry(model=name, object_id=pk, action=action) for pk in object_ids],
+        batch_size=batch_size,
+    )
+
+
+def changes_since(cursor=0, limit=100, models=None, published_only=False):
+    """Return ``(entries, objects, next_cursor, has_more)`` after ``cursor``.
+
+    ``objects`` maps model name to ``{pk: instance}`` for the entries that are
+    not deletes, fetched with one query per model. With ``published_only``
+    the entries of draft results are left out; publishing logs them again.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    qs = ChangeLogEntry.objects.filter(id__gt=cursor)
+    if models:
+        qs = qs.filter(model__in=models)
+    entries = list(qs.order_by('id')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_cursor = entries[-1].pk if entries else cursor
+
+    wanted = {}
+    for entry in entries:
+        if entry.action != ChangeLogEntry.DELETE:
+            wanted.setdefault(entry.model, set()).add(entry.object_id)
+    objects = {}
+    for name, ids in wanted.items():
+        manager = FEED_MODELS[name].objects
+        if name == 'result':
+            manager = manager.select_related('student', 'course')
+            if published_only:
+                manager = manager.published()
+        objects[name] = manager.in_bulk(ids)
+    if published_only and 'result' in objects:
+        drafts = set(Result.objects.filter(pk__in=wanted['result']).values_list('pk', flat=True)) - set(objects['result'])
+        entries = [entry for entry in entries if not (entry.model == 'result' and entry.object_id in drafts)]
+    return entries, objects, next_cursor, has_more
+
+
+def compact_change_log(before=None, batch_size=5000):
+    """Delete entries superseded by a later entry for the same object.
+
+    Safe for every consumer: whatever cursor they hold, the latest entry
+    for each object is still ahead of it. Returns the number removed.
+    """
+    newer = ChangeLogEntry.objects.filter(
+        model=OuterRef('model'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'),
+    )
+    superseded = ChangeLogEntry.objects.filter(Exists(newer))
+    if before is not None:
+        superseded = superseded.filter(id__lte=before)
+    removed = 0
+    while True:
+        ids = list(superseded.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        removed += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,343 @@
+"""Memory-mapped columnar copy of the results for analytics.
+
+``build`` exports Result as flat binary columns that NumPy maps straight
+into memory, so distribution, GPA, cohort and trend questions become
+vectorised array operations instead of ORM scans of Result joined to
+Course and Student. There is one value per result in each of:
+
+* ``result_id`` (int64), kept for incremental refreshes
+* ``student`` and ``course`` (int32), indexes into the dimension columns
+* ``term`` (int16), an index into ``meta['terms']``, or -1 for none
+* ``grade`` (uint8), ``Result.grade_code``
+* ``credits`` (uint8), the course's credits
+
+and one value per student or course in the dimension columns:
+``student_pk``, ``student_year`` (entry year, 0 if unknown),
+``student_program``/``_department``/``_faculty`` (indexes into
+``meta['cohorts']``) and ``course_pk``. Both dimensions are in pk order,
+so codes are found with ``searchsorted``.
+
+Each build writes a new generation directory under the root. It then
+atomically replaces ``CURRENT``, which names the generation readers should
+map. A build after the first one reuses the previous generation. It
+re-reads only results with a change-log entry after that generation's
+cursor, plus the student and course dimensions, which are small.
+``QuerySet.update()`` writes bypass the change log, so also run a
+``--full`` build nightly.
+
+NumPy is optional; without it ``build`` and ``ResultColumns`` raise
+ImproperlyConfigured.
+"""
+import array
+import json
+import os
+import shutil
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from . import metrics
+from .models import GRADE_CODES, GRADE_POINTS, ChangeLogEntry, Course, Result, Student, Term
+from .push import latest_change
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORMAT = 1
+CURRENT = 'CURRENT'
+META = 'meta.json'
+CHUNK_SIZE = 10000
+QUERY_BATCH = 1000
+COHORT_FIELDS = ('program', 'department', 'faculty')
+FACT_COLUMNS = {
+    'result_id': 'int64', 'student': 'int32', 'course': 'int32',
+    'term': 'int16', 'grade': 'uint8', 'credits': 'uint8',
+}
+DIMENSION_COLUMNS = {
+    'student_pk': 'int64', 'student_year': 'int16', 'student_program': 'int32',
+    'student_department': 'int32', 'student_faculty': 'int32', 'course_pk': 'int64',
+}
+GRADES = sorted(GRADE_CODES, key=GRADE_CODES.get)  # letter grade by code
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured('The columnar results snapshot requires NumPy (pip install numpy)')
+
+
+def default_root():
+    root = getattr(settings, 'ETU_COLUMNAR_ROOT', None)
+    if not root:
+        raise ImproperlyConfigured('Set ETU_COLUMNAR_ROOT or pass a directory')
+    return root
+
+
+def current_generation(root):
+    try:
+        with open(os.path.join(root, CURRENT), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(path, text):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def _students():
+    """Student dimension columns and the cohort value lists they index."""
+    rows = list(
+        Student.objects.order_by('pk').values_list('pk', 'enrollment_date', *COHORT_FIELDS).iterator(CHUNK_SIZE)
+    )
+    cohorts = {field: sorted({row[2 + i] or '' for row in rows}) for i, field in enumerate(COHORT_FIELDS)}
+    index = {field: {value: code for code, value in enumerate(values)} for field, values in cohorts.items()}
+    columns = {
+        'student_pk': np.array([row[0] for row in rows], dtype='int64'),
+        'student_year': np.array([row[1].year if row[1] else 0 for row in rows], dtype='int16'),
+    }
+    for i, field in enumerate(COHORT_FIELDS):
+        columns[f'student_{field}'] = np.array([index[field][row[2 + i] or ''] for row in rows], dtype='int32')
+    return columns, cohorts
+
+
+def _fetch(queryset):
+    """Result rows of ``queryset`` as pk-valued arrays."""
+    buffers = [array.array('q') for _ in range(5)]
+    rows = queryset.order_by('pk').values_list('pk', 'student_id', 'course_id', 'term_id', 'grade_code')
+    for row in rows.iterator(CHUNK_SIZE):
+        for buffer, value in zip(buffers, row):
+            buffer.append(-1 if value is None else value)
+    return [np.frombuffer(buffer, dtype='int64') if buffer else np.empty(0, 'int64') for buffer in buffers]
+
+
+def _fetch_ids(ids):
+    parts = [_fetch(Result.objects.filter(pk__in=batch)) for batch in _batches(ids)]
+    return [np.concatenate(column) for column in zip(*parts)] if parts else [np.empty(0, 'int64')] * 5
+
+
+def _batches(values):
+    values = iter(values)
+    while batch := list(islice(values, QUERY_BATCH)):
+        yield batch
+
+
+def _codes(sorted_pks, pks):
+    """Indexes of ``pks`` in ``sorted_pks`` and a mask of the ones found."""
+    codes = np.searchsorted(sorted_pks, pks)
+    found = codes < len(sorted_pks)
+    found[found] = sorted_pks[codes[found]] == pks[found]
+    return codes, found
+
+
+@metrics.timed_export('result_columns')
+def build(root=None, full=False):
+    """Write a new generation under ``root`` and return its meta.
+
+    Incremental from the current generation unless ``full`` is set or there
+    is no usable one.
+    """
+    _require_numpy()
+    root = root or default_root()
+    os.makedirs(root, exist_ok=True)
+    cursor = latest_change()  # before reading, so later writes are picked up next time
+    previous = None
+    if not full and current_generation(root):
+        try:
+            previous = ResultColumns(root)
+        except (OSError, ValueError, KeyError):
+            previous = None
+
+    students, cohorts = _students()
+    courses = list(Course.objects.order_by('pk').values_list('pk', 'code', 'credits'))
+    course_pk = np.array([pk for pk, _, _ in courses], dtype='int64')
+    course_credits = np.array([credits or 0 for _, _, credits in courses], dtype='uint8')
+    terms = list(Term.objects.order_by('ordinal', 'code').values_list('pk', 'code'))
+    term_pk = np.array([pk for pk, _ in terms], dtype='int64')
+
+    if previous is None:
+        result_id, student, course, term, grade = _fetch(Result.objects.all())
+    else:
+        changed = np.fromiter(
+            ChangeLogEntry.objects.filter(id__gt=previous.cursor, id__lte=cursor, model='result')
+            .values_list('object_id', flat=True).distinct().iterator(CHUNK_SIZE),
+            dtype='int64',
+        )
+        keep = ~np.isin(previous.result_id, changed)
+        old_terms = np.array([pk for pk, _ in previous.meta['terms']] + [-1], dtype='int64')
+        fresh = _fetch_ids(changed.tolist())
+        result_id, student, course, term, grade = (
+            np.concatenate([old, new]) for old, new in zip([
+                previous.result_id[keep],
+                previous.student_pk[previous.student[keep]],
+                previous.course_pk[previous.course[keep]],
+                old_terms[previous.term[keep]],
+                previous.grade[keep].astype('int64'),
+            ], fresh)
+        )
+        order = np.argsort(result_id, kind='stable')
+        result_id, student, course, term, grade = (column[order] for column in (result_id, student, course, term, grade))
+
+    student_code, student_found = _codes(students['student_pk'], student)
+    course_code, course_found = _codes(course_pk, course)
+    # Terms are few and not in pk order; a result without a term keeps -1
+    term_code = np.full(len(term), -1, dtype='int64')
+    if len(term_pk):
+        sorter = np.argsort(term_pk)
+        positions, term_found = _codes(term_pk[sorter], term)
+        term_code[term_found] = sorter[positions[term_found]]
+    keep = student_found & course_found
+    facts = {
+        'result_id': result_id[keep],
+        'student': student_code[keep],
+        'course': course_code[keep],
+        'term': term_code[keep],
+        'grade': grade[keep],
+        'credits': course_credits[course_code[keep]] if len(course_pk) else np.empty(0),
+    }
+
+    generation = int(timezone.now().timestamp() * 1000)
+    if current_generation(root):
+        generation = max(generation, int(current_generation(root)) + 1)
+    generation = f'{generation:015d}'
+    directory = os.path.join(root, generation)
+    os.makedirs(directory)
+    columns = {**facts, **students, 'course_pk': course_pk}
+    for name, dtype in {**FACT_COLUMNS, **DIMENSION_COLUMNS}.items():
+        np.ascontiguousarray(columns[name], dtype=dtype).tofile(os.path.join(directory, f'{name}.bin'))
+    meta = {
+        'format': FORMAT,
+        'built_at': timezone.now().isoformat(),
+        'cursor': cursor,
+        'incremental': previous is not None,
+        'rows': int(keep.sum()),
+        'students': len(students['student_pk']),
+        'courses': [code for _, code, _ in courses],
+        'terms': [[pk, code] for pk, code in terms],
+        'cohorts': cohorts,
+    }
+    with open(os.path.join(directory, META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    _write_atomic(os.path.join(root, CURRENT), generation)
+    _remove_old_generations(root, keep={generation, previous and previous.generation})
+    return meta
+
+
+def _remove_old_generations(root, keep):
+    """Delete generations other than ``keep``; the previous one may still be mapped by readers."""
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.name.isdigit() and entry.name not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)  # still mapped on Windows: retried next build
+
+
+def _map(path, dtype, length):
+    if not length:
+        return np.empty(0, dtype=dtype)  # a zero-length file cannot be mapped
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+class ResultColumns:
+    """The current generation under ``root``, mapped read-only."""
+
+    def __init__(self, root=None):
+        _require_numpy()
+        root = root or default_root()
+        self.generation = current_generation(root)
+        if self.generation is None:
+            raise FileNotFoundError(f'No columnar results snapshot in {root}; run build_result_columns')
+        directory = os.path.join(root, self.generation)
+        with open(os.path.join(directory, META), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['format'] != FORMAT:
+            raise ValueError(f"Unsupported columnar format {self.meta['format']!r}")
+        self.cursor = self.meta['cursor']
+        for name, dtype in FACT_COLUMNS.items():
+            setattr(self, name, _map(os.path.join(directory, f'{name}.bin'), dtype, self.meta['rows']))
+        for name, dtype in DIMENSION_COLUMNS.items():
+            length = len(self.meta['courses']) if name == 'course_pk' else self.meta['students']
+            setattr(self, name, _map(os.path.join(directory, f'{name}.bin'), dtype, length))
+        self.points = np.array([GRADE_POINTS[grade] for grade in GRADES])[self.grade] * self.credits
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _mask(self, course=None, term=None):
+        """Rows of course pk ``course`` and term code ``term`` (None = all)."""
+        mask = np.ones(len(self), dtype=bool)
+        if course is not None:
+            codes, found = _codes(self.course_pk, np.array([course], dtype='int64'))
+            mask &= self.course == (codes[0] if found[0] else -1)
+        if term is not None:
+            codes = [i for i, (_, code) in enumerate(self.meta['terms']) if code == term]
+            mask &= self.term == (codes[0] if codes else -2)
+        return mask
+
+    def grade_counts(self, course=None, term=None):
+        """``{letter grade: results}`` for a course pk and/or term code."""
+        counts = np.bincount(self.grade[self._mask(course, term)], minlength=len(GRADES))
+        return {grade: int(counts[code]) for code, grade in enumerate(GRADES)}
+
+    def _gpas(self):
+        """Mask of students with graded credits and their credit-weighted GPAs."""
+        size = len(self.student_pk)
+        credits = np.bincount(self.student, weights=self.credits, minlength=size)
+        points = np.bincount(self.student, weights=self.points, minlength=size)
+        graded = credits > 0
+        return graded, points[graded] / credits[graded]
+
+    def student_gpas(self):
+        """``(student pks, GPAs)`` arrays for students with graded credits."""
+        graded, gpas = self._gpas()
+        return self.student_pk[graded], gpas
+
+    def mean_gpa(self):
+        _, gpas = self.student_gpas()
+        return float(gpas.mean()) if len(gpas) else 0.0
+
+    def cohort_gpas(self, field):
+        """``{cohort value: (students, mean GPA)}`` by ``program``, ``department``, ``faculty`` or ``year``."""
+        graded, gpas = self._gpas()
+        if field == 'year':
+            years, codes = np.unique(self.student_year[graded], return_inverse=True)
+            labels = years.tolist()
+        else:
+            codes = getattr(self, f'student_{field}')[graded]
+            labels = self.meta['cohorts'][field]
+        students = np.bincount(codes, minlength=len(labels))
+        totals = np.bincount(codes, weights=gpas, minlength=len(labels))
+        return {
+            label: (int(students[i]), float(totals[i] / students[i]))
+            for i, label in enumerate(labels) if students[i]
+        }
+
+    def term_trend(self, course=None):
+        """``[(term code, results, credit-weighted mean grade points)]`` in term order."""
+        mask = self._mask(course) & (self.term >= 0)
+        size = len(self.meta['terms'])
+        terms = self.term[mask]
+        results = np.bincount(terms, minlength=size)
+        credits = np.bincount(terms, weights=self.credits[mask], minlength=size)
+        points = np.bincount(terms, weights=self.points[mask], minlength=size)
+        return [
+            (code, int(results[i]), float(points[i] / credits[i]) if credits[i] else 0.0)
+            for i, (_, code) in enumerate(self.meta['terms']) if results[i]
+        ]
+
+
+_opened = {}
+
+
+def open_columns(root=None):
+    """ResultColumns for ``root``, reused until a build switches ``CURRENT``."""
+    root = root or default_root()
+    generation = current_generation(root)
+    columns = _opened.get(root)
+    if columns is None or columns.generation != generation:
+        columns = _opened[root] = ResultColumns(root)
+    return columns
@@ -1,7 +1,75 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from . import models
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+from . import identity, models
+
+
+class AutocompleteSelect(forms.Select):
+    """Select that only renders the chosen option; the rest are fetched as the user types.
+
+    Keeps form pages the same size however many rows the related table has.
+    Options come from the JSON endpoints behind ``url``.
+    """
+    class Media:
+        js = ('eturesultapp/js/autocomplete.js',)
+
+    def __init__(self, url, attrs=None, choices=()):
+        super().__init__(attrs, choices)
+        self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = str(self.url)
+        return attrs
+
+    def _valid_pks(self, value):
+        # A re-rendered invalid POST can carry anything; such values select nothing
+        pk_field = self.choices.queryset.model._meta.pk
+        pks = []
+        for v in value:
+            try:
+                pks.append(pk_field.to_python(v))
+            except ValidationError:
+                pass
+        return pks
+
+    def optgroups(self, name, value, attrs=None):
+        selected = self._valid_pks(v for v in value if v not in ('', None))
+        options = []
+        if not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '---------', not selected, 0))
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=len(options)):
+                option_value = self.choices.field.prepare_value(obj)
+                label = self.choices.field.label_from_instance(obj)
+                options.append(self.create_option(name, option_value, label, True, index))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelectMultiple(AutocompleteSelect, forms.SelectMultiple):
+    pass
+
+
+class ResultForm(forms.ModelForm):
+    class Meta:
+        model = models.Result
+        fields = ['student', 'course', 'grade', 'term']
+        widgets = {
+            'student': AutocompleteSelect(reverse_lazy('eturesultapp:autocomplete_students')),
+            'course': AutocompleteSelect(reverse_lazy('eturesultapp:autocomplete_courses')),
+        }
+
+
+class LecturerForm(forms.ModelForm):
+    class Meta:
+        model = models.Lecturer
+        fields = ['staff_id', 'department', 'is_admin_assistant', 'courses']
+        widgets = {
+            'courses': AutocompleteSelectMultiple(reverse_lazy('eturesultapp:autocomplete_courses')),
+        }
 
 
 class StudentRegistrationForm(UserCreationForm):
@@ -27,9 +95,10 @@ class StudentRegistrationForm(UserCreationForm):
     def clean_email(self):
         """Validate that email is unique."""
         email = self.cleaned_data.get('email')
-        if email and models.Student.objects.filter(email=email).exists():
+        student_exists, user_exists = identity.email_registered(email)
+        if student_exists:
             raise forms.ValidationError('A student with this email already exists.')
-        if email and User.objects.filter(email=email).exists():
+        if user_exists:
             raise forms.ValidationError('This email is already registered with another account.')
         return email
 
@@ -82,7 +151,7 @@ class LecturerRegistrationForm(UserCreationForm):
     def clean_email(self):
         """Validate that email is unique."""
         email = self.cleaned_data.get('email')
-        if email and User.objects.filter(email=email).exists():
+        if identity.users_with_email(email).exists():
             raise forms.ValidationError('This email is already registered.')
         return email
 
@@ -119,7 +188,7 @@ class AdminRegistrationForm(UserCreationForm):
     def clean_email(self):
         """Validate that email is unique."""
         email = self.cleaned_data.get('email')
-        if email and User.objects.filter(email=email).exists():
+        if identity.users_with_email(email).exists():
             raise forms.ValidationError('This email is already registered.')
         return email
 
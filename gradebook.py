@@ -0,0 +1,112 @@
+"""Load and bulk-save all results of one course for one term.
+
+Each existing result carries a version token (its ``updated_at``) in the
+grid. On save a row is only applied if its token still matches the database,
+so two people editing the same gradebook cannot silently overwrite each
+other; rows that fail the check are reported back as conflicts. Empty cells
+have no row to lock, so a cell someone else filled in meanwhile is caught by
+the unique constraint and reported the same way.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Result, Student, Term
+from .signals import results_bulk_saved
+
+GRADES = {code for code, _ in Result.GRADE_CHOICES}
+
+
+def version_token(result):
+    return result.updated_at.isoformat() if result else ''
+
+
+def load_gradebook(course, term, **cohort):
+    """Return ``(students, results_by_student_id)`` in two queries.
+
+    The roster is every active student matching the cohort filters plus
+    anyone who already has a result for this course and term. ``term`` is a
+    Term, None for results without one, or the semester string of a term
+    that does not exist yet and so has no results.
+    """
+    roster = Q(is_active=True, **{field: value for field, value in cohort.items() if value})
+    if isinstance(term, str):
+        return list(Student.objects.filter(roster).order_by('student_id')), {}
+    roster |= Q(results__course=course, results__term=term)
+    students = list(Student.objects.filter(roster).distinct().order_by('student_id'))
+    results = Result.objects.filter(course=course, term=term, student__in=[s.pk for s in students])
+    return students, {result.student_id: result for result in results}
+
+
+def save_gradebook(course, term, rows):
+    """Apply submitted grid rows and return ``(created, updated, conflicts)``.
+
+    ``rows`` maps student pk to ``{'grade', 'remarks', 'version'}``. Rows with
+    no grade and no existing result are ignored; clearing a grade in the grid
+    does not delete the recorded result. A ``term`` given as a semester
+    string is only created once a result is saved for it.
+    """
+    now = timezone.now()
+    to_create, to_update, changes, conflicts = [], [], [], []
+    with transaction.atomic():
+        if isinstance(term, str):
+            existing = {}
+        else:
+            existing = {
+                result.student_id: result
+                for result in Result.objects.select_for_update().filter(
+                    course=course, term=term, student_id__in=list(rows),
+                )
+            }
+        known_students = set(Student.objects.filter(pk__in=list(rows)).values_list('pk', flat=True))
+        for student_id, row in rows.items():
+            grade = row.get('grade') or ''
+            remarks = row.get('remarks') or ''
+            result = existing.get(student_id)
+            if student_id not in known_students or (grade and grade not in GRADES):
+                conflicts.append(student_id)
+                continue
+            if row.get('version', '') != version_token(result):
+                conflicts.append(student_id)
+                continue
+            if result is None:
+                if grade:
+                    to_create.append(Result(
+                        student_id=student_id, course=course, grade=grade, remarks=remarks,
+                    ))
+                continue
+            if not grade or (grade, remarks) == (result.grade, result.remarks):
+                continue
+            previous = (result.course_id, result.term_id, result.grade, result.student_id)
+            result.grade, result.remarks, result.updated_at = grade, remarks, now
+            to_update.append(result)
+            changes.append((result, previous))
+
+        if isinstance(term, str) and to_create:
+            term = Term.objects.resolve(term)
+        for result in to_create:
+            result.term = term
+        try:
+            with transaction.atomic():
+                Result.objects.bulk_create(to_create)
+        except IntegrityError:
+            to_create = _create_each(to_create, conflicts)
+        Result.objects.bulk_update(to_update, ['grade', 'remarks', 'updated_at'])
+        changes.extend((result, None) for result in to_create)
+        if changes:
+            results_bulk_saved.send(sender=Result, changes=changes)
+    return to_create, to_update, conflicts
+
+
+def _create_each(results, conflicts):
+    """Insert ``results`` one by one, adding the students whose cell was taken to ``conflicts``."""
+    created = []
+    for result in results:
+        try:
+            with transaction.atomic():
+                Result.objects.bulk_create([result])
+        except IntegrityError:
+            conflicts.append(result.student_id)
+        else:
+            created.append(result)
+    return created
@@ -0,0 +1,69 @@
+"""Matching users and students by email.
+
+``Student.email`` is stored normalized (trimmed, lowercased) and both
+``Student`` and ``auth_user`` carry an index on ``LOWER(email)``. Every
+lookup here compares ``Lower('email')`` with a normalized address so it is
+an index seek on either table; ``email__iexact`` cannot use those indexes.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Lower
+
+from .models import Student, normalize_email
+
+
+def _with_email(queryset, email):
+    email = normalize_email(email)
+    if not email:
+        return queryset.none()
+    return queryset.alias(email_lower=Lower('email')).filter(email_lower=email)
+
+
+def students_with_email(email):
+    return _with_email(Student.objects.all(), email)
+
+
+def users_with_email(email):
+    return _with_email(get_user_model().objects.all(), email)
+
+
+def email_registered(email):
+    """``(student_exists, user_exists)`` for an address, case-insensitively."""
+    return students_with_email(email).exists(), users_with_email(email).exists()
+
+
+def registered_emails(emails, batch_size=1000):
+    """The normalized addresses among ``emails`` already used by a Student or User."""
+    emails = sorted({normalize_email(email) for email in emails if email})
+    found = set()
+    for model in (Student, get_user_model()):
+        for start in range(0, len(emails), batch_size):
+            found.update(
+                model.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails[start:start + batch_size])
+                .values_list('email_lower', flat=True)
+            )
+    return found
+
+
+def student_for_user(user):
+    """The user's Student record: the linked one, else the one sharing their email."""
+    if not user.is_authenticated:
+        return None
+    student = Student.objects.filter(user=user).first()
+    if student is None:
+        student = students_with_email(user.email).first()
+    return student
+
+
+def owns_student(user, student):
+    """True if ``student`` is ``user``'s own record."""
+    if student.user_id is not None and student.user_id == user.pk:
+        return True
+    email = normalize_email(user.email)
+    return bool(email) and email == normalize_email(student.email)
+
+
+def user_for_email(email):
+    """The single user with this email, or None if there is none or several."""
+    users = list(users_with_email(email)[:2])
+    return users[0] if len(users) == 1 else None
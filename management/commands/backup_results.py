@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from eturesultapp.backup import CHUNK_SIZE, backup
+
+
+class Command(BaseCommand):
+    help = 'Stream terms, linked users, students, courses, lecturers and results into compressed JSONL files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory to write <table>.jsonl.gz files and manifest.json into')
+        parser.add_argument('--database', default='default', help='Database alias to read from, e.g. a read replica')
+        parser.add_argument('--workers', type=int, default=4, help='Tables dumped in parallel (1 runs in-process)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        manifest = backup(
+            options['directory'], using=options['database'],
+            workers=options['workers'], chunk_size=options['chunk_size'],
+        )
+        for label, entry in manifest['tables'].items():
+            self.stdout.write(f"{label}: {entry['rows']} rows")
+        self.stdout.write(self.style.SUCCESS(f"Backup written to {options['directory']}"))
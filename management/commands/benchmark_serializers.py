@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from eturesultapp.models import Course, Result, Student, Term
+from eturesultapp.renderers import ORJSONRenderer
+from eturesultapp.serializers import FastListSerializer, ResultSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF ResultSerializer + JSONRenderer with the values()-based serializer + ORJSONRenderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Number of results to serialize')
+        parser.add_argument('--courses', type=int, default=20, help='Distinct courses the rows are spread over')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed repetitions (best is reported)')
+
+    def handle(self, *args, **options):
+        # Fixture rows are created inside a transaction that is always rolled back
+        with transaction.atomic():
+            queryset = self.create_rows(options['rows'], options['courses'])
+            drf = self.best_of(options['rounds'], lambda: JSONRenderer().render(ResultSerializer(queryset.all(), many=True).data))
+            fast_serializer = FastListSerializer.for_class(ResultSerializer)
+            fast = self.best_of(options['rounds'], lambda: ORJSONRenderer().render(fast_serializer.data(fast_serializer.values(queryset.all()))))
+            same = (
+                JSONRenderer().render(ResultSerializer(queryset.all(), many=True).data)
+                == ORJSONRenderer().render(fast_serializer.data(fast_serializer.values(queryset.all())))
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['rows']} results over {options['courses']} courses (best of {options['rounds']})")
+        self.stdout.write(f'  DRF serializer + JSONRenderer:     {drf * 1000:8.1f} ms')
+        self.stdout.write(f'  values() serializer + ORJSON:      {fast * 1000:8.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'  speed-up {drf / fast:.1f}x, identical output: {same}'))
+
+    def create_rows(self, rows, course_count):
+        stamp = timezone.now().strftime('%H%M%S')
+        courses = Course.objects.bulk_create(
+            Course(code=f'BM{stamp}{i:03d}', name=f'Benchmark course {i}', credits=3) for i in range(course_count)
+        )
+        students = Student.objects.bulk_create(
+            Student(student_id=f'BM{stamp}{i:06d}', first_name='Bench', last_name=f'Mark {i}', email=f'bm{i}@example.com')
+            for i in range(rows)
+        )
+        term = Term.objects.resolve('2025-1')
+        Result.objects.bulk_create(
+            Result(student=student, course=courses[i % course_count], grade='B', term=term)
+            for i, student in enumerate(students)
+        )
+        return Result.objects.filter(course__in=courses).select_related('student', 'course', 'term').order_by('-recorded_at')
+
+    @staticmethod
+    def best_of(rounds, func):
+        timings = []
+        for _ in range(max(rounds, 1)):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
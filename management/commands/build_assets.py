@@ -0,0 +1,42 @@
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp import assets
+
+
+class Command(BaseCommand):
+    help = 'Vendor pinned CDN assets into static/eturesultapp/vendor and run collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true', help='Download vendored files again even if present')
+        parser.add_argument('--offline', action='store_true', help='Do not download anything; only collect')
+        parser.add_argument('--no-collect', action='store_true', help='Only vendor files, skip collectstatic')
+
+    def handle(self, *args, **options):
+        if not options['offline']:
+            self.vendor(refresh=options['refresh'])
+        assets.is_vendored.cache_clear()
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+    def vendor(self, refresh=False):
+        fetched = 0
+        for url, path in assets.vendor_files():
+            target = assets.VENDOR_DIR / path
+            if target.is_file() and not refresh:
+                continue
+            try:
+                with urlopen(url, timeout=30) as response:
+                    content = response.read()
+            except URLError as exc:
+                raise CommandError(f'Could not download {url}: {exc}')
+            if target.suffix in ('.css', '.js'):
+                content = assets.strip_source_map(content)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            fetched += 1
+            self.stdout.write(f'Fetched {path} ({len(content)} bytes)')
+        self.stdout.write(self.style.SUCCESS(f'Vendored {fetched} file(s) into {assets.VENDOR_DIR}'))
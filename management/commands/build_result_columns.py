@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from eturesultapp.columnar import build
+
+
+class Command(BaseCommand):
+    help = 'Export results into memory-mapped columns for analytics (incremental after the first build)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', nargs='?', help='Snapshot directory (default ETU_COLUMNAR_ROOT)')
+        parser.add_argument('--full', action='store_true', help='Re-read every result instead of only changed ones')
+
+    def handle(self, *args, **options):
+        meta = build(options['directory'], full=options['full'])
+        kind = 'incremental' if meta['incremental'] else 'full'
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind.capitalize()} build: {meta['rows']} results, {meta['students']} students, "
+            f"{len(meta['courses'])} courses (change-log cursor {meta['cursor']})"
+        ))
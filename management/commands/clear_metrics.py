@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp import metrics
+
+
+class Command(BaseCommand):
+    help = "Delete the worker processes' metrics files; run before starting the workers on each deploy"
+
+    def handle(self, *args, **options):
+        if metrics.metrics_dir() is None:
+            raise CommandError('ETU_METRICS_DIR is not set; metrics are kept in memory only')
+        removed = metrics.clear()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} metrics files from {metrics.metrics_dir()}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from eturesultapp.changefeed import compact_change_log
+
+
+class Command(BaseCommand):
+    help = 'Remove change-log entries superseded by a later change to the same object'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            type=int,
+            default=None,
+            help='Only compact entries up to and including this cursor',
+        )
+
+    def handle(self, *args, **options):
+        removed = compact_change_log(before=options['before'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} superseded change-log entries'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.models import Term
+from eturesultapp.standing import PARTITION_SIZE, evaluate_term, latest_term
+
+
+class Command(BaseCommand):
+    help = "Compute end-of-term academic standing (dean's list, good standing, probation) for every active student"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', help='Semester to evaluate (default: latest with results)')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count; 1 runs in-process)')
+        parser.add_argument('--partition-size', type=int, default=PARTITION_SIZE, help='Students per worker task')
+
+    def handle(self, *args, **options):
+        if options['term']:
+            term = Term.objects.find(options['term'])
+            if term is None:
+                raise CommandError(f"Unknown term {options['term']!r}")
+        else:
+            term = latest_term()
+            if term is None:
+                raise CommandError('No results recorded yet; nothing to evaluate')
+
+        def progress(done, total, elapsed):
+            rate = done / elapsed if elapsed else 0
+            self.stdout.write(f'{done}/{total} students ({done * 100 // max(total, 1)}%) in {elapsed:.1f}s, {rate:.0f}/s')
+
+        total = evaluate_term(
+            term, workers=options['workers'], partition_size=options['partition_size'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Evaluated standing for {total} students in {term.code}'))
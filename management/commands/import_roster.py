@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.roster import BATCH_SIZE, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = 'Create inactive User and Student accounts from an intake roster CSV and queue their activation mails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with student_id, first_name, last_name, email[, program, department, faculty, enrollment_date]')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows even if some rows are rejected')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Accounts created per transaction')
+        parser.add_argument('--base-url', help='Site URL for activation links (default: ETU_SITE_URL)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                rows = read_roster(stream)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        def progress(done, total):
+            self.stdout.write(f'{done}/{total} accounts created')
+
+        report = import_roster(
+            rows, base_url=options['base_url'], batch_size=options['batch_size'],
+            skip_invalid=options['skip_invalid'], progress=progress,
+        )
+        for line, message in report.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if report.errors and not options['skip_invalid']:
+            raise CommandError(f'{len(report.errors)} of {report.rows} rows are invalid; nothing was imported (use --skip-invalid to import the rest)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created} students; activation mails queued (deliver with send_queued_mail)'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.models import Publication, Term
+from eturesultapp.publication import publish
+
+
+class Command(BaseCommand):
+    help = "Warm students' caches for, then publish, the draft results of a term"
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', help='Term code, e.g. 2024-S1')
+        parser.add_argument(
+            '--course',
+            action='append',
+            dest='courses',
+            help='Only publish this course code (repeatable)',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Students warmed in parallel (1 runs in-process)')
+
+    def handle(self, *args, **options):
+        try:
+            term = Term.objects.get(code=options['term'])
+        except Term.DoesNotExist:
+            raise CommandError(f"Unknown term {options['term']}")
+        drafts = Publication.objects.filter(term=term, published_at__isnull=True).select_related('course')
+        if options['courses']:
+            drafts = drafts.filter(course__code__in=options['courses'])
+        drafts = list(drafts)
+        if not drafts:
+            self.stdout.write(f'No draft results to publish for {term.code}')
+            return
+        students = publish(drafts, workers=options['workers'])
+        courses = ', '.join(sorted(draft.course.code for draft in drafts))
+        self.stdout.write(self.style.SUCCESS(f'Published {courses} for {len(students)} students'))
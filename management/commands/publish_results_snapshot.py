@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.snapshot import CHUNK_SIZE, publish_snapshot
+
+
+class Command(BaseCommand):
+    help = "Render every student's results page and CSV as static, token-addressed files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', nargs='?',
+            help='Directory served by the web server (default ETU_SNAPSHOT_ROOT)',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Rendering processes (1 renders in-process)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Students per worker task')
+        parser.add_argument('--force', action='store_true', help='Render every student, not only changed ones')
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or getattr(settings, 'ETU_SNAPSHOT_ROOT', None)
+        if not directory:
+            raise CommandError('Give a directory or set ETU_SNAPSHOT_ROOT')
+
+        def progress(rendered, total):
+            self.stdout.write(f'{rendered}/{total} students rendered')
+
+        report = publish_snapshot(
+            directory, workers=options['workers'], force=options['force'],
+            chunk_size=options['chunk_size'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot of {report.students} students: {report.rendered} rendered, {report.removed} removed'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from eturesultapp.analytics import rebuild_grade_distribution
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the grade-distribution cube from all recorded results'
+
+    def handle(self, *args, **options):
+        cells = rebuild_grade_distribution()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt grade distribution ({cells} cells)'))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.ranking import refresh_cohort_ranks, refresh_stale_ranks
+
+
+class Command(BaseCommand):
+    help = 'Recompute GPA rank and percentile of every student within their cohorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            action='append',
+            dest='years',
+            help='Only recompute this entry year (repeatable)',
+        )
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Only recompute the entry years that grade and student changes marked stale',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='With --stale, keep running and check for stale years every INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        if not options['stale']:
+            if options['interval']:
+                raise CommandError('--interval needs --stale')
+            ranked = refresh_cohort_ranks(options['years'])
+            self.stdout.write(self.style.SUCCESS(f'Ranked {ranked} students'))
+            return
+        if options['years']:
+            raise CommandError('--year and --stale are exclusive')
+        interval = options['interval']
+        while True:
+            ranked = refresh_stale_ranks()
+            if ranked or not interval:
+                self.stdout.write(self.style.SUCCESS(f'Ranked {ranked} students'))
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eturesultapp.backup import BackupError, restore
+
+
+class Command(BaseCommand):
+    help = 'Restore a backup_results directory into the primary database with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory written by backup_results')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help='Empty the results tables and delete users with clashing ids or usernames first',
+        )
+
+    def handle(self, *args, **options):
+        def progress(label, rows):
+            self.stdout.write(f'{label}: {rows} rows')
+
+        try:
+            restore(options['directory'], replace=options['replace'], progress=progress)
+        except BackupError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            'Restore complete; grade statistics and cohort ranks rebuilt (run evaluate_standing to recompute standing)'
+        ))
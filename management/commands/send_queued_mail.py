@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eturesultapp.outbox import MAX_ATTEMPTS, send_queued
+
+
+class Command(BaseCommand):
+    help = 'Deliver mail queued in the outbox (activation mails from roster imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Messages per batch')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help='Give up on a message after this many failures')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and check for new mail every INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            # Drain the queue before sleeping
+            while True:
+                sent, failed = send_queued(limit=options['limit'], max_attempts=options['max_attempts'])
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                if sent < options['limit'] or failed:
+                    break
+            if not interval:
+                return
+            time.sleep(interval)
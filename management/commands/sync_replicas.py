@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eturesultapp.replication import sync_all_replicas
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the configured read replicas (local replication stand-in)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and re-sync every INTERVAL seconds',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            synced = sync_all_replicas()
+            if not synced:
+                self.stdout.write(self.style.WARNING('No replicas configured in ETU_READ_REPLICAS'))
+                return
+            self.stdout.write(self.style.SUCCESS(f"Synced {', '.join(synced)}"))
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,277 @@
+"""Request, query, export and cache metrics aggregated across worker processes.
+
+``middleware.MetricsMiddleware`` times every request and records, per view,
+a latency histogram, the number and total time of its SQL queries and the
+response size. ``timed_export`` times CSV exports, backups and snapshots.
+The transcript, fragment, API and permission caches count hits and misses.
+
+Each process keeps its own numbers in memory. One lock guards them and is
+held only for a dictionary update. With ``ETU_METRICS_DIR`` set, at most
+every ``ETU_METRICS_FLUSH_INTERVAL`` seconds (default 5) the process writes
+them to its own file, ``<ETU_METRICS_DIR>/<pid>-<id>.json``, through an
+atomic rename. Nothing is shared for writing, so processes never wait on
+each other. ``/metrics/`` adds up every file and answers in the Prometheus
+text format; without a directory it reports only the serving process. It is
+open to staff, and to scrapers that send
+``Authorization: Bearer <ETU_METRICS_TOKEN>``.
+
+Files of exited processes are kept and still counted: dropping them would
+make the summed counters go backwards, which Prometheus reads as a reset.
+Run the ``clear_metrics`` command (``clear()``) before starting the workers
+on each deploy so the directory does not grow with old processes.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+EXPORT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# name: (type, help)
+METRICS = {
+    'etu_request_duration_seconds': ('histogram', 'Time to produce a response, by view.'),
+    'etu_requests_total': ('counter', 'Responses by view, method and status class.'),
+    'etu_response_size_bytes': ('histogram', 'Size of non-streaming response bodies, by view.'),
+    'etu_db_queries_total': ('counter', 'SQL queries run while handling requests, by view.'),
+    'etu_db_query_seconds_total': ('counter', 'Time spent in SQL queries while handling requests, by view.'),
+    'etu_export_duration_seconds': ('histogram', 'Duration of exports, backups and snapshots, by export.'),
+    'etu_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss).'),
+    'etu_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits, by cache.'),
+}
+
+
+def metrics_dir():
+    """The shared directory of per-process files, or None to keep numbers in memory only."""
+    configured = getattr(settings, 'ETU_METRICS_DIR', None)
+    return Path(configured) if configured else None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    """This process's counters and histograms."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed_at = time.monotonic()
+        self._file = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+
+    def inc(self, name, labels, value=1):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = _key(name, labels)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1), 'sum': 0.0}
+            histogram['counts'][index] += 1
+            histogram['sum'] += value
+
+    def dump(self):
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, dict(labels), {**histogram, 'counts': list(histogram['counts'])}]
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        """Write this process's file if the flush interval has passed (or ``force``)."""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < getattr(settings, 'ETU_METRICS_FLUSH_INTERVAL', 5):
+            return
+        self._flushed_at = now
+        directory = metrics_dir()
+        if directory is None or (not self._counters and not self._histograms):
+            return
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            temporary = directory / f'{self._file}.tmp'
+            temporary.write_text(json.dumps(self.dump()))
+            os.replace(temporary, directory / self._file)
+        except OSError:
+            pass  # metrics must never fail a request; the next flush retries
+
+
+registry = Registry()
+if hasattr(os, 'register_at_fork'):
+    # A forked worker (gunicorn --preload) starts with its own numbers and file
+    os.register_at_fork(after_in_child=registry._reset)
+atexit.register(registry.flush, force=True)
+
+
+class QueryCounter:
+    """Count the SQL queries run on this thread's connections while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def _wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self._wrapper))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
+        return False
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else '') or 'unresolved'
+
+
+def record_request(request, response, seconds, queries=None):
+    view = view_label(request)
+    registry.observe('etu_request_duration_seconds', {'view': view, 'method': request.method}, seconds, LATENCY_BUCKETS)
+    registry.inc('etu_requests_total', {
+        'view': view, 'method': request.method, 'status': f'{response.status_code // 100}xx',
+    })
+    if not response.streaming:
+        registry.observe('etu_response_size_bytes', {'view': view}, len(response.content), SIZE_BUCKETS)
+    if queries is not None:
+        registry.inc('etu_db_queries_total', {'view': view}, queries.count)
+        registry.inc('etu_db_query_seconds_total', {'view': view}, queries.seconds)
+    registry.flush()
+
+
+def record_cache(cache, hit):
+    registry.inc('etu_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+@contextmanager
+def timed_export(name):
+    """Record how long the block takes as export ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('etu_export_duration_seconds', {'export': name}, time.perf_counter() - started, EXPORT_BUCKETS)
+        registry.flush()
+
+
+def _process_files():
+    directory = metrics_dir()
+    if directory is None:
+        yield registry.dump()
+        return
+    registry.flush(force=True)
+    for path in directory.glob('*.json'):
+        try:
+            yield json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # another process is replacing it; counted next scrape
+
+
+def collect():
+    """Every process's numbers added up: ``(counters, histograms)`` keyed like the registry."""
+    counters, histograms = {}, {}
+    for data in _process_files():
+        for name, labels, value in data.get('counters', []):
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in data.get('histograms', []):
+            key = _key(name, labels)
+            total = histograms.get(key)
+            if total is None or total['buckets'] != histogram['buckets']:
+                histograms[key] = {**histogram, 'counts': list(histogram['counts'])}
+            else:
+                total['counts'] = [a + b for a, b in zip(total['counts'], histogram['counts'])]
+                total['sum'] += histogram['sum']
+    return counters, histograms
+
+
+def clear():
+    """Delete every process's file and return how many there were. Counters restart from zero."""
+    directory = metrics_dir()
+    if directory is None:
+        return 0
+    removed = 0
+    for path in directory.glob('*.json*'):
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(counters, histograms):
+    """Prometheus text exposition (format 0.0.4) of ``collect()``'s result."""
+    series = {}
+    for (name, labels), value in sorted(counters.items()):
+        series.setdefault(name, []).append(f'{name}{_labels(labels)} {_number(value)}')
+    for (name, labels), histogram in sorted(histograms.items()):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip([*histogram['buckets'], '+Inf'], histogram['counts']):
+            cumulative += count
+            le = bound if bound == '+Inf' else _number(float(bound))
+            lines.append(f'{name}_bucket{_labels(labels, le=le)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(histogram["sum"])}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    lookups = {}
+    for (name, labels), value in counters.items():
+        if name == 'etu_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    series['etu_cache_hit_ratio'] = [
+        f'etu_cache_hit_ratio{_labels([("cache", cache)])} {_number(hits / total)}'
+        for cache, (hits, total) in sorted(lookups.items()) if total
+    ]
+
+    out = []
+    for name, (kind, help_text) in METRICS.items():
+        if series.get(name):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            out.extend(series[name])
+    return '\n'.join(out) + '\n'
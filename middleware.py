@@ -0,0 +1,121 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from . import metrics, profiling, routers
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests from a read replica.
+
+    Unsafe requests run entirely against the primary and set a short-lived
+    cookie so the same browser keeps reading from the primary until the
+    replicas have caught up with its own writes. If a replica fails while a
+    safe request is being handled, the replica is marked down and the view is
+    re-run against the primary.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    STICKY_COOKIE = 'etu_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in self.SAFE_METHODS:
+            with routers.primary_reads():
+                response = self.get_response(request)
+            if response.status_code < 400:
+                response.set_cookie(
+                    self.STICKY_COOKIE, '1',
+                    max_age=getattr(settings, 'ETU_REPLICA_STICKY_SECONDS', 15),
+                    httponly=True, samesite='Lax',
+                )
+            return response
+
+        if request.COOKIES.get(self.STICKY_COOKIE) or not routers.get_replicas():
+            with routers.primary_reads():
+                return self.get_response(request)
+
+        with routers.replica_reads():
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._replica_view = (view_func, view_args, view_kwargs)
+
+    def process_exception(self, request, exception):
+        alias = routers.current_read_alias()
+        if not isinstance(exception, DatabaseError) or alias in (None, DEFAULT_DB_ALIAS):
+            return None
+        if not hasattr(request, '_replica_view'):
+            return None
+        routers.mark_replica_down(alias)
+        view_func, view_args, view_kwargs = request._replica_view
+        with routers.primary_reads():
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile sampled or staff-requested requests; see ``profiling``.
+
+    Place it after AuthenticationMiddleware so the staff header can be checked.
+    Streaming responses are profiled up to the point the view returns.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profiling.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        with profiling.Profile(mode) as profile:
+            response = self.get_response(request)
+        try:
+            profile_id = profiling.save(profile, request, response)
+        except OSError:
+            # A full or read-only profile directory must not fail the request
+            logger.exception('Could not store request profile')
+            return response
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['X-ETU-Profile-Id'] = profile_id
+        return response
+
+
+class MetricsMiddleware:
+    """Record each request's latency, SQL queries and response size; see ``metrics``.
+
+    Put it first in MIDDLEWARE so the time includes the other middleware.
+    It runs natively under ASGI so result streams keep their coroutines.
+    There, queries run on executor threads and are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.QueryCounter() as queries:
+            response = self.get_response(request)
+        metrics.record_request(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        metrics.record_request(request, response, time.perf_counter() - started)
+        return response
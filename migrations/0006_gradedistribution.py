@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0005_student_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeDistribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(blank=True, max_length=32)),
+                ('grade', models.CharField(choices=[('A+', 'A+'), ('A', 'A'), ('A-', 'A-'), ('B+', 'B+'), ('B', 'B'), ('B-', 'B-'), ('C+', 'C+'), ('C', 'C'), ('C-', 'C-'), ('D', 'D'), ('F', 'F')], max_length=3)),
+                ('program', models.CharField(blank=True, max_length=128)),
+                ('department', models.CharField(blank=True, max_length=128)),
+                ('faculty', models.CharField(blank=True, max_length=128)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_distribution', to='eturesultapp.course')),
+            ],
+            options={
+                'unique_together': {('course', 'semester', 'grade', 'program', 'department', 'faculty')},
+            },
+        ),
+    ]
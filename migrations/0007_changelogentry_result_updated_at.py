@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0006_gradedistribution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model', 'id'], name='eturesultap_model_3086c9_idx'), models.Index(fields=['model', 'object_id'], name='eturesultap_model_db3b36_idx')],
+            },
+        ),
+    ]
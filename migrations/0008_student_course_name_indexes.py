@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0007_changelogentry_result_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['name'], name='eturesultap_name_797650_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last_name', 'first_name'], name='eturesultap_last_na_7e869b_idx'),
+        ),
+    ]
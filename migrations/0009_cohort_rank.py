@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0008_student_course_name_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('gpa', models.FloatField()),
+                ('credits', models.PositiveIntegerField()),
+                ('program_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('program_dense_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('program_percentile', models.FloatField(blank=True, null=True)),
+                ('program_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('department_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('department_dense_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('department_percentile', models.FloatField(blank=True, null=True)),
+                ('department_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('faculty_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('faculty_dense_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('faculty_percentile', models.FloatField(blank=True, null=True)),
+                ('faculty_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_rank', to='eturesultapp.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entry_year'], name='eturesultap_entry_y_c923dc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0009_cohort_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcademicStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('standing', models.CharField(choices=[('deans_list', "Dean's list"), ('good', 'Good standing'), ('probation', 'Probation')], max_length=16)),
+                ('term_gpa', models.FloatField(blank=True, null=True)),
+                ('cumulative_gpa', models.FloatField(blank=True, null=True)),
+                ('term_credits', models.PositiveIntegerField(default=0)),
+                ('credits_earned', models.PositiveIntegerField(default=0)),
+                ('graduation_eligible', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='eturesultapp.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'standing'], name='eturesultap_term_7e937d_idx')],
+                'unique_together': {('student', 'term')},
+            },
+        ),
+    ]
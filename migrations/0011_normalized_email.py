@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:25
+
+import django.db.models.functions.text
+import eturesultapp.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+USER_EMAIL_INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+
+
+def normalize_student_emails(apps, schema_editor):
+    Student = apps.get_model('eturesultapp', 'Student')
+    Student.objects.exclude(email=None).update(email=Lower(Trim('email')))
+
+
+def add_user_email_index(apps, schema_editor):
+    # auth_user belongs to another app, so its index is managed here.
+    # Backends without expression indexes skip it.
+    schema_editor.add_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+def remove_user_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model(settings.AUTH_USER_MODEL), USER_EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0010_academic_standing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='email',
+            field=eturesultapp.models.NormalizedEmailField(blank=True, max_length=254, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='student_email_lower_idx'),
+        ),
+        migrations.RunPython(normalize_student_emails, migrations.RunPython.noop),
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
@@ -0,0 +1,180 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:38
+
+import re
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Coalesce
+
+SEMESTER_MODELS = ('Course', 'Result', 'GradeDistribution', 'AcademicStanding')
+
+# Frozen copies of the term parsing in models.py as it was when this
+# migration was written; later changes there must not alter what it does.
+TERM_NAMES = {1: 'Spring', 2: 'Fall'}
+TERM_NUMBERS = {'spring': 1, 'first': 1, 'fall': 2, 'autumn': 2, 'second': 2}
+TERM_MONTHS = {1: (1, 7), 2: (8, 12)}
+_NUMBERED_TERM = re.compile(r'^(\d{4})\s*[-/ ]\s*(?:s|sem|semester)?\s*([12])$', re.IGNORECASE)
+_NAMED_TERM = re.compile(r'^([a-z]+)(?:\s+semester)?\s*,?\s*(\d{4})$|^(\d{4})\s+([a-z]+)$', re.IGNORECASE)
+
+
+def parse_term(value):
+    value = (value or '').strip()
+    match = _NUMBERED_TERM.match(value)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = _NAMED_TERM.match(value)
+    if match:
+        season, year = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        number = TERM_NUMBERS.get(season.lower())
+        if number:
+            return int(year), number
+    return None
+
+
+def term_code(year, number):
+    return f'{year}-{number}'
+
+
+def _term_for(terms, value, cache):
+    value = (value or '').strip()
+    if not value:
+        return None
+    if value not in cache:
+        parsed = parse_term(value)
+        if parsed is None:
+            cache[value] = terms.get_or_create(code=value[:32], defaults={'name': value[:64]})[0]
+        else:
+            year, number = parsed
+            first_month, last_month = TERM_MONTHS[number]
+            cache[value] = terms.get_or_create(code=term_code(year, number), defaults={
+                'name': f'{TERM_NAMES[number]} {year}',
+                'ordinal': year * 2 + number - 1,
+                'start_date': date(year, first_month, 1),
+                'end_date': date(year, last_month, 31),
+            })[0]
+    return cache[value]
+
+
+def semesters_to_terms(apps, schema_editor):
+    db = schema_editor.connection.alias
+    terms = apps.get_model('eturesultapp', 'Term').objects.using(db)
+    cache = {}
+    # The grade cube is rebuilt below rather than mapped.
+    for model_name in ('Course', 'Result', 'AcademicStanding'):
+        objects = apps.get_model('eturesultapp', model_name).objects.using(db)
+        for value in objects.values_list('semester', flat=True).distinct().order_by():
+            term = _term_for(terms, value, cache)
+            if term is not None:
+                objects.filter(semester=value).update(term=term)
+
+    # "Fall 2025" and "2025-2" are now the same term; refuse to merge two grades for one course.
+    results = apps.get_model('eturesultapp', 'Result').objects.using(db)
+    clashes = list(
+        results.values('student_id', 'course_id', 'term_id').annotate(n=Count('id')).filter(n__gt=1)[:10]
+    )
+    if clashes:
+        raise RuntimeError(
+            'These (student, course, term) combinations have several results under different '
+            f'spellings of the same semester; resolve them before migrating: {clashes}'
+        )
+
+    # Standing rows are derived; keep the newest of any that merged.
+    standings = apps.get_model('eturesultapp', 'AcademicStanding').objects.using(db)
+    standings.filter(term__isnull=True).delete()
+    for row in standings.values('student_id', 'term_id').annotate(n=Count('id'), keep=Max('id')).filter(n__gt=1):
+        standings.filter(student_id=row['student_id'], term_id=row['term_id']).exclude(pk=row['keep']).delete()
+
+    # Rebuild the grade cube per term rather than merging cells.
+    GradeDistribution = apps.get_model('eturesultapp', 'GradeDistribution')
+    GradeDistribution.objects.using(db).all().delete()
+    codes = dict(terms.values_list('pk', 'code'))
+    rows = (
+        results
+        .annotate(
+            cohort_program=Coalesce('student__program', Value('')),
+            cohort_department=Coalesce('student__department', Value('')),
+            cohort_faculty=Coalesce('student__faculty', Value('')),
+        )
+        .values('course_id', 'term_id', 'grade', 'cohort_program', 'cohort_department', 'cohort_faculty')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    GradeDistribution.objects.using(db).bulk_create([
+        GradeDistribution(
+            course_id=row['course_id'], term_id=row['term_id'], grade=row['grade'],
+            semester=codes.get(row['term_id'], ''),  # the old unique constraint is still in place
+            program=row['cohort_program'], department=row['cohort_department'],
+            faculty=row['cohort_faculty'], count=row['n'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+def terms_to_semesters(apps, schema_editor):
+    db = schema_editor.connection.alias
+    codes = apps.get_model('eturesultapp', 'Term').objects.using(db).values_list('pk', 'code')
+    for model_name in SEMESTER_MODELS:
+        objects = apps.get_model('eturesultapp', model_name).objects.using(db)
+        for term_id, code in codes:
+            objects.filter(term_id=term_id).update(semester=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0012_outbound_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=32, unique=True)),
+                ('name', models.CharField(blank=True, max_length=64)),
+                ('ordinal', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['ordinal', 'code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='eturesultapp.term', verbose_name='semester'),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='results', to='eturesultapp.term', verbose_name='semester'),
+        ),
+        migrations.AddField(
+            model_name='gradedistribution',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='eturesultapp.term'),
+        ),
+        migrations.RemoveIndex(
+            model_name='academicstanding',
+            name='eturesultap_term_7e937d_idx',
+        ),
+        migrations.RenameField(
+            model_name='academicstanding',
+            old_name='term',
+            new_name='semester',
+        ),
+        migrations.AlterField(
+            model_name='academicstanding',
+            name='semester',
+            field=models.CharField(default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='academicstanding',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='eturesultapp.term'),
+        ),
+        migrations.RunPython(semesters_to_terms, terms_to_semesters),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0013_term'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='result',
+            name='eturesultap_student_45cdc9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='result',
+            name='eturesultap_course__588a94_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='academicstanding',
+            unique_together={('student', 'term')},
+        ),
+        migrations.RemoveField(
+            model_name='course',
+            name='semester',
+        ),
+        migrations.AlterUniqueTogether(
+            name='gradedistribution',
+            unique_together={('course', 'term', 'grade', 'program', 'department', 'faculty')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='result',
+            unique_together={('student', 'course', 'term')},
+        ),
+        migrations.AlterField(
+            model_name='academicstanding',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='eturesultapp.term'),
+        ),
+        migrations.AddIndex(
+            model_name='academicstanding',
+            index=models.Index(fields=['term', 'standing'], name='eturesultap_term_id_ebfbe8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['student', 'term'], name='eturesultap_student_d81073_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['course', 'term'], name='eturesultap_course__1165eb_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='academicstanding',
+            name='semester',
+        ),
+        migrations.RemoveField(
+            model_name='gradedistribution',
+            name='semester',
+        ),
+        migrations.RemoveField(
+            model_name='result',
+            name='semester',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0014_remove_semester'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='grade_code',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(grade='F', then=models.Value(0)), models.When(grade='D', then=models.Value(1)), models.When(grade='C-', then=models.Value(2)), models.When(grade='C', then=models.Value(3)), models.When(grade='C+', then=models.Value(4)), models.When(grade='B-', then=models.Value(5)), models.When(grade='B', then=models.Value(6)), models.When(grade='B+', then=models.Value(7)), models.When(grade='A-', then=models.Value(8)), models.When(grade='A', then=models.Value(9)), models.When(grade='A+', then=models.Value(10)), output_field=models.PositiveSmallIntegerField()), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='grade_points',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(grade='A+', then=models.Value(4.0)), models.When(grade='A', then=models.Value(4.0)), models.When(grade='A-', then=models.Value(3.7)), models.When(grade='B+', then=models.Value(3.3)), models.When(grade='B', then=models.Value(3.0)), models.When(grade='B-', then=models.Value(2.7)), models.When(grade='C+', then=models.Value(2.3)), models.When(grade='C', then=models.Value(2.0)), models.When(grade='C-', then=models.Value(1.7)), models.When(grade='D', then=models.Value(1.0)), models.When(grade='F', then=models.Value(0.0)), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0015_result_grade_points'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['recorded_at', 'id'], name='eturesultap_recorde_3499f2_idx'),
+        ),
+    ]
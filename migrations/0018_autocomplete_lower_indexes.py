@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:35
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0017_publication'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='course',
+            name='eturesultap_name_797650_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='eturesultap_last_na_7e869b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='course_code_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='course_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='student_last_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='student_first_name_lower_idx'),
+        ),
+    ]
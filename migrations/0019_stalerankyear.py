@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0018_autocomplete_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRankYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_year', models.PositiveSmallIntegerField(unique=True)),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eturesultapp', '0019_stalerankyear'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='claimed_by',
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+    ]
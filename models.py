@@ -1,5 +1,160 @@
+import re
+from datetime import date
+
 from django.db import models
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Lower, Round
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D': 1.0, 'F': 0.0
+}
+FAILING_GRADES = ('F',)
+# Stored on Result as ``grade_code``; ordering by it orders by grade
+GRADE_CODES = {
+    'F': 0, 'D': 1,
+    'C-': 2, 'C': 3, 'C+': 4,
+    'B-': 5, 'B': 6, 'B+': 7,
+    'A-': 8, 'A': 9, 'A+': 10,
+}
+
+
+def grade_case(values, output_field):
+    """SQL ``CASE grade WHEN ... END`` mapping each letter grade through ``values``."""
+    return Case(
+        *[When(grade=grade, then=Value(value)) for grade, value in values.items()],
+        output_field=output_field,
+    )
+
+
+def normalize_email(email):
+    """Trim and lowercase an address; emails are matched case-insensitively."""
+    return email.strip().lower() if email else email
+
+
+class NormalizedEmailField(models.EmailField):
+    """EmailField that is stored, and compared in lookups, normalized."""
+
+    def pre_save(self, model_instance, add):
+        value = normalize_email(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+    def get_prep_value(self, value):
+        return normalize_email(super().get_prep_value(value))
+
+
+# Two terms a year, matching the old get_current_semester(): 1 = January-July, 2 = August-December
+TERM_NAMES = {1: 'Spring', 2: 'Fall'}
+TERM_NUMBERS = {'spring': 1, 'first': 1, 'fall': 2, 'autumn': 2, 'second': 2}
+TERM_MONTHS = {1: (1, 7), 2: (8, 12)}
+_NUMBERED_TERM = re.compile(r'^(\d{4})\s*[-/ ]\s*(?:s|sem|semester)?\s*([12])$', re.IGNORECASE)
+_NAMED_TERM = re.compile(r'^([a-z]+)(?:\s+semester)?\s*,?\s*(\d{4})$|^(\d{4})\s+([a-z]+)$', re.IGNORECASE)
+
+
+def parse_term(value):
+    """``(year, number)`` for "2025-2", "2025/2", "Fall 2025", "2025 Spring"...; None if unrecognised."""
+    value = (value or '').strip()
+    match = _NUMBERED_TERM.match(value)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = _NAMED_TERM.match(value)
+    if match:
+        season, year = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        number = TERM_NUMBERS.get(season.lower())
+        if number:
+            return int(year), number
+    return None
+
+
+def term_code(year, number):
+    return f'{year}-{number}'
+
+
+def canonical_term_code(value):
+    """The code a semester string is stored under: "Fall 2025" -> "2025-2"."""
+    parsed = parse_term(value)
+    return term_code(*parsed) if parsed else (value or '').strip()
+
+
+def term_for_date(day):
+    """``(year, number)`` of the term ``day`` falls in."""
+    return day.year, 2 if day.month >= TERM_MONTHS[2][0] else 1
+
+
+_current_term = {}
+
+
+class TermManager(models.Manager):
+
+    def resolve(self, value):
+        """The Term for a semester string, created on first use; None for a blank value.
+
+        Recognised spellings share one row; anything else is kept verbatim as
+        an undated term.
+        """
+        value = (value or '').strip()
+        if not value:
+            return None
+        parsed = parse_term(value)
+        if parsed is None:
+            return self.get_or_create(code=value[:32], defaults={'name': value[:64]})[0]
+        year, number = parsed
+        first_month, last_month = TERM_MONTHS[number]
+        return self.get_or_create(code=term_code(year, number), defaults={
+            'name': f'{TERM_NAMES[number]} {year}',
+            'ordinal': year * 2 + number - 1,
+            'start_date': date(year, first_month, 1),
+            'end_date': date(year, last_month, 31),  # July and December
+        })[0]
+
+    def find(self, value):
+        """The existing Term for a semester string, or None."""
+        return self.filter(code=canonical_term_code(value)).first()
+
+    def current(self):
+        """Today's term, created on first use and cached per process for the day."""
+        today = timezone.localdate()
+        if today not in _current_term:
+            _current_term.clear()
+            _current_term[today] = self.resolve(term_code(*term_for_date(today)))
+        return _current_term[today]
+
+    def clear_cache(self):
+        _current_term.clear()
+
+
+class Term(models.Model):
+    """An academic term. ``ordinal`` increases by one per term so terms sort and
+    range-filter chronologically; it is null for undated, free-text terms."""
+    code = models.CharField(max_length=32, unique=True)
+    name = models.CharField(max_length=64, blank=True)
+    ordinal = models.IntegerField(null=True, blank=True, db_index=True)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+
+    objects = TermManager()
+
+    class Meta:
+        ordering = ['ordinal', 'code']
+
+    def __str__(self) -> str:
+        return self.name or self.code
+
+
+def _semester_property():
+    def get(self):
+        return self.term.code if self.term_id else ''
+
+    def set(self, value):
+        self.term = Term.objects.resolve(value)
+
+    return property(get, set, doc='Term code ("2025-2"); assigning any recognised spelling sets ``term``.')
 
 
 class Lecturer(models.Model):
@@ -18,38 +173,53 @@ class Lecturer(models.Model):
         ]
 
 
+class StudentQuerySet(models.QuerySet):
+
+    def with_gpa(self):
+        """Annotate ``graded_credits`` and credit-weighted ``gpa`` (null without results) in SQL."""
+        return self.annotate(
+            graded_credits=Sum('results__course__credits'),
+            gpa=Round(
+                Sum(F('results__grade_points') * F('results__course__credits')) / Sum('results__course__credits'),
+                2, output_field=FloatField(),
+            ),
+        )
+
+
 class Student(models.Model):
     # Optional link to Django User for stronger identity mapping
     user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True)
     student_id = models.CharField(max_length=20, unique=True)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
-    email = models.EmailField(blank=True, null=True)
+    email = NormalizedEmailField(blank=True, null=True)
     program = models.CharField(max_length=128, blank=True, null=True)
     department = models.CharField(max_length=128, blank=True, null=True)
     faculty = models.CharField(max_length=128, blank=True, null=True)
     enrollment_date = models.DateField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
 
+    objects = StudentQuerySet.as_manager()
+
     class Meta:
         ordering = ['student_id', 'last_name', 'first_name']
+        indexes = [
+            # Autocomplete prefix searches are range scans on these
+            models.Index(Lower('last_name'), name='student_last_name_lower_idx'),
+            models.Index(Lower('first_name'), name='student_first_name_lower_idx'),
+            models.Index(Lower('email'), name='student_email_lower_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.student_id} - {self.last_name}, {self.first_name}"
 
-    def calculate_gpa(self):
-        grades = self.results.all()
-        if not grades:
-            return 0.0
-        grade_points = {
-            'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-            'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-            'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-            'D': 1.0, 'F': 0.0
-        }
-        total_points = sum(grade_points.get(g.grade, 0) * g.course.credits for g in grades)
-        total_credits = sum(g.course.credits for g in grades)
-        return round(total_points / total_credits, 2) if total_credits else 0.0
+    def calculate_gpa(self, results=None):
+        """Credit-weighted GPA of ``results`` (default: this student's published results)."""
+        results = self.results.published() if results is None else results
+        totals = results.aggregate(
+            points=Sum(F('grade_points') * F('course__credits')), credits=Sum('course__credits'),
+        )
+        return round(totals['points'] / totals['credits'], 2) if totals['credits'] else 0.0
 
 
 class Course(models.Model):
@@ -57,16 +227,38 @@ class Course(models.Model):
     name = models.CharField(max_length=200)
     credits = models.PositiveSmallIntegerField(default=3)
     description = models.TextField(blank=True)
-    semester = models.CharField(max_length=32, blank=True)
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, null=True, blank=True, related_name='courses', verbose_name='semester')
     is_active = models.BooleanField(default=True)
 
+    semester = _semester_property()
+
     class Meta:
         ordering = ['code']
+        indexes = [
+            models.Index(Lower('code'), name='course_code_lower_idx'),
+            models.Index(Lower('name'), name='course_name_lower_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.code} - {self.name}"
 
 
+class ResultQuerySet(models.QuerySet):
+
+    def published(self, releasing=()):
+        """Results students may see: all but those of (course, term) pairs held as drafts.
+
+        ``releasing`` lists draft Publication pks to count as published already;
+        ``publication.publish`` uses it to warm caches before the flip.
+        """
+        drafts = Publication.objects.filter(
+            course=models.OuterRef('course'), term=models.OuterRef('term'), published_at__isnull=True,
+        )
+        if releasing:
+            drafts = drafts.exclude(pk__in=releasing)
+        return self.exclude(models.Exists(drafts))
+
+
 class Result(models.Model):
     GRADE_CHOICES = [
         ('A+', 'A+'), ('A', 'A'), ('A-', 'A-'),
@@ -78,27 +270,256 @@ class Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='results')
     course = models.ForeignKey(Course, on_delete=models.PROTECT, related_name='results')
     grade = models.CharField(max_length=3, choices=GRADE_CHOICES)
-    semester = models.CharField(max_length=32, blank=True)
+    # Computed by the database from ``grade``, so every write path (bulk ones
+    # and queryset.update() included) keeps them in step; GPA sums use these
+    grade_code = models.GeneratedField(
+        expression=grade_case(GRADE_CODES, models.PositiveSmallIntegerField()),
+        output_field=models.PositiveSmallIntegerField(), db_persist=True,
+    )
+    grade_points = models.GeneratedField(
+        expression=grade_case(GRADE_POINTS, FloatField()),
+        output_field=FloatField(), db_persist=True,
+    )
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, null=True, blank=True, related_name='results', verbose_name='semester')
     recorded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     remarks = models.TextField(blank=True, help_text="Any additional notes about this result")
 
+    semester = _semester_property()
+
+    objects = ResultQuerySet.as_manager()
+
     class Meta:
-        unique_together = ('student', 'course', 'semester')
+        unique_together = ('student', 'course', 'term')
         ordering = ['-recorded_at']
         indexes = [
-            models.Index(fields=['student', 'semester']),
-            models.Index(fields=['course', 'semester']),
+            models.Index(fields=['student', 'term']),
+            models.Index(fields=['course', 'term']),
             models.Index(fields=['grade']),
+            models.Index(fields=['recorded_at', 'id']),
         ]
 
     def __str__(self) -> str:
         return f"{self.student} | {self.course} : {self.grade} ({self.semester})"
-        
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # An UPDATE does not return the recomputed columns; defer them so they reload on access
+        for name in ('grade_code', 'grade_points'):
+            self.__dict__.pop(name, None)
+
     def get_grade_points(self):
-        grade_points = {
-            'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-            'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-            'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-            'D': 1.0, 'F': 0.0
-        }
-        return grade_points.get(self.grade, 0)
+        return GRADE_POINTS.get(self.grade, 0)
+
+
+class PublicationManager(models.Manager):
+
+    def hold(self, pairs):
+        """Create draft rows for the ``(course_id, term_id)`` pairs that have no row yet."""
+        pairs = {(course_id, term_id) for course_id, term_id in pairs if term_id is not None}
+        if pairs:
+            self.bulk_create(
+                [Publication(course_id=course_id, term_id=term_id) for course_id, term_id in pairs],
+                ignore_conflicts=True,
+            )
+
+    def draft_pairs(self, pairs):
+        """The ``(course_id, term_id)`` pairs among ``pairs`` whose results are unpublished drafts."""
+        condition = models.Q()
+        for course_id, term_id in set(pairs):
+            if term_id is not None:
+                condition |= models.Q(course_id=course_id, term_id=term_id)
+        if not condition:
+            return set()
+        return set(self.filter(condition, published_at__isnull=True).values_list('course_id', 'term_id'))
+
+
+class Publication(models.Model):
+    """Release state of one course's results for one term.
+
+    While ``published_at`` is null the pair is a draft: its results are
+    recorded and visible to staff but left out of ``Result.objects.published()``,
+    which is all students see. Pairs without a row are published. With
+    ``ETU_STAGED_PUBLICATION`` on, the first result recorded for a pair
+    creates its draft row; ``publication.publish`` releases drafts at once.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='publications')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='+')
+    published_at = models.DateTimeField(null=True, blank=True)
+    published_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PublicationManager()
+
+    class Meta:
+        unique_together = ('course', 'term')
+        indexes = [models.Index(fields=['term', 'published_at'])]
+
+    def __str__(self) -> str:
+        return f"{self.course.code} {self.term.code} ({'published' if self.is_published else 'draft'})"
+
+    @property
+    def is_published(self):
+        return self.published_at is not None
+
+
+class GradeDistribution(models.Model):
+    """Number of results per (course, term, grade, cohort) cell.
+
+    Kept up to date by the Result/Student signals in ``signals.py`` and
+    rebuilt from scratch by ``manage.py rebuild_grade_stats``.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grade_distribution')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    grade = models.CharField(max_length=3, choices=Result.GRADE_CHOICES)
+    program = models.CharField(max_length=128, blank=True)
+    department = models.CharField(max_length=128, blank=True)
+    faculty = models.CharField(max_length=128, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('course', 'term', 'grade', 'program', 'department', 'faculty')
+
+    def __str__(self) -> str:
+        return f"{self.course_id} {self.term_id} {self.grade}: {self.count}"
+
+
+class CohortRank(models.Model):
+    """A student's GPA standing within their program, department and faculty.
+
+    Cohorts are students of the same program (department, faculty) and the
+    same entry year. Rows are written by ``ranking.refresh_cohort_ranks``
+    after grade changes; the ``<scope>_*`` columns are null when the student
+    has no value for that cohort field. ``<scope>_percentile`` is the share
+    of the cohort (0-100) with the same or a lower GPA.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='cohort_rank')
+    entry_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    gpa = models.FloatField()
+    credits = models.PositiveIntegerField()
+    program_rank = models.PositiveIntegerField(null=True, blank=True)
+    program_dense_rank = models.PositiveIntegerField(null=True, blank=True)
+    program_percentile = models.FloatField(null=True, blank=True)
+    program_size = models.PositiveIntegerField(null=True, blank=True)
+    department_rank = models.PositiveIntegerField(null=True, blank=True)
+    department_dense_rank = models.PositiveIntegerField(null=True, blank=True)
+    department_percentile = models.FloatField(null=True, blank=True)
+    department_size = models.PositiveIntegerField(null=True, blank=True)
+    faculty_rank = models.PositiveIntegerField(null=True, blank=True)
+    faculty_dense_rank = models.PositiveIntegerField(null=True, blank=True)
+    faculty_percentile = models.FloatField(null=True, blank=True)
+    faculty_size = models.PositiveIntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entry_year']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.student_id}: {self.gpa}"
+
+    def standings(self):
+        """``[(scope, rank, dense_rank, percentile, size)]`` for the scopes that apply."""
+        return [
+            (scope, getattr(self, f'{scope}_rank'), getattr(self, f'{scope}_dense_rank'),
+             getattr(self, f'{scope}_percentile'), getattr(self, f'{scope}_size'))
+            for scope in ('program', 'department', 'faculty')
+            if getattr(self, f'{scope}_rank') is not None
+        ]
+
+
+class StaleRankYear(models.Model):
+    """An entry year whose CohortRank rows are out of date.
+
+    Grade and student changes write the mark once their transaction commits;
+    ``ranking.refresh_stale_ranks`` recomputes the marked years and removes
+    the marks. Year 0 stands for students without an enrollment date.
+    """
+    entry_year = models.PositiveSmallIntegerField(unique=True)
+    marked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.entry_year)
+
+
+class AcademicStanding(models.Model):
+    """End-of-term standing of a student, written by ``standing.evaluate_term``."""
+    DEANS_LIST = 'deans_list'
+    GOOD = 'good'
+    PROBATION = 'probation'
+    STANDING_CHOICES = [
+        (DEANS_LIST, "Dean's list"),
+        (GOOD, 'Good standing'),
+        (PROBATION, 'Probation'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='standings')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='+')
+    standing = models.CharField(max_length=16, choices=STANDING_CHOICES)
+    term_gpa = models.FloatField(null=True, blank=True)
+    cumulative_gpa = models.FloatField(null=True, blank=True)
+    term_credits = models.PositiveIntegerField(default=0)
+    credits_earned = models.PositiveIntegerField(default=0)
+    graduation_eligible = models.BooleanField(default=False)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'term')
+        indexes = [
+            models.Index(fields=['term', 'standing']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.student_id} {self.term_id}: {self.get_standing_display()}"
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only record of writes to Result, Student and Course.
+
+    The primary key doubles as the change-feed cursor. Create and update
+    entries are upserts for consumers; only the latest entry per object is
+    meaningful, which is what ``compact_change_log`` relies on.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTION_CHOICES = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model', 'id']),
+            models.Index(fields=['model', 'object_id']),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.action} {self.model}:{self.object_id}"
+
+
+class OutboundEmail(models.Model):
+    """Mail queued for later delivery by ``manage.py send_queued_mail``."""
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set by the sender delivering the message; see outbox.claim
+    claimed_by = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['sent_at', 'id']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.to}: {self.subject}"
@@ -0,0 +1,80 @@
+"""Outgoing mail queued in the database and delivered out of band.
+
+Bulk operations (roster imports) call ``queue_mail`` instead of sending
+during the request; ``python manage.py send_queued_mail`` (cron, or
+``--interval N``) delivers pending messages in batches over one SMTP
+connection.
+
+Each sender claims its batch with a conditional UPDATE before sending, so
+senders running at the same time never deliver a message twice. A claim
+older than ``ETU_OUTBOX_CLAIM_TIMEOUT`` seconds (default 900) belongs to a
+sender that died mid-batch and may be taken over.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+MAX_ATTEMPTS = 5
+
+
+def queue_mail(messages, batch_size=1000):
+    """Queue ``(to, subject, body)`` triples in bulk; return the rows created."""
+    return OutboundEmail.objects.bulk_create(
+        [OutboundEmail(to=to, subject=subject, body=body) for to, subject, body in messages],
+        batch_size=batch_size,
+    )
+
+
+def pending(max_attempts=MAX_ATTEMPTS):
+    return OutboundEmail.objects.filter(sent_at__isnull=True, attempts__lt=max_attempts)
+
+
+def _claimable(max_attempts):
+    expired = timezone.now() - timedelta(seconds=getattr(settings, 'ETU_OUTBOX_CLAIM_TIMEOUT', 900))
+    return pending(max_attempts).filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired))
+
+
+def claim(limit=500, max_attempts=MAX_ATTEMPTS):
+    """Claim up to ``limit`` pending messages for this sender and return them."""
+    candidates = list(_claimable(max_attempts).values_list('pk', flat=True)[:limit])
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    # The UPDATE re-checks the claim per row, so a row another sender took
+    # after the SELECT above is skipped rather than claimed twice.
+    _claimable(max_attempts).filter(pk__in=candidates).update(claimed_by=token, claimed_at=timezone.now())
+    return list(OutboundEmail.objects.filter(claimed_by=token))
+
+
+def send_queued(limit=500, max_attempts=MAX_ATTEMPTS):
+    """Deliver up to ``limit`` pending messages and return ``(sent, failed)``.
+
+    A message that fails is retried on later runs until ``max_attempts``.
+    """
+    batch = claim(limit, max_attempts)
+    if not batch:
+        return 0, 0
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@example.com')
+    sent, failed = [], {}
+    with get_connection() as connection:
+        for mail in batch:
+            try:
+                EmailMessage(mail.subject, mail.body, from_email, [mail.to], connection=connection).send()
+            except Exception as exc:
+                failed[mail.pk] = str(exc)
+            else:
+                sent.append(mail.pk)
+    OutboundEmail.objects.filter(pk__in=sent).update(
+        sent_at=timezone.now(), attempts=F('attempts') + 1, claimed_by='', claimed_at=None,
+    )
+    for pk, error in failed.items():
+        OutboundEmail.objects.filter(pk=pk).update(
+            attempts=F('attempts') + 1, last_error=error, claimed_by='', claimed_at=None,
+        )
+    return len(sent), len(failed)
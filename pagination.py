@@ -0,0 +1,220 @@
+"""Keyset ("seek") pagination for the HTML list views.
+
+Django's Paginator counts the whole queryset on every page and reaches page
+N with ``OFFSET (N - 1) * size``, so deep pages scan and throw away every row
+before them. KeysetPaginator orders on a unique key such as
+``('student_id',)`` or ``('-recorded_at', '-id')`` and fetches the rows after
+(or before) the key of the last (or first) row shown. An index on the key
+columns answers page 5,000 as quickly as page 1. Pages are addressed with
+opaque ``?after=`` / ``?before=`` cursors instead of numbers and no COUNT is
+run; ``approximate_count`` gives an optional total for the page header.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.http import Http404, QueryDict
+
+AFTER = 'after'
+BEFORE = 'before'
+LAST = 'last'
+
+
+def _dump(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()  # full precision; DjangoJSONEncoder drops microseconds
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """One page of rows plus the cursors and query strings for its neighbours."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous, query):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._query = query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return self.paginator.cursor_for(self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.cursor_for(self.object_list[0]) if self._has_previous else None
+
+    def _url(self, name=None, cursor=None):
+        query = self._query.copy()
+        for param in (AFTER, BEFORE, LAST):
+            query.pop(param, None)
+        if name:
+            query[name] = cursor
+        return '?' + query.urlencode()
+
+    @property
+    def first_url(self):
+        return self._url()
+
+    @property
+    def last_url(self):
+        return self._url(LAST, '1')
+
+    @property
+    def next_url(self):
+        return self._url(AFTER, self.next_cursor) if self._has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url(BEFORE, self.previous_cursor) if self._has_previous else None
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` on ``ordering``, whose last field must be unique and none nullable."""
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        opts = queryset.model._meta
+        self.fields = [opts.pk if name == 'pk' else opts.get_field(name) for name, _ in self.keys]
+
+    def cursor_for(self, obj):
+        values = [_dump(getattr(obj, field.attname)) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Key values of ``cursor``; raises ValueError if it is malformed."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError('wrong number of key values')
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError) as exc:
+            raise ValueError('Invalid cursor') from exc
+
+    def _ordering(self, forward):
+        return [f'{"-" if descending == forward else ""}{name}' for name, descending in self.keys]
+
+    def _seek(self, values, forward):
+        """Rows strictly after ``values`` in the paginator's order (before it if not ``forward``)."""
+        condition = Q()
+        for i, ((name, descending), value) in enumerate(zip(self.keys, values)):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = {prefix: prefix_value for (prefix, _), prefix_value in zip(self.keys[:i], values[:i])}
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        return condition
+
+    def page(self, after=None, before=None, last=False, query=None):
+        """The page after cursor ``after``, before cursor ``before``, the last page or the first."""
+        query = query if query is not None else QueryDict()
+        if before or last:
+            queryset = self.queryset
+            if before:
+                queryset = queryset.filter(self._seek(self.decode(before), forward=False))
+            rows = list(queryset.order_by(*self._ordering(forward=False))[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            return KeysetPage(rows[:self.per_page][::-1], self, bool(before), has_previous, query)
+        queryset = self.queryset
+        if after:
+            queryset = queryset.filter(self._seek(self.decode(after), forward=True))
+        rows = list(queryset.order_by(*self._ordering(forward=True))[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, bool(after), query)
+
+
+_ESTIMATES = {
+    'postgresql': "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+    'microsoft': (
+        "SELECT SUM(row_count) FROM sys.dm_db_partition_stats "
+        "WHERE object_id = OBJECT_ID(%s) AND index_id IN (0, 1)"
+    ),
+}
+
+
+def _table_estimate(queryset):
+    connection = connections[queryset.db]
+    sql = _ESTIMATES.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            cursor.execute(sql, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+def approximate_count(queryset):
+    """Roughly how many rows ``queryset`` has, without counting on every request.
+
+    Unfiltered querysets use the planner's table statistics on PostgreSQL and
+    SQL Server. Otherwise the COUNT is cached for ``ETU_APPROX_COUNT_TIMEOUT``
+    seconds (default 300) per distinct query.
+    """
+    if not queryset.query.has_filters():
+        estimate = _table_estimate(queryset)
+        if estimate is not None:
+            return estimate
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'etu:count:' + hashlib.sha1(f'{queryset.db}|{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'ETU_APPROX_COUNT_TIMEOUT', 300))
+    return count
+
+
+class KeysetPaginationMixin:
+    """ListView mixin replacing numbered pages with keyset pages.
+
+    Set ``paginate_by`` and ``keyset_ordering``; the template gets ``page_obj``
+    (a KeysetPage with ``first_url``/``previous_url``/``next_url``/``last_url``),
+    ``is_paginated`` and, with ``approximate_total``, ``approximate_total``.
+    """
+    keyset_ordering = None
+    approximate_total = True
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        params = self.request.GET
+        try:
+            page = paginator.page(
+                after=params.get(AFTER), before=params.get(BEFORE), last=bool(params.get(LAST)), query=params,
+            )
+        except ValueError as exc:
+            raise Http404(str(exc))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.approximate_total and context.get('paginator') is not None:
+            context['approximate_total'] = approximate_count(context['paginator'].queryset)
+        return context
@@ -0,0 +1,245 @@
+"""Opt-in request profiling for production.
+
+``middleware.ProfilingMiddleware`` profiles a random sample of requests
+(``ETU_PROFILE_SAMPLE_RATE``, default 0) plus any request from a staff user
+that carries the ``X-ETU-Profile`` header (value ``sample`` or ``cprofile``
+picks the mode). Each profile records the request, every SQL query with its
+duration and either
+
+* ``sample`` (default): a background thread samples the request thread's
+  stack every ``ETU_PROFILE_INTERVAL`` seconds into collapsed stacks, the
+  input format of flamegraph.pl and speedscope; or
+* ``cprofile``: deterministic cProfile function statistics (slower).
+
+Profiles are written as gzipped JSON to ``ETU_PROFILE_DIR`` with a small
+``.meta.json`` sidecar for listing, keeping the newest ``ETU_PROFILE_KEEP``.
+Staff can browse them at ``/profiles/``.
+"""
+import cProfile
+import gzip
+import json
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+MODES = (SAMPLE, CPROFILE)
+MAX_QUERIES = 200
+MAX_FUNCTIONS = 60
+
+
+def _setting(name, default):
+    return getattr(settings, f'ETU_PROFILE_{name}', default)
+
+
+def profile_dir():
+    configured = _setting('DIR', None)
+    if configured:
+        return Path(configured)
+    return Path(getattr(settings, 'BASE_DIR', tempfile.gettempdir())) / 'profiles'
+
+
+def requested_mode(request):
+    """The mode to profile ``request`` with, or None to leave it alone."""
+    header = 'HTTP_' + _setting('HEADER', 'X-ETU-Profile').upper().replace('-', '_')
+    value = request.META.get(header)
+    user = getattr(request, 'user', None)
+    if value is not None and user is not None and user.is_staff:
+        return value if value in MODES else _setting('MODE', SAMPLE)
+    rate = _setting('SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        return _setting('MODE', SAMPLE)
+    return None
+
+
+def _label(filename, function):
+    # Last two path components keep labels short but unambiguous
+    filename = filename.replace('\\', '/')
+    return f"{'/'.join(filename.rsplit('/', 2)[-2:])}:{function}"
+
+
+class StackSampler:
+    """Sample one thread's Python stack on a timer into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='etu-profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_label(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+class Profile:
+    """Context manager capturing SQL timings plus stack samples or cProfile stats."""
+
+    def __init__(self, mode=SAMPLE):
+        self.mode = mode
+        self.queries = []
+        self.duration = 0.0
+        self._profiler = None
+        self._sampler = None
+
+    def _record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql[:2000],
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'many': many,
+            })
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self._record_query))
+        if self.mode == CPROFILE:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler is active in this process (Python 3.12+ allows only one)
+                self._profiler, self.mode = None, SAMPLE
+        if self.mode == SAMPLE:
+            self._sampler = StackSampler(threading.get_ident(), _setting('INTERVAL', 0.005))
+            self._sampler.start()
+        self.started_at = timezone.now()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self._wrappers.close()
+        return False
+
+    def functions(self):
+        """Top cProfile rows by cumulative time."""
+        if self._profiler is None:
+            return []
+        rows = [
+            {
+                'function': f'{_label(key[0], key[2])}:{key[1]}',
+                'calls': calls, 'primitive_calls': primitive,
+                'tottime_ms': round(tottime * 1000, 3), 'cumtime_ms': round(cumtime * 1000, 3),
+            }
+            for key, (primitive, calls, tottime, cumtime, _) in pstats.Stats(self._profiler).stats.items()
+        ]
+        rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+        return rows[:MAX_FUNCTIONS]
+
+    def stacks(self):
+        return dict(self._sampler.stacks) if self._sampler is not None else {}
+
+
+def save(profile, request, response):
+    """Write ``profile`` to the profile directory and prune old ones; return its id."""
+    started = profile.started_at
+    profile_id = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    queries = profile.queries
+    meta = {
+        'id': profile_id,
+        'started_at': started.isoformat(),
+        'method': request.method,
+        'path': request.get_full_path()[:500],
+        'view': getattr(getattr(request, 'resolver_match', None), 'view_name', '') or '',
+        'status': response.status_code,
+        'user': getattr(getattr(request, 'user', None), 'username', '') or '',
+        'mode': profile.mode,
+        'duration_ms': round(profile.duration * 1000, 3),
+        'query_count': len(queries),
+        'query_ms': round(sum(query['ms'] for query in queries), 3),
+    }
+    document = {
+        **meta,
+        'queries': sorted(queries, key=lambda query: query['ms'], reverse=True)[:MAX_QUERIES],
+        'stacks': profile.stacks(),
+        'functions': profile.functions(),
+    }
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_atomic(directory / f'{profile_id}.json.gz', gzip.compress(json.dumps(document).encode()))
+    _write_atomic(directory / f'{profile_id}.meta.json', json.dumps(meta).encode())
+    prune(_setting('KEEP', 500))
+    return profile_id
+
+
+def _write_atomic(path, content):
+    temporary = path.with_name(path.name + '.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def prune(keep):
+    """Delete all but the ``keep`` newest profiles."""
+    metas = sorted(profile_dir().glob('*.meta.json'), reverse=True)
+    for meta_path in metas[keep:]:
+        profile_id = meta_path.name[:-len('.meta.json')]
+        for path in (meta_path, meta_path.with_name(f'{profile_id}.json.gz')):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(order='slowest', limit=100):
+    """Metadata of stored profiles, slowest first (or ``order='recent'``)."""
+    metas = []
+    for path in profile_dir().glob('*.meta.json'):
+        try:
+            metas.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    key = 'duration_ms' if order == 'slowest' else 'started_at'
+    metas.sort(key=lambda meta: meta[key], reverse=True)
+    return metas[:limit]
+
+
+def load_profile(profile_id):
+    """The stored document for ``profile_id``, or None."""
+    if not profile_id.replace('-', '').isalnum():
+        return None
+    try:
+        return json.loads(gzip.decompress((profile_dir() / f'{profile_id}.json.gz').read_bytes()))
+    except (OSError, ValueError):
+        return None
+
+
+def collapsed_stacks(document):
+    """Flame-graph input (``frame;frame;frame count`` per line) for a stored profile."""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(document.get('stacks', {}).items()))
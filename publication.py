@@ -0,0 +1,148 @@
+"""Staged release of results, one (course, term) pair at a time.
+
+With ``ETU_STAGED_PUBLICATION`` on, new results are recorded as drafts (see
+``models.Publication``) and students see them only once their pair is
+published. ``publish`` releases a set of drafts so that the traffic at the
+moment of release finds warm caches:
+
+1. A worker pool renders every affected student's dashboard fragments and
+   transcript as they will look once the drafts are published. They are
+   stored under a new ``student_results`` version that no request uses yet.
+2. One UPDATE marks all the drafts published, and the released results are
+   logged as updates in the change log, so feed consumers and the push
+   followers of other processes pick them up.
+3. After commit, a single ``set_many`` switches the students to the warmed
+   versions. Students whose results changed while warming are bumped past
+   them instead, and the students' open dashboard streams are woken.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Q
+from django.template import Context
+from django.template.loader import get_template
+from django.templatetags.cache import CacheNode
+from django.utils import timezone
+
+from . import api_cache, changefeed, push
+from .cache_versions import bump_version, get_version, get_versions, set_versions
+from .models import ChangeLogEntry, Publication, Result, Student
+
+DASHBOARD_TEMPLATE = 'eturesultapp/student_dashboard.html'
+DASHBOARD_FRAGMENTS = ('student_stats', 'student_results')
+# Warmed versions sit this far ahead of the current ones, out of reach of bump_version.
+RELEASE_STEP = 1 << 32
+
+
+def staged():
+    return getattr(settings, 'ETU_STAGED_PUBLICATION', False)
+
+
+def sees_drafts(user):
+    """Staff and users who can view results see drafts; everyone else only published results."""
+    return user.is_staff or user.has_perm('eturesultapp.view_result')
+
+
+def _draft_results(drafts):
+    condition = Q()
+    for draft in drafts:
+        condition |= Q(course_id=draft.course_id, term_id=draft.term_id)
+    return Result.objects.filter(condition)
+
+
+def affected_students(drafts):
+    return set(_draft_results(drafts).values_list('student_id', flat=True).distinct())
+
+
+def _api_tags(drafts):
+    """API cache tags of the responses that leave out the drafts' results."""
+    tags = set()
+    for result_id, course_id, term_code in _draft_results(drafts).values_list('pk', 'course_id', 'term__code'):
+        tags |= api_cache.result_tags(result_id, course_id, term_code)
+    return tags
+
+
+def dashboard_fragments():
+    """The ``{% fragment_cache %}`` nodes of the student dashboard that hold result data."""
+    nodes = get_template(DASHBOARD_TEMPLATE).template.nodelist.get_nodes_by_type(CacheNode)
+    return [node for node in nodes if node.fragment_name in DASHBOARD_FRAGMENTS]
+
+
+def warm_student(student_pk, releasing, version, fragments=None):
+    """Cache one student's dashboard fragments and transcript, with ``releasing`` published, under ``version``."""
+    # views imports signals (through roster), which imports this module
+    from .views import student_dashboard_context, transcript_cache_key, transcript_rows
+
+    student = Student.objects.get(pk=student_pk)
+    context = student_dashboard_context(student, releasing)
+    # The template reads these with {% data_version %} outside the fragments
+    context.update(results_version=version, courses_version=get_version('courses'))
+    context = Context(context)
+    for node in fragments or dashboard_fragments():
+        node.render(context)
+    cache.set(
+        transcript_cache_key(student_pk, version), transcript_rows(student, releasing),
+        getattr(settings, 'ETU_FRAGMENT_CACHE_TIMEOUT', 86400),
+    )
+
+
+def _warm_in_thread(job):
+    try:
+        warm_student(*job)
+    finally:
+        connections.close_all()  # this worker thread's connections only
+
+
+def publish(drafts, user=None, workers=4):
+    """Warm the caches for, then publish, the draft Publication rows in ``drafts``.
+
+    Returns the pks of the students whose results were released.
+    """
+    drafts = [draft for draft in drafts if draft.published_at is None]
+    if not drafts:
+        return set()
+    releasing = [draft.pk for draft in drafts]
+    students = affected_students(drafts)
+    cursor = push.latest_change()
+    versions = {pk: version + RELEASE_STEP for pk, version in get_versions('student_results', students).items()}
+
+    fragments = dashboard_fragments()
+    jobs = [(pk, releasing, versions[pk], fragments) for pk in students]
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_warm_in_thread, jobs))
+    else:
+        for job in jobs:
+            warm_student(*job)
+
+    with transaction.atomic():
+        Publication.objects.filter(pk__in=releasing, published_at__isnull=True).update(
+            published_at=timezone.now(), published_by=user,
+        )
+        api_cache.invalidate(*_api_tags(drafts))
+        released = _draft_results(drafts).values_list('pk', flat=True)
+        logged = {entry.pk for entry in changefeed.record_changes(Result, released, ChangeLogEntry.UPDATE)}
+        transaction.on_commit(lambda: _release(versions, cursor, logged))
+    return students
+
+
+def _release(versions, cursor, logged=()):
+    set_versions('student_results', versions)
+    # Results written while warming are not in the warmed copies. ``logged``
+    # are the release's own entries; backends that return no keys from
+    # bulk_create leave it {None}, and every student is bumped instead.
+    rows = ChangeLogEntry.objects.filter(id__gt=cursor, model='result').values_list('pk', 'object_id', 'action')
+    written, deleted = set(), False
+    for pk, object_id, action in rows:
+        if pk in logged:
+            continue
+        if action == ChangeLogEntry.DELETE:
+            deleted = True
+        else:
+            written.add(object_id)
+    changed = set(Result.objects.filter(pk__in=written).values_list('student_id', flat=True)) if written else set()
+    for pk in set(versions) if deleted else changed & set(versions):
+        bump_version('student_results', pk)
+    push.hub.publish(set(versions))
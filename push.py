@@ -0,0 +1,148 @@
+"""Server-sent event push of result changes to open student dashboards.
+
+Each student dashboard keeps one ``/async/events/results/`` stream open
+(``async_views.result_events``). Under ASGI an idle stream is a suspended
+coroutine waiting on an ``asyncio.Event`` in this process's ``hub``; it holds
+no thread and no database connection. The hub is fed two ways:
+
+* Result signal handlers, for single saves and ``results_bulk_saved``, call
+  ``hub.publish`` once the transaction commits. That reaches streams served
+  by the writing process straight away.
+* While any stream is open, one task per process follows the change log
+  (``changefeed``) every ``ETU_PUSH_POLL_INTERVAL`` seconds (default 2,
+  0 = off), so results written by other processes (WSGI workers, management
+  commands) reach it too, with one query per interval however many
+  students are connected.
+
+Every event carries the student's current ``student_results`` data version.
+The page compares it with the version it was rendered at, so duplicate
+events and reconnects never show a stale notice.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Max
+
+from .cache_versions import get_version
+from .models import ChangeLogEntry, Result
+
+logger = logging.getLogger(__name__)
+
+
+def poll_interval():
+    return getattr(settings, 'ETU_PUSH_POLL_INTERVAL', 2)
+
+
+def latest_change():
+    return ChangeLogEntry.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def changed_students(cursor):
+    """``(student pks, next cursor)`` for results created or updated after change-log ``cursor``."""
+    latest = latest_change()
+    if latest <= cursor:
+        return set(), cursor
+    result_ids = (
+        ChangeLogEntry.objects.filter(id__gt=cursor, id__lte=latest, model='result')
+        .exclude(action=ChangeLogEntry.DELETE)
+        .values('object_id')
+    )
+    student_ids = set(Result.objects.filter(pk__in=result_ids).values_list('student_id', flat=True).distinct())
+    return student_ids, latest
+
+
+def _in_thread(func, *args):
+    def run():
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+class Hub:
+    """Open streams in this process, keyed by student pk."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._loop = None
+        self._follower = None
+
+    def subscribe(self, student_id):
+        """Register a stream; the returned asyncio.Event is set when the student's results change."""
+        changed = asyncio.Event()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.setdefault(student_id, set()).add(changed)
+        interval = poll_interval()
+        if interval and (self._follower is None or self._follower.done()):
+            self._follower = self._loop.create_task(self._follow(interval))
+        return changed
+
+    def unsubscribe(self, student_id, changed):
+        with self._lock:
+            streams = self._subscribers.get(student_id)
+            if streams is not None:
+                streams.discard(changed)
+                if not streams:
+                    del self._subscribers[student_id]
+
+    def student_ids(self):
+        with self._lock:
+            return set(self._subscribers)
+
+    def publish(self, student_ids):
+        """Wake the streams of ``student_ids``; safe to call from any thread."""
+        with self._lock:
+            loop = self._loop
+            streams = [changed for pk in student_ids for changed in self._subscribers.get(pk, ())]
+        if not streams or loop.is_closed():
+            return
+        for changed in streams:
+            loop.call_soon_threadsafe(changed.set)
+
+    async def _follow(self, interval):
+        cursor = None
+        while self.student_ids():
+            try:
+                if cursor is None:
+                    cursor = await _in_thread(latest_change)
+                else:
+                    student_ids, cursor = await _in_thread(changed_students, cursor)
+                    self.publish(student_ids)
+            except DatabaseError:
+                logger.exception('Could not read the change log for result push')
+            await asyncio.sleep(interval)
+
+
+hub = Hub()
+
+
+def _frame(version):
+    return f'event: results\ndata: {json.dumps({"version": version})}\n\n'
+
+
+async def result_events(student_id, keepalive=None):
+    """Yield SSE frames for one student's stream until the client goes away."""
+    keepalive = keepalive or getattr(settings, 'ETU_PUSH_KEEPALIVE', 25)
+    current_version = sync_to_async(get_version, thread_sensitive=False)
+    changed = hub.subscribe(student_id)
+    try:
+        yield 'retry: 5000\n' + _frame(await current_version('student_results', student_id))
+        while True:
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            changed.clear()
+            yield _frame(await current_version('student_results', student_id))
+    finally:
+        hub.unsubscribe(student_id, changed)
@@ -0,0 +1,162 @@
+"""GPA rank and percentile of every student within their cohorts.
+
+A cohort is the set of active students sharing a program (department,
+faculty) and entry year. ``ranked_students`` computes credit-weighted GPAs
+and, in the same query, rank / dense rank / cumulative-distribution window
+functions partitioned per cohort. ``refresh_cohort_ranks`` stores the result
+in CohortRank.
+
+Rebuilding a cohort reads and rewrites every student of its entry year, far
+too much to do for each grade entered. Signal handlers therefore only mark
+the entry years a change touches as stale (``StaleRankYear``), and
+``refresh_stale_ranks`` rebuilds each marked year once, however many
+changes it collected. Run it from ``refresh_cohort_ranks --stale
+--interval N``; with ``ETU_COHORT_RANKS_AUTO_REFRESH = True`` it also runs
+after each commit that marked a year, which only suits small installs.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Window
+from django.db.models.functions import CumeDist, DenseRank, ExtractYear, Rank, Round
+
+from .analytics import COHORT_FIELDS
+from .models import CohortRank, StaleRankYear, Student
+
+# Student fields whose change moves the student between (or out of) cohorts
+STANDING_FIELDS = (*COHORT_FIELDS, 'enrollment_date', 'is_active')
+
+# StaleRankYear's stand-in for "no enrollment date"; unique columns can't rely on NULL
+NO_YEAR = 0
+
+
+def ranked_students(students=None):
+    """Annotate active students with ``gpa``, ``credits`` and per-cohort windows.
+
+    Students without graded credits are left out. For each scope in
+    COHORT_FIELDS the rows carry ``<scope>_rank``, ``<scope>_dense_rank``,
+    ``<scope>_cume`` (0-1) and ``<scope>_size``.
+    """
+    points = F('results__grade_points')
+    credits = Sum('results__course__credits')
+    queryset = (
+        (students if students is not None else Student.objects.all())
+        .filter(is_active=True)
+        .annotate(entry_year=ExtractYear('enrollment_date'), credits=credits)
+        .filter(credits__gt=0)
+        .annotate(gpa=Round(Sum(points * F('results__course__credits')) / F('credits'), 2, output_field=FloatField()))
+    )
+    windows = {}
+    for scope in COHORT_FIELDS:
+        partition = [F(scope), F('entry_year')]
+        windows.update({
+            f'{scope}_rank': Window(Rank(), partition_by=partition, order_by=F('gpa').desc()),
+            f'{scope}_dense_rank': Window(DenseRank(), partition_by=partition, order_by=F('gpa').desc()),
+            f'{scope}_cume': Window(CumeDist(), partition_by=partition, order_by=F('gpa').asc()),
+            f'{scope}_size': Window(Count('pk'), partition_by=partition),
+        })
+    return queryset.annotate(**windows).order_by()
+
+
+def _rank_row(row):
+    rank = CohortRank(
+        student_id=row['pk'], entry_year=row['entry_year'],
+        gpa=row['gpa'], credits=row['credits'],
+    )
+    for scope in COHORT_FIELDS:
+        if row[scope]:
+            setattr(rank, f'{scope}_rank', row[f'{scope}_rank'])
+            setattr(rank, f'{scope}_dense_rank', row[f'{scope}_dense_rank'])
+            setattr(rank, f'{scope}_percentile', round(row[f'{scope}_cume'] * 100, 2))
+            setattr(rank, f'{scope}_size', row[f'{scope}_size'])
+    return rank
+
+
+def _year_filter(years, field):
+    condition = Q(**{f'{field}__in': [year for year in years if year is not None]})
+    if None in years:
+        condition |= Q(**{f'{field}__isnull': True})
+    return condition
+
+
+def refresh_cohort_ranks(entry_years=None, batch_size=1000):
+    """Recompute ranks for the given entry years (all when None); return rows written.
+
+    Every cohort is partitioned by entry year, so recomputing whole years
+    always covers complete cohorts.
+    """
+    students = Student.objects.all()
+    stale = CohortRank.objects.all()
+    if entry_years is None:
+        # Cleared before reading, so changes committed meanwhile stay marked
+        StaleRankYear.objects.all().delete()
+    else:
+        entry_years = set(entry_years)
+        if not entry_years:
+            return 0
+        students = students.filter(_year_filter(entry_years, 'enrollment_date__year'))
+        stale = stale.filter(_year_filter(entry_years, 'entry_year'))
+    fields = ['pk', 'entry_year', 'gpa', 'credits', *COHORT_FIELDS] + [
+        f'{scope}_{part}' for scope in COHORT_FIELDS for part in ('rank', 'dense_rank', 'cume', 'size')
+    ]
+    rows = [_rank_row(row) for row in ranked_students(students).values(*fields)]
+    with transaction.atomic():
+        stale.delete()
+        if entry_years is not None:
+            # Rows of students who moved into these years from another one
+            CohortRank.objects.filter(student_id__in=[row.student_id for row in rows]).delete()
+        CohortRank.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def entry_years_of(student_ids):
+    """Entry years currently stored or recorded for the given students."""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return set()
+    years = {
+        date.year if date else None
+        for date in Student.objects.filter(pk__in=student_ids).values_list('enrollment_date', flat=True)
+    }
+    years.update(CohortRank.objects.filter(student_id__in=student_ids).values_list('entry_year', flat=True))
+    return years
+
+
+def mark_ranks_stale(student_ids=(), years=()):
+    """Mark the students' (and ``years``') entry years for ``refresh_stale_ranks``.
+
+    The marks are written once the caller's transaction commits, so grade
+    entry never waits on a mark another transaction holds. A refresh clears
+    marks before reading, so a mark written after the change committed is
+    either still there for the next run or was cleared by a refresh that
+    reads the change.
+    """
+    student_ids, years = set(student_ids), set(years)
+    if student_ids or years:
+        transaction.on_commit(lambda: _mark(student_ids, years))
+
+
+def _mark(student_ids, years):
+    years = years | entry_years_of(student_ids)
+    for year in years:
+        StaleRankYear.objects.get_or_create(entry_year=NO_YEAR if year is None else year)
+    if years and getattr(settings, 'ETU_COHORT_RANKS_AUTO_REFRESH', False):
+        refresh_stale_ranks()
+
+
+def refresh_stale_ranks():
+    """Recompute the entry years marked stale; return rows written.
+
+    The marks are removed before the ranks are read, so a change committed
+    meanwhile marks its year again and the next run picks it up.
+    """
+    with transaction.atomic():
+        marked = list(StaleRankYear.objects.select_for_update().values_list('entry_year', flat=True))
+        StaleRankYear.objects.filter(entry_year__in=marked).delete()
+    if not marked:
+        return 0
+    years = {None if year == NO_YEAR else year for year in marked}
+    try:
+        return refresh_cohort_ranks(years)
+    except Exception:
+        _mark(set(), years)
+        raise
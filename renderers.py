@@ -0,0 +1,64 @@
+"""JSON renderers for the REST API.
+
+``ORJSONRenderer`` produces the same bytes as DRF's compact ``JSONRenderer``
+but encodes with orjson when it is installed; anything orjson does not
+handle natively (dates, decimals, lazy strings ...) goes through DRF's own
+encoder so the formatting matches. Without orjson, or when indented output
+is requested (browsable API, ``; indent=4``), it falls back to DRF.
+
+``NDJSONRenderer`` (``?format=ndjson`` or ``Accept: application/x-ndjson``)
+writes one JSON document per line; list endpoints stream every matching row
+instead of a page.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configured like DRF's compact renderer; with orjson only its ``default`` is used.
+_encoder = encoders.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes identical to DRF's ``JSONRenderer`` output."""
+    if orjson is not None:
+        content = orjson.dumps(
+            data, default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    else:
+        content = _encoder.encode(data).encode()
+    # DRF escapes these so the output is also valid JavaScript.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    @staticmethod
+    def lines(items):
+        for item in items:
+            yield dumps(item) + b'\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            data = data['results']
+        return b''.join(self.lines(data if isinstance(data, list) else [data]))
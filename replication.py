@@ -0,0 +1,34 @@
+"""Replication stand-in for running read replicas locally on SQLite.
+
+Real deployments replicate at the database level. For development and tests
+the replica is a second SQLite file that is refreshed from the primary with
+SQLite's online backup API; see the ``sync_replicas`` command.
+"""
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .routers import get_replicas, record_replica_sync
+
+
+def sync_sqlite_replica(replica_alias, source_alias=DEFAULT_DB_ALIAS):
+    """Overwrite ``replica_alias`` with a consistent copy of ``source_alias``."""
+    source, target = connections[source_alias], connections[replica_alias]
+    if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+        raise ImproperlyConfigured('The replication stand-in only supports SQLite databases.')
+    source.ensure_connection()
+    target.ensure_connection()
+    started = time.time()
+    source.connection.backup(target.connection)
+    # The copy holds every write committed before it started
+    record_replica_sync(replica_alias, started)
+
+
+def sync_all_replicas(source_alias=DEFAULT_DB_ALIAS):
+    """Refresh every configured replica and return the aliases synced."""
+    synced = []
+    for alias in get_replicas():
+        sync_sqlite_replica(alias, source_alias)
+        synced.append(alias)
+    return synced
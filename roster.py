@@ -0,0 +1,202 @@
+"""Bulk import of intake rosters into User and Student accounts.
+
+A roster is a CSV with a header row; ``student_id``, ``first_name``,
+``last_name`` and ``email`` are required and ``program``, ``department``,
+``faculty`` and ``enrollment_date`` (YYYY-MM-DD) are optional. The whole
+file is validated up front with a handful of set-wise queries against the
+existing student ids, usernames and emails. Accounts are then created with
+``bulk_create`` one transaction per batch: an inactive User (username =
+student id, unusable password), its linked Student, and an activation mail
+queued in the outbox rather than sent inline. Students choose a password
+after following the activation link.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import outbox
+from .identity import registered_emails
+from .models import Student, normalize_email
+from .signals import students_bulk_created
+
+REQUIRED_COLUMNS = ('student_id', 'first_name', 'last_name', 'email')
+OPTIONAL_COLUMNS = ('program', 'department', 'faculty', 'enrollment_date')
+BATCH_SIZE = 1000
+QUERY_BATCH = 1000
+
+
+@dataclass
+class RosterReport:
+    rows: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)  # (line number, message)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def read_roster(stream):
+    """Parse a CSV roster (text or bytes stream) into ``[(line, row)]``.
+
+    Raises ValueError if a required column is missing from the header.
+    """
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(stream)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        raise ValueError(f"Roster is missing column(s): {', '.join(missing)}")
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    return [
+        (reader.line_num, {column: (row.get(column) or '').strip() for column in columns})
+        for row in reader
+    ]
+
+
+def _max_lengths():
+    lengths = {name: Student._meta.get_field(name).max_length for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS[:3]}
+    lengths['student_id'] = min(lengths['student_id'], get_user_model()._meta.get_field('username').max_length)
+    return lengths
+
+
+def _existing(model, field_name, values):
+    values = sorted(values)
+    found = set()
+    for start in range(0, len(values), QUERY_BATCH):
+        found.update(
+            model.objects.filter(**{f'{field_name}__in': values[start:start + QUERY_BATCH]})
+            .values_list(field_name, flat=True)
+        )
+    return found
+
+
+def validate_roster(rows):
+    """Split ``[(line, row)]`` into ``(valid rows, [(line, message)])``."""
+    lengths = _max_lengths()
+    errors, checked = [], []
+    seen_ids, seen_emails = set(), set()
+    for line, row in rows:
+        problems = [f'{column} is required' for column in REQUIRED_COLUMNS if not row[column]]
+        problems += [
+            f'{column} is longer than {limit} characters'
+            for column, limit in lengths.items() if len(row[column]) > limit
+        ]
+        email = normalize_email(row['email'])
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                problems.append(f'{row["email"]} is not a valid email address')
+        if row['enrollment_date']:
+            try:
+                row['enrollment_date'] = parse_date(row['enrollment_date'])
+            except ValueError:
+                row['enrollment_date'] = None
+            if row['enrollment_date'] is None:
+                problems.append('enrollment_date must be YYYY-MM-DD')
+        else:
+            row['enrollment_date'] = None
+        if row['student_id'] in seen_ids:
+            problems.append(f'student_id {row["student_id"]} appears more than once')
+        if email and email in seen_emails:
+            problems.append(f'email {email} appears more than once')
+        seen_ids.add(row['student_id'])
+        seen_emails.add(email)
+        row['email'] = email
+        if problems:
+            errors.append((line, '; '.join(problems)))
+        else:
+            checked.append((line, row))
+
+    student_ids = {row['student_id'] for _, row in checked}
+    taken_ids = _existing(Student, 'student_id', student_ids) | _existing(get_user_model(), 'username', student_ids)
+    taken_emails = registered_emails(row['email'] for _, row in checked)
+    valid = []
+    for line, row in checked:
+        if row['student_id'] in taken_ids:
+            errors.append((line, f'student_id {row["student_id"]} is already registered'))
+        elif row['email'] in taken_emails:
+            errors.append((line, f'email {row["email"]} is already registered'))
+        else:
+            valid.append(row)
+    errors.sort()
+    return valid, errors
+
+
+def activation_mail(user, base_url):
+    """``(to, subject, body)`` for a roster account's activation link."""
+    path = reverse('eturesultapp:activate', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    body = render_to_string('eturesultapp/roster_activation_email.txt', {
+        'user': user,
+        'activation_link': base_url.rstrip('/') + path,
+        'site_name': getattr(settings, 'SITE_NAME', 'ETU Results'),
+    })
+    return user.email, 'Activate your ETU Results account', body
+
+
+def _create_batch(rows, base_url):
+    User = get_user_model()
+    users = [
+        User(
+            username=row['student_id'], email=row['email'], first_name=row['first_name'],
+            last_name=row['last_name'], is_active=False, password=make_password(None),
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+            for user in users:
+                user.pk = ids[user.username]
+        students = Student.objects.bulk_create([
+            Student(
+                user=user, student_id=row['student_id'], first_name=row['first_name'], last_name=row['last_name'],
+                email=row['email'], program=row['program'], department=row['department'],
+                faculty=row['faculty'], enrollment_date=row['enrollment_date'],
+            )
+            for user, row in zip(users, rows)
+        ])
+        if students and students[0].pk is None:
+            students = list(Student.objects.filter(student_id__in=[row['student_id'] for row in rows]))
+        outbox.queue_mail(activation_mail(user, base_url) for user in users)
+        students_bulk_created.send(sender=Student, students=students)
+    return len(students)
+
+
+def import_roster(rows, base_url=None, batch_size=BATCH_SIZE, skip_invalid=False, progress=None):
+    """Validate and import ``[(line, row)]``; return a RosterReport.
+
+    Nothing is written if any row is invalid unless ``skip_invalid`` is set,
+    in which case the valid rows are imported and the rest reported.
+    ``base_url`` prefixes activation links (default ``ETU_SITE_URL``).
+    """
+    base_url = base_url or getattr(settings, 'ETU_SITE_URL', 'http://localhost:8000')
+    valid, errors = validate_roster(rows)
+    report = RosterReport(rows=len(rows), errors=errors)
+    if errors and not skip_invalid:
+        return report
+    for start in range(0, len(valid), batch_size):
+        report.created += _create_batch(valid[start:start + batch_size], base_url)
+        if progress:
+            progress(report.created, len(valid))
+    return report
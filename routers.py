@@ -0,0 +1,137 @@
+"""Primary / read-replica database routing.
+
+Reads only go to a replica when the current context has opted in: the
+ReplicaRoutingMiddleware does that for safe requests and ``replica_reads()``
+does it for export jobs. Writes, and any read issued while a transaction is
+open on the primary, always use ``default``.
+
+Configure with::
+
+    DATABASE_ROUTERS = ['eturesultapp.routers.ReplicaRouter']
+    ETU_READ_REPLICAS = ['replica']      # aliases from DATABASES
+    ETU_REPLICA_MAX_LAG = 5              # seconds before a replica is skipped
+    ETU_REPLICA_RETRY_AFTER = 30         # seconds a failed replica is skipped
+
+A replica is only used while its heartbeat is fresh. Something must call
+``record_replica_sync()`` (or ``record_replica_lag()`` with a measured lag)
+at least every ETU_REPLICA_MAX_LAG seconds: the ``sync_replicas`` command
+does it locally, a monitoring job that reads the replica's replay delay does
+it in production. A replica with no heartbeat, or an old one, is treated as
+lagging, so reads go back to the primary when replication stops.
+"""
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_state = Local()
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+
+def get_replicas():
+    """Return the configured replica aliases that exist in DATABASES."""
+    return [alias for alias in getattr(settings, 'ETU_READ_REPLICAS', ()) if alias in settings.DATABASES]
+
+
+def _synced_key(alias):
+    return f'etu:replica:{alias}:synced_at'
+
+
+def _down_key(alias):
+    return f'etu:replica:{alias}:down'
+
+
+def record_replica_sync(alias, synced_at=None):
+    """Record that ``alias`` held every primary write up to ``synced_at`` (default now)."""
+    cache.set(_synced_key(alias), time.time() if synced_at is None else synced_at, None)
+
+
+def record_replica_lag(alias, seconds):
+    """Record a measured replication lag for ``alias`` (in seconds)."""
+    record_replica_sync(alias, time.time() - seconds)
+
+
+def replica_lag(alias):
+    """Seconds since ``alias`` last caught up, or None when it has no heartbeat."""
+    synced_at = cache.get(_synced_key(alias))
+    return None if synced_at is None else max(0.0, time.time() - synced_at)
+
+
+def mark_replica_down(alias):
+    """Skip ``alias`` for ETU_REPLICA_RETRY_AFTER seconds after an error."""
+    cache.set(_down_key(alias), True, getattr(settings, 'ETU_REPLICA_RETRY_AFTER', 30))
+
+
+def replica_is_healthy(alias):
+    if cache.get(_down_key(alias)):
+        return False
+    lag = replica_lag(alias)
+    return lag is not None and lag <= getattr(settings, 'ETU_REPLICA_MAX_LAG', 5)
+
+
+def choose_replica():
+    """Pick a healthy replica at random, or None when all are unavailable."""
+    healthy = [alias for alias in get_replicas() if replica_is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+def current_read_alias():
+    """Alias the router has settled on for this context, if any."""
+    return getattr(_state, 'alias', None)
+
+
+@contextmanager
+def _reads(mode):
+    previous = (getattr(_state, 'mode', None), getattr(_state, 'alias', None))
+    _state.mode, _state.alias = mode, None
+    try:
+        yield
+    finally:
+        _state.mode, _state.alias = previous
+
+
+def replica_reads():
+    """Send reads in this block to a replica (falls back to the primary)."""
+    return _reads(REPLICA)
+
+
+def primary_reads():
+    """Force reads in this block onto the primary."""
+    return _reads(PRIMARY)
+
+
+class ReplicaRouter:
+    """Route reads to a replica when the context allows it, writes to default."""
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'mode', None) != REPLICA:
+            return None
+        # Inside a transaction the caller must see its own uncommitted writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        alias = getattr(_state, 'alias', None)
+        if alias is None:
+            alias = choose_replica() or DEFAULT_DB_ALIAS
+            if alias != DEFAULT_DB_ALIAS:
+                try:
+                    connections[alias].ensure_connection()
+                except DatabaseError:
+                    mark_replica_down(alias)
+                    alias = DEFAULT_DB_ALIAS
+            _state.alias = alias
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
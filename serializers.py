@@ -1,5 +1,7 @@
+from functools import lru_cache
+
 from rest_framework import serializers
-from .models import Student, Course, Result
+from .models import CohortRank, Student, Course, Result, Term
 
 class CourseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,7 +13,41 @@ class StudentSerializer(serializers.ModelSerializer):
         model = Student
         fields = ['id', 'student_id', 'first_name', 'last_name', 'email', 'enrollment_date']
 
-class ResultSerializer(serializers.ModelSerializer):
+class TermField(serializers.SlugRelatedField):
+    """A term by its code; any recognised spelling ("Fall 2025") is accepted on write.
+
+    Validation only looks terms up. A term that does not exist yet is
+    validated as its string and created by ``TermCreatingMixin`` on save, so
+    rejected payloads leave no Term rows behind.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Term.objects.all())
+        super().__init__(slug_field='code', **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        return Term.objects.find(data) or data.strip() or None
+
+
+class TermCreatingMixin:
+    """Create the terms a TermField validated as strings, once the data is saved."""
+
+    def _resolve_terms(self, validated_data):
+        for field in self.fields.values():
+            source = field.source
+            if isinstance(field, TermField) and isinstance(validated_data.get(source), str):
+                validated_data[source] = Term.objects.resolve(validated_data[source])
+        return validated_data
+
+    def create(self, validated_data):
+        return super().create(self._resolve_terms(validated_data))
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self._resolve_terms(validated_data))
+
+class ResultSerializer(TermCreatingMixin, serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
     student_id = serializers.PrimaryKeyRelatedField(
         queryset=Student.objects.all(),
@@ -24,7 +60,89 @@ class ResultSerializer(serializers.ModelSerializer):
         write_only=True,
         source='course'
     )
+    semester = TermField(source='term', required=False, allow_null=True)
 
     class Meta:
         model = Result
-        fields = ['id', 'student', 'student_id', 'course', 'course_id', 'grade', 'semester', 'recorded_at']
\ No newline at end of file
+        fields = ['id', 'student', 'student_id', 'course', 'course_id', 'grade', 'semester', 'recorded_at']
+
+
+class CohortRankSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CohortRank
+        exclude = ['id']
+
+
+class FastListSerializer:
+    """Read-only list serialization straight from ``values_list()`` tuples.
+
+    Gives the same data as ``serializer_class(queryset, many=True).data`` for
+    ModelSerializers whose nested serializers are one level deep, without
+    building model instances or running DRF's per-row field machinery. A
+    nested object that appears on several rows (the same course on every
+    result of a page) is built once and shared.
+    """
+    # Model values of these field types are already in their JSON form
+    PASSTHROUGH = (serializers.CharField, serializers.IntegerField)
+    SHARED_LIMIT = 10000
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        self.layout = []  # (name, first column index, converter | [(name, converter)])
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                subfields = [(sub, f) for sub, f in field.fields.items() if not f.write_only]
+                self.layout.append((name, len(self.columns), [(sub, self._converter(f)) for sub, f in subfields]))
+                self.columns.append(f'{field.source}__pk')
+                self.columns.extend(f'{field.source}__{f.source}' for _, f in subfields)
+            elif isinstance(field, serializers.SlugRelatedField):
+                self.layout.append((name, len(self.columns), None))
+                self.columns.append(f'{field.source}__{field.slug_field}')
+            else:
+                self.layout.append((name, len(self.columns), self._converter(field)))
+                self.columns.append(field.source)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def for_class(cls, serializer_class):
+        return cls(serializer_class)
+
+    def _converter(self, field):
+        return None if isinstance(field, self.PASSTHROUGH) else field.to_representation
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def iter_rows(self, tuples):
+        shared = {}
+        for values in tuples:
+            row = {}
+            for name, index, convert in self.layout:
+                value = values[index]
+                if isinstance(convert, list):
+                    if value is None:
+                        row[name] = None
+                        continue
+                    nested = shared.get((name, value))
+                    if nested is None:
+                        if len(shared) >= self.SHARED_LIMIT:
+                            # Keep memory flat when streaming a whole table
+                            shared.clear()
+                        nested = shared[(name, value)] = {
+                            sub: _represent(sub_convert, values[index + offset])
+                            for offset, (sub, sub_convert) in enumerate(convert, 1)
+                        }
+                    row[name] = nested
+                else:
+                    row[name] = _represent(convert, value)
+            yield row
+
+    def data(self, tuples):
+        return list(self.iter_rows(tuples))
+
+
+def _represent(convert, value):
+    return value if convert is None or value is None else convert(value)
+
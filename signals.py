@@ -0,0 +1,394 @@
+"""Model signal handlers keeping derived data in step with writes.
+
+Bulk writes (``bulk_create``, ``bulk_update``) bypass the model signals, so
+code paths that use them send ``results_bulk_saved`` instead.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import analytics, api_cache, changefeed, publication, push, ranking
+from .cache_versions import bump_version
+from .models import ChangeLogEntry, Course, Lecturer, Publication, Result, Student, Term
+
+# Sent with sender=Result after a bulk write. ``changes`` is a list of
+# ``(result, previous)`` pairs where ``previous`` is None for new rows and
+# otherwise the ``(course_id, term_id, grade, student_id)`` before the write.
+results_bulk_saved = Signal()
+
+# Sent with sender=Student after new students are bulk-created (roster import).
+students_bulk_created = Signal()
+
+
+@receiver(pre_save, sender=Result)
+def remember_result_cell(sender, instance, raw=False, **kwargs):
+    instance._previous_cell = None
+    if instance.pk and not raw:
+        instance._previous_cell = (
+            Result.objects.filter(pk=instance.pk)
+            .values_list('course_id', 'term_id', 'grade', 'student_id')
+            .first()
+        )
+
+
+@receiver(pre_save, sender=Result)
+def hold_new_result_pair(sender, instance, raw=False, **kwargs):
+    """With staged publication, the first result of a (course, term) pair makes it a draft."""
+    if raw or not publication.staged() or instance.term_id is None:
+        return
+    previous = getattr(instance, '_previous_cell', None)
+    if previous and previous[:2] == (instance.course_id, instance.term_id):
+        return
+    others = Result.objects.filter(course_id=instance.course_id, term_id=instance.term_id)
+    if instance.pk:
+        others = others.exclude(pk=instance.pk)
+    if not others.exists():
+        Publication.objects.hold([(instance.course_id, instance.term_id)])
+
+
+@receiver(results_bulk_saved, sender=Result)
+def hold_bulk_result_pairs(sender, changes, **kwargs):
+    if not publication.staged():
+        return
+    moved = {}
+    for result, previous in changes:
+        pair = (result.course_id, result.term_id)
+        if result.term_id is not None and (previous is None or previous[:2] != pair):
+            moved.setdefault(pair, []).append(result.pk)
+    if not moved:
+        return
+    condition = Q()
+    for course_id, term_id in moved:
+        condition |= Q(course_id=course_id, term_id=term_id)
+    written = [pk for pks in moved.values() for pk in pks]
+    existing = set(
+        Result.objects.filter(condition).exclude(pk__in=written).values_list('course_id', 'term_id').distinct()
+    )
+    Publication.objects.hold(pair for pair in moved if pair not in existing)
+
+
+def _visible_students(cells):
+    """Students of ``(course_id, term_id, student_id)`` cells that are not held as drafts."""
+    if not publication.staged():
+        return {student_id for _, _, student_id in cells}
+    drafts = Publication.objects.draft_pairs((course_id, term_id) for course_id, term_id, _ in cells)
+    return {student_id for course_id, term_id, student_id in cells if (course_id, term_id) not in drafts}
+
+
+def _result_cells(instance):
+    cells = [(instance.course_id, instance.term_id, instance.student_id)]
+    previous = getattr(instance, '_previous_cell', None)
+    if previous:
+        cells.append((previous[0], previous[1], previous[3]))
+    return cells
+
+
+def _bulk_result_cells(changes):
+    cells = [(result.course_id, result.term_id, result.student_id) for result, previous in changes]
+    cells += [(previous[0], previous[1], previous[3]) for result, previous in changes if previous is not None]
+    return cells
+
+
+@receiver(post_save, sender=Result)
+def update_grade_distribution(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.course_id, instance.term_id, instance.grade, instance.student_id)
+    previous = getattr(instance, '_previous_cell', None)
+    if previous == current:
+        return
+    if previous:
+        analytics.adjust_cell(*previous[:3], analytics.student_cohort(previous[3]), -1)
+    analytics.adjust_cell(*current[:3], analytics.student_cohort(instance.student_id), 1)
+
+
+@receiver(post_delete, sender=Result)
+def remove_from_grade_distribution(sender, instance, **kwargs):
+    analytics.adjust_cell(
+        instance.course_id, instance.term_id, instance.grade,
+        analytics.student_cohort(instance.student_id), -1,
+    )
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_cohort(sender, instance, raw=False, **kwargs):
+    instance._previous_cohort = analytics.student_cohort(instance.pk) if instance.pk and not raw else None
+
+
+@receiver(post_save, sender=Student)
+def move_student_cohort(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_cohort', None)
+    if raw or created or previous is None:
+        return
+    current = tuple(getattr(instance, field) or '' for field in analytics.COHORT_FIELDS)
+    if previous == current:
+        return
+    cells = instance.results.values('course_id', 'term_id', 'grade').annotate(n=Count('id')).order_by()
+    for cell in cells:
+        analytics.adjust_cell(cell['course_id'], cell['term_id'], cell['grade'], previous, -cell['n'])
+        analytics.adjust_cell(cell['course_id'], cell['term_id'], cell['grade'], current, cell['n'])
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Course)
+def log_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        changefeed.record_change(instance, ChangeLogEntry.CREATE if created else ChangeLogEntry.UPDATE)
+
+
+@receiver(post_delete, sender=Result)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Course)
+def log_delete(sender, instance, **kwargs):
+    changefeed.record_change(instance, ChangeLogEntry.DELETE)
+
+
+@receiver(results_bulk_saved, sender=Result)
+def bulk_update_grade_distribution(sender, changes, **kwargs):
+    deltas = Counter()
+    for result, previous in changes:
+        current = (result.course_id, result.term_id, result.grade, result.student_id)
+        if previous != current:
+            deltas[current] += 1
+            if previous is not None:
+                deltas[previous] -= 1
+    cohorts = analytics.student_cohorts(cell[3] for cell in deltas)
+    cells = Counter()
+    for (course_id, term_id, grade, student_id), delta in deltas.items():
+        cells[(course_id, term_id, grade, cohorts.get(student_id, ('', '', '')))] += delta
+    for (course_id, term_id, grade, cohort), delta in cells.items():
+        if delta:
+            analytics.adjust_cell(course_id, term_id, grade, cohort, delta)
+
+
+@receiver(results_bulk_saved, sender=Result)
+def bulk_log_changes(sender, changes, **kwargs):
+    created = [result.pk for result, previous in changes if previous is None]
+    updated = [result.pk for result, previous in changes if previous is not None]
+    changefeed.record_changes(Result, created, ChangeLogEntry.CREATE)
+    changefeed.record_changes(Result, updated, ChangeLogEntry.UPDATE)
+
+
+@receiver(students_bulk_created, sender=Student)
+def bulk_log_created_students(sender, students, **kwargs):
+    changefeed.record_changes(Student, [student.pk for student in students], ChangeLogEntry.CREATE)
+
+
+def bump_versions_on_commit(scope, obj_ids=(0,)):
+    """Bump the versions once the transaction commits.
+
+    Bumping earlier would let a concurrent request read the old, still
+    committed rows and cache them under the new version.
+    """
+    obj_ids = list(obj_ids)
+    transaction.on_commit(lambda: [bump_version(scope, obj_id) for obj_id in obj_ids])
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def bump_result_versions(sender, instance, **kwargs):
+    bump_versions_on_commit('student_results', _visible_students(_result_cells(instance)))
+    bump_versions_on_commit('site')
+
+
+@receiver(results_bulk_saved, sender=Result)
+def bump_bulk_result_versions(sender, changes, **kwargs):
+    bump_versions_on_commit('student_results', _visible_students(_bulk_result_cells(changes)))
+    bump_versions_on_commit('site')
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def bump_student_versions(sender, instance, **kwargs):
+    bump_versions_on_commit('site')
+
+
+@receiver(students_bulk_created, sender=Student)
+def bump_bulk_student_versions(sender, students, **kwargs):
+    bump_versions_on_commit('site')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_course_versions(sender, instance, **kwargs):
+    bump_versions_on_commit('courses')
+    bump_versions_on_commit('site')
+
+
+def _result_api_tags(cells):
+    """API cache tags for ``(result_id, course_id, term_id)`` cells."""
+    term_ids = {term_id for _, _, term_id in cells if term_id is not None}
+    codes = dict(Term.objects.filter(pk__in=term_ids).values_list('pk', 'code')) if term_ids else {}
+    tags = set()
+    for result_id, course_id, term_id in cells:
+        tags |= api_cache.result_tags(result_id, course_id, codes.get(term_id))
+    return tags
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def expire_result_api_responses(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cells = [(instance.pk, instance.course_id, instance.term_id)]
+    previous = getattr(instance, '_previous_cell', None)
+    if previous:
+        cells.append((instance.pk, previous[0], previous[1]))
+    api_cache.invalidate(*_result_api_tags(cells))
+
+
+@receiver(results_bulk_saved, sender=Result)
+def expire_bulk_result_api_responses(sender, changes, **kwargs):
+    cells = []
+    for result, previous in changes:
+        cells.append((result.pk, result.course_id, result.term_id))
+        if previous is not None:
+            cells.append((result.pk, previous[0], previous[1]))
+    api_cache.invalidate(*_result_api_tags(cells))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def expire_student_api_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        api_cache.invalidate('students', f'student:{instance.pk}')
+
+
+@receiver(students_bulk_created, sender=Student)
+def expire_bulk_student_api_responses(sender, students, **kwargs):
+    api_cache.invalidate('students')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def expire_course_api_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        api_cache.invalidate('courses', f'course:{instance.pk}')
+
+
+@receiver(post_save, sender=Result)
+def push_result_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    student_ids = _visible_students(_result_cells(instance))
+    if student_ids:
+        transaction.on_commit(lambda: push.hub.publish(student_ids))
+
+
+@receiver(results_bulk_saved, sender=Result)
+def push_bulk_result_changes(sender, changes, **kwargs):
+    student_ids = _visible_students(_bulk_result_cells(changes))
+    if student_ids:
+        transaction.on_commit(lambda: push.hub.publish(student_ids))
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_delete, sender=Term)
+def forget_current_term(sender, instance, **kwargs):
+    Term.objects.clear_cache()
+
+
+@receiver(post_save, sender=Lecturer)
+@receiver(post_delete, sender=Lecturer)
+def bump_lecturer_versions(sender, instance, **kwargs):
+    bump_versions_on_commit('lecturer', [instance.pk])
+    bump_versions_on_commit('site')
+
+
+@receiver(m2m_changed, sender=Lecturer.courses.through)
+def bump_lecturer_course_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # course.lecturers.clear() sends no pk_set, so note who is affected first
+        instance._cleared_lecturers = list(instance.lecturers.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        lecturer_ids = [instance.pk]
+    elif action == 'post_clear':
+        lecturer_ids = getattr(instance, '_cleared_lecturers', [])
+    else:
+        lecturer_ids = pk_set or []
+    bump_versions_on_commit('lecturer', lecturer_ids)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, instance, **kwargs):
+    bump_versions_on_commit('user', [instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def bump_user_permission_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cached permission sets (backends.CachedPermissionBackend) are keyed on the user version
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear() sends no pk_set, so note who is affected first
+        instance._cleared_users = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_users', [])
+    else:
+        user_ids = pk_set or []
+    bump_versions_on_commit('user', user_ids)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def bump_group_permission_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_versions_on_commit('permissions')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def bump_permission_version(sender, **kwargs):
+    bump_versions_on_commit('permissions')
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def refresh_result_ranks(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ranking.mark_ranks_stale([instance.student_id])
+
+
+@receiver(results_bulk_saved, sender=Result)
+def refresh_bulk_result_ranks(sender, changes, **kwargs):
+    ranking.mark_ranks_stale({result.student_id for result, previous in changes})
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_standing(sender, instance, raw=False, **kwargs):
+    instance._previous_standing = None
+    if instance.pk and not raw:
+        instance._previous_standing = (
+            Student.objects.filter(pk=instance.pk)
+            .values_list(*ranking.STANDING_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Student)
+def refresh_student_ranks(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    current = tuple(getattr(instance, field) for field in ranking.STANDING_FIELDS)
+    if getattr(instance, '_previous_standing', None) != current:
+        ranking.mark_ranks_stale([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def refresh_deleted_student_ranks(sender, instance, **kwargs):
+    year = instance.enrollment_date.year if instance.enrollment_date else None
+    ranking.mark_ranks_stale(years=[year])
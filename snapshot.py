@@ -0,0 +1,175 @@
+"""Static per-student results pages for results-day traffic.
+
+``publish_snapshot`` renders every student's results page and CSV into a
+directory that a plain web server can serve with no Django, session or
+database work::
+
+    <root>/<token>/index.html
+    <root>/<token>/results.csv
+
+The token is an HMAC of the student's pk keyed with ``ETU_SNAPSHOT_SECRET``
+(default ``SECRET_KEY``), so knowing the URL is the access check. It is
+shown only to the student, on their dashboard, when ``ETU_SNAPSHOT_URL``
+is set. Pages are rendered on a process pool. Each file is written to a
+temporary name and renamed into place, so readers never see a half-written
+page. Like the dashboard, the pages show published results only.
+
+``<root>/snapshot.json`` keeps a fingerprint of each student's page, made
+from the student's row, their ``student_results`` data version and the
+``courses`` version. The next run renders only the students whose
+fingerprint changed and removes the directories of students who are gone.
+Data versions live in the cache, so without a cache shared with the web
+processes every run renders every student again.
+
+Django models are imported inside the functions: with the ``spawn`` start
+method (Windows, macOS) a worker imports this module before
+``django.setup()`` has run.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from . import metrics
+from .cache_versions import get_version, get_versions
+
+FORMAT = 1
+MANIFEST = 'snapshot.json'
+TEMPLATE = 'eturesultapp/results_snapshot.html'
+CHUNK_SIZE = 100
+TOKEN_DIR = re.compile(r'^[0-9a-f]{32}$')
+STUDENT_FIELDS = (
+    'pk', 'student_id', 'first_name', 'last_name', 'program', 'department', 'faculty', 'enrollment_date',
+)
+
+
+@dataclass
+class SnapshotReport:
+    students: int = 0
+    rendered: int = 0
+    removed: int = 0
+
+
+def token(student_pk):
+    secret = getattr(settings, 'ETU_SNAPSHOT_SECRET', None) or settings.SECRET_KEY
+    return salted_hmac('eturesultapp.snapshot', str(student_pk), secret=secret, algorithm='sha256').hexdigest()[:32]
+
+
+def snapshot_url(student_pk):
+    """Public URL of the student's static results page, or None when snapshots are not served."""
+    base = getattr(settings, 'ETU_SNAPSHOT_URL', None)
+    return f"{base.rstrip('/')}/{token(student_pk)}/" if base else None
+
+
+def fingerprints(rows):
+    """``{student pk: fingerprint}`` for ``rows`` of STUDENT_FIELDS values."""
+    rows = list(rows)
+    versions = get_versions('student_results', [row[0] for row in rows])
+    courses = get_version('courses')
+    return {
+        row[0]: hashlib.sha256(
+            json.dumps([token(row[0]), versions[row[0]], courses, *row[1:]], default=str).encode()
+        ).hexdigest()
+        for row in rows
+    }
+
+
+def _write_atomic(path, data):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def render_student(root, student_pk):
+    """Write one student's ``index.html`` and ``results.csv`` under their token directory."""
+    from django.template.loader import render_to_string
+
+    from .models import Student
+    from .views import student_dashboard_context, transcript_header, transcript_rows
+
+    student = Student.objects.get(pk=student_pk)
+    context = student_dashboard_context(student)
+    context['generated_at'] = timezone.now()
+    directory = os.path.join(root, token(student_pk))
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(os.path.join(directory, 'index.html'), render_to_string(TEMPLATE, context).encode())
+    # BOM for Excel, as in the download view
+    csv_text = '\ufeff' + transcript_header(student) + transcript_rows(student)
+    _write_atomic(os.path.join(directory, 'results.csv'), csv_text.encode('utf-8'))
+
+
+def _render_chunk(root, student_pks):
+    for pk in student_pks:
+        render_student(root, pk)
+    return len(student_pks)
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get('students', {}) if manifest.get('format') == FORMAT else {}
+
+
+@metrics.timed_export('results_snapshot')
+def publish_snapshot(root, workers=4, force=False, chunk_size=CHUNK_SIZE, progress=None):
+    """Bring the static pages under ``root`` up to date; return a SnapshotReport.
+
+    ``force`` renders every student. ``progress`` is called with
+    ``(rendered, to render)`` after each chunk.
+    """
+    from .models import Student
+
+    os.makedirs(root, exist_ok=True)
+    previous = read_manifest(root)
+    current = fingerprints(Student.objects.order_by('pk').values_list(*STUDENT_FIELDS))
+    stale = [pk for pk, fingerprint in current.items() if force or previous.get(str(pk)) != fingerprint]
+    report = SnapshotReport(students=len(current))
+
+    chunks = [stale[start:start + chunk_size] for start in range(0, len(stale), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for done in pool.map(_render_chunk, repeat(root), chunks):
+                report.rendered += done
+                if progress:
+                    progress(report.rendered, len(stale))
+    else:
+        for chunk in chunks:
+            report.rendered += _render_chunk(root, chunk)
+            if progress:
+                progress(report.rendered, len(stale))
+
+    tokens = {token(pk) for pk in current}
+    for entry in os.scandir(root):
+        if entry.is_dir() and TOKEN_DIR.match(entry.name) and entry.name not in tokens:
+            shutil.rmtree(entry.path)
+            report.removed += 1
+
+    manifest = {
+        'format': FORMAT,
+        'generated_at': timezone.now().isoformat(),
+        'students': {str(pk): fingerprint for pk, fingerprint in current.items()},
+    }
+    _write_atomic(os.path.join(root, MANIFEST), json.dumps(manifest).encode())
+    return report
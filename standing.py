@@ -0,0 +1,189 @@
+"""End-of-term academic standing: dean's list, good standing, probation.
+
+``evaluate_term`` splits the active students into partitions that follow
+cohort boundaries (faculty / department / program), evaluates each
+partition in a process pool and writes the outcomes back in bulk as the
+partitions finish. Each worker streams its partition's results with one
+query per batch of students; nothing is loaded per student.
+
+Thresholds come from ``ETU_STANDING_RULES`` (merged over DEFAULT_RULES)::
+
+    ETU_STANDING_RULES = {'deans_list_min_gpa': 3.6, 'graduation_credits': 130}
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import groupby
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+
+from .analytics import COHORT_FIELDS
+from .models import FAILING_GRADES, GRADE_POINTS, AcademicStanding, Result, Student, Term
+
+DEFAULT_RULES = {
+    'deans_list_min_gpa': 3.5,      # term GPA
+    'deans_list_min_credits': 12,   # graded credits in the term, none failed
+    'probation_below_gpa': 2.0,     # cumulative GPA
+    'graduation_credits': 120,      # passed credits, each course counted once
+    'graduation_min_gpa': 2.0,
+}
+PARTITION_SIZE = 2000
+QUERY_BATCH = 1000  # stays under SQL Server's 2100-parameter limit
+
+
+def get_rules(overrides=None):
+    return {**DEFAULT_RULES, **getattr(settings, 'ETU_STANDING_RULES', {}), **(overrides or {})}
+
+
+def latest_term():
+    """The chronologically latest Term that has results."""
+    return (
+        Term.objects.filter(pk__in=Result.objects.values('term_id'))
+        .order_by(F('ordinal').desc(nulls_last=True), '-code')
+        .first()
+    )
+
+
+def _gpa(points, credits):
+    return round(points / credits, 2) if credits else None
+
+
+def evaluate_student(rows, term_id, rules):
+    """Standing for one student from ``(term_id, grade, course_id, credits)`` rows up to term ``term_id``."""
+    term_points = term_credits = points = credits = 0
+    term_failed = False
+    passed = {}
+    for row_term_id, grade, course_id, course_credits in rows:
+        value = GRADE_POINTS.get(grade, 0) * course_credits
+        points += value
+        credits += course_credits
+        if grade not in FAILING_GRADES:
+            passed[course_id] = course_credits
+        if row_term_id == term_id:
+            term_points += value
+            term_credits += course_credits
+            term_failed = term_failed or grade in FAILING_GRADES
+    term_gpa, cumulative_gpa = _gpa(term_points, term_credits), _gpa(points, credits)
+    credits_earned = sum(passed.values())
+
+    if cumulative_gpa is not None and cumulative_gpa < rules['probation_below_gpa']:
+        standing = AcademicStanding.PROBATION
+    elif (term_gpa is not None and term_gpa >= rules['deans_list_min_gpa']
+          and term_credits >= rules['deans_list_min_credits'] and not term_failed):
+        standing = AcademicStanding.DEANS_LIST
+    else:
+        standing = AcademicStanding.GOOD
+    return {
+        'standing': standing,
+        'term_gpa': term_gpa,
+        'cumulative_gpa': cumulative_gpa,
+        'term_credits': term_credits,
+        'credits_earned': credits_earned,
+        'graduation_eligible': (
+            credits_earned >= rules['graduation_credits']
+            and (cumulative_gpa or 0) >= rules['graduation_min_gpa']
+        ),
+    }
+
+
+def evaluate_partition(student_ids, term, rules):
+    """Return ``[(student_id, outcome)]`` for every student in the partition."""
+    outcomes = {}
+    # Undated (free-text) terms have no place in the calendar; count only their own results
+    up_to = {'term': term} if term.ordinal is None else {'term__ordinal__lte': term.ordinal}
+    for start in range(0, len(student_ids), QUERY_BATCH):
+        batch = student_ids[start:start + QUERY_BATCH]
+        rows = (
+            Result.objects.filter(student_id__in=batch, **up_to)
+            .values_list('student_id', 'term_id', 'grade', 'course_id', 'course__credits')
+            .order_by('student_id')
+            .iterator(chunk_size=5000)
+        )
+        for student_id, student_rows in groupby(rows, key=lambda row: row[0]):
+            outcomes[student_id] = evaluate_student((row[1:] for row in student_rows), term.pk, rules)
+    empty = evaluate_student((), term.pk, rules)
+    return [(student_id, outcomes.get(student_id, empty)) for student_id in student_ids]
+
+
+def partition_students(students=None, size=PARTITION_SIZE):
+    """Group active student ids by cohort and pack them into lists of at most ``size``.
+
+    Small cohorts share a partition but are never split between two; a
+    cohort larger than ``size`` is split into partitions of its own.
+    """
+    rows = (
+        (students if students is not None else Student.objects.all())
+        .filter(is_active=True)
+        .order_by(*COHORT_FIELDS, 'pk')
+        .values_list(*COHORT_FIELDS, 'pk')
+    )
+    partition = []
+    for _, cohort in groupby(rows.iterator(chunk_size=10000), key=lambda row: row[:-1]):
+        cohort = [row[-1] for row in cohort]
+        if partition and len(partition) + len(cohort) > size:
+            yield partition
+            partition = []
+        if len(cohort) > size:
+            for start in range(0, len(cohort), size):
+                yield cohort[start:start + size]
+        else:
+            partition.extend(cohort)
+    if partition:
+        yield partition
+
+
+def write_outcomes(term, outcomes, batch_size=1000):
+    """Replace the term's standing rows for these students in one transaction."""
+    with transaction.atomic():
+        student_ids = [student_id for student_id, _ in outcomes]
+        for start in range(0, len(student_ids), QUERY_BATCH):
+            AcademicStanding.objects.filter(term=term, student_id__in=student_ids[start:start + QUERY_BATCH]).delete()
+        AcademicStanding.objects.bulk_create(
+            [AcademicStanding(student_id=student_id, term=term, **outcome) for student_id, outcome in outcomes],
+            batch_size=batch_size,
+        )
+
+
+def evaluate_term(term=None, workers=None, students=None, partition_size=PARTITION_SIZE, rules=None, progress=None):
+    """Evaluate and store standing for ``term`` (latest by default); return the student count.
+
+    ``term`` is a Term or a semester string such as "2025-2". ``workers`` <= 1
+    evaluates in this process. ``progress(done, total, elapsed)`` is called
+    after each partition is written.
+    """
+    if isinstance(term, str):
+        term = Term.objects.find(term)
+    elif term is None:
+        term = latest_term()
+    if term is None:
+        return 0
+    rules = get_rules(rules)
+    partitions = list(partition_students(students, partition_size))
+    total = sum(len(partition) for partition in partitions)
+    workers = os.cpu_count() if workers is None else workers
+    started, done = time.monotonic(), 0
+
+    def finished(outcomes):
+        nonlocal done
+        write_outcomes(term, outcomes)
+        done += len(outcomes)
+        if progress:
+            progress(done, total, time.monotonic() - started)
+
+    if workers <= 1 or len(partitions) <= 1:
+        for partition in partitions:
+            finished(evaluate_partition(partition, term, rules))
+        return total
+
+    # Children must open their own connections rather than share inherited ones
+    connections.close_all()
+    # Spawned workers (the default on Windows) start without Django configured;
+    # django.setup is importable before any model module is.
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        futures = [pool.submit(evaluate_partition, partition, term, rules) for partition in partitions]
+        for future in as_completed(futures):
+            finished(future.result())
+    return total
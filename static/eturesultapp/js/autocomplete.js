@@ -0,0 +1,38 @@
+// Search-as-you-type for <select data-autocomplete-url="..."> widgets.
+// The server renders only the selected option(s); matches are fetched from
+// the autocomplete endpoint and replace the unselected options.
+(function () {
+  function attach(select) {
+    var search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control form-control-sm mb-1';
+    search.placeholder = 'Type to search…';
+    search.setAttribute('aria-label', 'Search ' + (select.name || 'options'));
+    select.parentNode.insertBefore(search, select);
+
+    var timer = null;
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () { load(select, search.value.trim()); }, 200);
+    });
+  }
+
+  function load(select, term) {
+    var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(term);
+    fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        var keep = {};
+        Array.prototype.forEach.call(select.options, function (option) {
+          if (option.selected || option.value === '') { keep[option.value] = true; } else { option.remove(); }
+        });
+        data.results.forEach(function (item) {
+          if (!keep[String(item.id)]) { select.add(new Option(item.text, item.id)); }
+        });
+      });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(attach);
+  });
+})();
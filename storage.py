@@ -0,0 +1,131 @@
+"""Static files storage that minifies, fingerprints and precompresses assets.
+
+Use it in settings::
+
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'eturesultapp.storage.OptimizedManifestStaticFilesStorage'},
+    }
+
+On collectstatic, CSS and JS that are not already ``.min`` files are
+minified and PNG/JPEG images are re-encoded before they are hashed.
+Every hashed text file then gets ``.gz`` (and ``.br`` when the ``brotli``
+package is installed) siblings for the web server to send as-is. Hashed
+names never change content, so serve ``STATIC_ROOT`` with far-future
+``Cache-Control: public, max-age=31536000, immutable`` headers.
+"""
+import gzip
+import re
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.ttf')
+IMAGE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+MIN_COMPRESS_SIZE = 256
+
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Strip comments and whitespace; ``/*! ... */`` licence comments are kept."""
+    if rcssmin is not None:
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    text = _CSS_COMMENT.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = _CSS_SPACE.sub(r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # There is no safe regex-only JS minifier, so without rjsmin JS is left alone.
+    if rjsmin is not None:
+        return rjsmin.jsmin(text, keep_bang_comments=True)
+    return text
+
+
+def optimize_image(data, image_format):
+    """Re-encode a PNG/JPEG and return whichever of old and new is smaller."""
+    if Image is None:
+        return data
+    try:
+        image = Image.open(BytesIO(data))
+        out = BytesIO()
+        if image_format == 'JPEG':
+            image.save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+        else:
+            image.save(out, 'PNG', optimize=True)
+    except (OSError, ValueError):
+        return data
+    optimized = out.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+def _suffix(name):
+    return name[name.rfind('.'):].lower() if '.' in name else ''
+
+
+class OptimizedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def _save(self, name, content):
+        suffix = _suffix(name)
+        if suffix in ('.css', '.js', *IMAGE_FORMATS):
+            # Hashing may already have consumed the file.
+            content.seek(0)
+        if suffix in ('.css', '.js') and '.min.' not in name:
+            text = content.read().decode('utf-8')
+            text = minify_css(text) if suffix == '.css' else minify_js(text)
+            content = ContentFile(text.encode('utf-8'))
+        elif suffix in IMAGE_FORMATS:
+            content = ContentFile(optimize_image(content.read(), IMAGE_FORMATS[suffix]))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed):
+            if _suffix(hashed_name) in COMPRESSIBLE:
+                self.precompress(hashed_name)
+
+    def precompress(self, name):
+        """Write ``name.gz`` (and ``name.br``) next to ``name`` if it saves space."""
+        with self.open(name) as handle:
+            data = handle.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for extension, compressed in variants:
+            if len(compressed) < len(data):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                # Bypass _save's minify/optimize; these are already final bytes.
+                super()._save(name + extension, ContentFile(compressed))
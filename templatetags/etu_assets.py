@@ -0,0 +1,11 @@
+from django import template
+
+from eturesultapp.assets import asset_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name):
+    """URL of a vendored CSS/JS bundle, e.g. {% asset "bootstrap.css" %}."""
+    return asset_url(name)
@@ -0,0 +1,69 @@
+from django import template
+from django.conf import settings
+from django.template.base import NodeList
+from django.templatetags.cache import CacheNode
+
+from eturesultapp import metrics
+from eturesultapp.cache_versions import get_version
+
+register = template.Library()
+
+
+class _FragmentTimeout:
+    """Timeout expression for CacheNode read from ETU_FRAGMENT_CACHE_TIMEOUT."""
+
+    def resolve(self, context):
+        return getattr(settings, 'ETU_FRAGMENT_CACHE_TIMEOUT', 86400)
+
+
+class _FragmentBody(NodeList):
+    """A fragment's contents; CacheNode renders them only on a cache miss."""
+
+    def render(self, context):
+        context.render_context[self.fragment] = True
+        return super().render(context)
+
+
+class FragmentCacheNode(CacheNode):
+    """CacheNode that counts fragment cache hits and misses in ``metrics``."""
+
+    def render(self, context):
+        context.render_context[self] = False
+        value = super().render(context)
+        metrics.record_cache('fragment', hit=not context.render_context[self])
+        return value
+
+
+@register.simple_tag
+def data_version(scope, obj_id=0):
+    """Current version of a data scope, e.g. {% data_version "student_results" student.pk as v %}."""
+    return get_version(scope, obj_id if obj_id not in (None, '') else 0)
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """Cache a template fragment keyed on its name and vary-on values.
+
+    Usage::
+
+        {% fragment_cache name [vary_on ...] %} ... {% endfragment_cache %}
+
+    Works like ``{% cache %}`` without a timeout argument. Pass the relevant
+    ``data_version`` values as vary-on arguments; the timeout only bounds how
+    long unused entries occupy the cache.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least 1 argument.")
+    body = _FragmentBody(nodelist)
+    node = FragmentCacheNode(
+        body,
+        _FragmentTimeout(),
+        bits[1],
+        [parser.compile_filter(bit) for bit in bits[2:]],
+        None,
+    )
+    body.fragment = node
+    return node
@@ -1,8 +1,28 @@
-from django.test import TestCase
+import multiprocessing
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, modify_settings, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Student, Course, Result
+from .models import Student, Course, Result, Term
+
+
+def setUpModule():
+    # Metrics files written by any test, or at exit, go to a throwaway directory
+    import tempfile
+    global _metrics_dir, _metrics_override
+    _metrics_dir = tempfile.mkdtemp()
+    _metrics_override = override_settings(ETU_METRICS_DIR=_metrics_dir)
+    _metrics_override.enable()
+
+
+def tearDownModule():
+    import shutil
+    _metrics_override.disable()
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
 
 
 class ModelsTestCase(TestCase):
@@ -17,6 +37,37 @@ class ModelsTestCase(TestCase):
         self.assertEqual(str(s).split(' - ')[0], 'S001')
 
 
+class GradePointsTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(student_id='GP1', first_name='Grade', last_name='Points')
+        self.math = Course.objects.create(code='GP101', name='Math', credits=4)
+        self.lab = Course.objects.create(code='GP102', name='Lab', credits=2)
+
+    def test_columns_follow_every_write_path(self):
+        result = Result.objects.create(student=self.student, course=self.math, grade='A-', semester='2025-1')
+        self.assertEqual((result.grade_code, result.grade_points), (8, 3.7))
+        result.grade = 'B'
+        result.save()
+        self.assertEqual((result.grade_code, result.grade_points), (6, 3.0))
+        Result.objects.filter(pk=result.pk).update(grade='F')
+        self.assertEqual(Result.objects.values_list('grade_code', 'grade_points').get(), (0, 0.0))
+        Result.objects.bulk_create([Result(student=self.student, course=self.lab, grade='A+', semester='2025-2')])
+        self.assertEqual(Result.objects.get(course=self.lab).grade_points, 4.0)
+        self.assertEqual(list(Result.objects.order_by('-grade_code').values_list('grade', flat=True)), ['A+', 'F'])
+
+    def test_gpa_is_summed_in_sql(self):
+        from .views import semester_summary
+        Result.objects.create(student=self.student, course=self.math, grade='A', semester='2025-1')
+        Result.objects.create(student=self.student, course=self.lab, grade='C', semester='2025-2')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.student.calculate_gpa(), 3.33)
+        self.assertEqual(Student.objects.with_gpa().get().gpa, 3.33)
+        with self.assertNumQueries(1):
+            summary = semester_summary(self.student.results.all())
+        self.assertEqual(list(summary), ['2025-2', '2025-1'])
+        self.assertEqual(summary['2025-1'], {'total_courses': 1, 'total_points': 4.0, 'gpa': 4.0})
+
+
 class ViewsTestCase(TestCase):
     def setUp(self):
         self.student = Student.objects.create(student_id='S002', first_name='Jane', last_name='Smith')
@@ -304,4 +355,1652 @@ class ExportResultsEndpointTests(TestCase):
     def test_non_staff_cannot_export_all_results(self):
         self.client.login(username='viewer2', password='pw')
         resp = self.client.get(reverse('eturesultapp:export_results'))
-        self.assertEqual(resp.status_code, 403)
\ No newline at end of file
+        self.assertEqual(resp.status_code, 403)
+
+@skipUnless('replica' in settings.DATABASES, "requires a 'replica' database alias")
+@override_settings(
+    DATABASE_ROUTERS=['eturesultapp.routers.ReplicaRouter'],
+    ETU_READ_REPLICAS=['replica'],
+)
+@modify_settings(MIDDLEWARE={'append': 'eturesultapp.middleware.ReplicaRoutingMiddleware'})
+class ReplicaRoutingTests(TransactionTestCase):
+    # The runner sets up the databases of skipped classes too
+    databases = {alias for alias in ('default', 'replica') if alias in settings.DATABASES}
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        Student.objects.create(student_id='R001', first_name='Ada', last_name='Synced')
+        from .replication import sync_sqlite_replica
+        sync_sqlite_replica('replica')
+        # Written after the last sync, so only the primary has it
+        Student.objects.create(student_id='R002', first_name='Bea', last_name='Lagging')
+
+    def test_safe_reads_use_replica(self):
+        resp = self.client.get(reverse('eturesultapp:student_list'))
+        self.assertContains(resp, 'R001')
+        self.assertNotContains(resp, 'R002')
+
+    def test_replica_catches_up_after_sync(self):
+        from .replication import sync_sqlite_replica
+        sync_sqlite_replica('replica')
+        resp = self.client.get(reverse('eturesultapp:student_list'))
+        self.assertContains(resp, 'R002')
+
+    def test_reads_stick_to_primary_after_own_write(self):
+        from django.contrib.auth import get_user_model
+        get_user_model().objects.create_superuser(username='rw', email='rw@x.com', password='pw')
+        self.client.login(username='rw', password='pw')
+        data = {'student_id': 'R003', 'first_name': 'Cy', 'last_name': 'Fresh'}
+        resp = self.client.post(reverse('eturesultapp:student_create'), data)
+        self.assertIn(resp.status_code, (302, 303))
+        resp = self.client.get(reverse('eturesultapp:student_list'))
+        self.assertContains(resp, 'R003')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        from .routers import record_replica_lag
+        record_replica_lag('replica', 60)
+        resp = self.client.get(reverse('eturesultapp:student_list'))
+        self.assertContains(resp, 'R002')
+
+    def test_replica_without_heartbeat_falls_back_to_primary(self):
+        from django.core.cache import cache
+        cache.clear()
+        resp = self.client.get(reverse('eturesultapp:student_list'))
+        self.assertContains(resp, 'R002')
+
+    def test_writes_always_go_to_primary(self):
+        from .routers import ReplicaRouter, replica_reads
+        with replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_read(Student), 'replica')
+            self.assertEqual(ReplicaRouter().db_for_write(Student), 'default')
+
+
+class GradeDistributionTests(APITestCase):
+    def setUp(self):
+        self.s1 = Student.objects.create(student_id='G001', first_name='Ann', last_name='One', program='CS')
+        self.s2 = Student.objects.create(student_id='G002', first_name='Ben', last_name='Two', program='EE')
+        self.course = Course.objects.create(code='STAT1', name='Statistics', credits=3)
+
+    def cells(self):
+        from .models import GradeDistribution
+        return sorted(
+            GradeDistribution.objects.filter(count__gt=0)
+            .values_list('term__code', 'grade', 'program', 'count')
+        )
+
+    def test_cube_follows_result_writes(self):
+        r1 = Result.objects.create(student=self.s1, course=self.course, grade='A', semester='2025-1')
+        Result.objects.create(student=self.s2, course=self.course, grade='F', semester='2025-1')
+        self.assertEqual(self.cells(), [('2025-1', 'A', 'CS', 1), ('2025-1', 'F', 'EE', 1)])
+
+        r1.grade = 'B'
+        r1.save()
+        self.assertEqual(self.cells(), [('2025-1', 'B', 'CS', 1), ('2025-1', 'F', 'EE', 1)])
+
+        self.s1.program = 'SE'
+        self.s1.save()
+        self.assertEqual(self.cells(), [('2025-1', 'B', 'SE', 1), ('2025-1', 'F', 'EE', 1)])
+
+        r1.delete()
+        self.assertEqual(self.cells(), [('2025-1', 'F', 'EE', 1)])
+
+    def test_rebuild_matches_incremental_updates(self):
+        from .analytics import rebuild_grade_distribution
+        Result.objects.create(student=self.s1, course=self.course, grade='A', semester='2025-1')
+        Result.objects.create(student=self.s2, course=self.course, grade='A', semester='2025-1')
+        incremental = self.cells()
+        rebuild_grade_distribution()
+        self.assertEqual(self.cells(), incremental)
+
+    def test_course_stats_endpoint(self):
+        Result.objects.create(student=self.s1, course=self.course, grade='A', semester='2025-1')
+        Result.objects.create(student=self.s2, course=self.course, grade='F', semester='2025-1')
+        Result.objects.create(student=self.s2, course=self.course, grade='B', semester='2025-2')
+
+        response = self.client.get(f'/api/courses/{self.course.pk}/stats/', {'semester': '2025-1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['histogram']['A'], 1)
+        self.assertEqual(response.data['pass_rate'], 0.5)
+        self.assertEqual(response.data['mean_grade_points'], 2.0)
+
+        response = self.client.get(f'/api/courses/{self.course.pk}/stats/', {'program': 'EE'})
+        self.assertEqual(response.data['total'], 2)
+
+
+class ChangeFeedTests(APITestCase):
+    url = '/api/results/changes/'
+
+    def setUp(self):
+        self.student = Student.objects.create(student_id='C001', first_name='Cat', last_name='Feed')
+        self.course = Course.objects.create(code='CF101', name='Feeds', credits=3)
+
+    def test_feed_reports_creates_updates_and_deletes(self):
+        start = self.client.get(self.url).data['next_cursor']
+        result = Result.objects.create(student=self.student, course=self.course, grade='B', semester='2025-1')
+        result.grade = 'A'
+        result.save()
+
+        data = self.client.get(self.url, {'since': start}).data
+        self.assertEqual([(c['model'], c['action']) for c in data['results']], [('result', 'create'), ('result', 'update')])
+        self.assertEqual(data['results'][-1]['data']['grade'], 'A')
+
+        result_id = result.pk
+        result.delete()
+        data = self.client.get(self.url, {'since': data['next_cursor']}).data
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['results'][0]['id'], result_id)
+        self.assertEqual(data['results'][0]['action'], 'delete')
+        self.assertIsNone(data['results'][0]['data'])
+
+    def test_feed_pages_with_cursor(self):
+        for code in ('P1', 'P2', 'P3'):
+            Course.objects.create(code=code, name=code)
+        first = self.client.get(self.url, {'models': 'course', 'limit': 2}).data
+        self.assertTrue(first['has_more'])
+        second = self.client.get(self.url, {'models': 'course', 'since': first['next_cursor']}).data
+        self.assertFalse(second['has_more'])
+        codes = [c['data']['code'] for c in first['results'] + second['results']]
+        self.assertEqual(codes, ['CF101', 'P1', 'P2', 'P3'])
+
+    def test_unknown_model_is_rejected(self):
+        response = self.client.get(self.url, {'models': 'lecturer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compaction_keeps_latest_entry_per_object(self):
+        from django.core.management import call_command
+        from .models import ChangeLogEntry
+        result = Result.objects.create(student=self.student, course=self.course, grade='B', semester='2025-1')
+        for grade in ('B+', 'A-', 'A'):
+            result.grade = grade
+            result.save()
+        call_command('compact_change_log', stdout=StringIO())
+        entries = ChangeLogEntry.objects.filter(model='result')
+        self.assertEqual(entries.count(), 1)
+        self.assertEqual(entries.get().action, 'update')
+        self.assertEqual(ChangeLogEntry.objects.filter(model='student').count(), 1)
+
+
+class GradebookTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from .models import Lecturer
+        user = get_user_model().objects.create_user(username='gbl', email='gbl@x.com', password='pw')
+        self.course = Course.objects.create(code='GB101', name='Grading', credits=3, semester='2025-1')
+        Lecturer.objects.create(user=user, staff_id='GBL1', department='CS').courses.add(self.course)
+        self.s1 = Student.objects.create(student_id='GB1', first_name='One', last_name='A', program='CS')
+        self.s2 = Student.objects.create(student_id='GB2', first_name='Two', last_name='B', program='CS')
+        self.url = reverse('eturesultapp:course_gradebook', args=[self.course.pk]) + '?semester=2025-1'
+        self.client.login(username='gbl', password='pw')
+
+    def post_rows(self, rows):
+        data = {'student': [str(pk) for pk in rows]}
+        for pk, (grade, version) in rows.items():
+            data[f'grade_{pk}'] = grade
+            data[f'version_{pk}'] = version
+        return self.client.post(self.url, data)
+
+    def test_roster_and_results_load_in_two_queries(self):
+        from .gradebook import load_gradebook
+        result = Result.objects.create(student=self.s1, course=self.course, grade='B', semester='2025-1')
+        with self.assertNumQueries(2):
+            students, results = load_gradebook(self.course, result.term, program='CS')
+        self.assertEqual([s.student_id for s in students], ['GB1', 'GB2'])
+        self.assertEqual(results[self.s1.pk].grade, 'B')
+
+    def test_bulk_save_creates_and_updates(self):
+        from .analytics import course_stats
+        existing = Result.objects.create(student=self.s1, course=self.course, grade='B', semester='2025-1')
+        resp = self.post_rows({
+            self.s1.pk: ('A', existing.updated_at.isoformat()),
+            self.s2.pk: ('C', ''),
+        })
+        self.assertIn(resp.status_code, (302, 303))
+        grades = dict(Result.objects.filter(course=self.course).values_list('student__student_id', 'grade'))
+        self.assertEqual(grades, {'GB1': 'A', 'GB2': 'C'})
+        self.assertEqual(course_stats(self.course.pk)['histogram']['B'], 0)
+        self.assertEqual(course_stats(self.course.pk)['total'], 2)
+
+    def test_stale_version_is_rejected(self):
+        Result.objects.create(student=self.s1, course=self.course, grade='B', semester='2025-1')
+        self.post_rows({self.s1.pk: ('A', '2000-01-01T00:00:00+00:00')})
+        self.assertEqual(Result.objects.get(student=self.s1).grade, 'B')
+
+    def test_cell_filled_in_meanwhile_is_a_conflict(self):
+        from unittest import mock
+        from .gradebook import save_gradebook
+        from .models import Term
+        term = Term.objects.resolve('2025-1')
+        create = Result.objects.bulk_create
+
+        def other_grader_first(results, *args, **kwargs):
+            if not Result.objects.filter(student=self.s1).exists():
+                Result.objects.create(student=self.s1, course=self.course, grade='B', semester='2025-1')
+            return create(results, *args, **kwargs)
+
+        with mock.patch.object(Result.objects, 'bulk_create', side_effect=other_grader_first):
+            created, updated, conflicts = save_gradebook(self.course, term, {
+                self.s1.pk: {'grade': 'A', 'version': ''},
+                self.s2.pk: {'grade': 'C', 'version': ''},
+            })
+        self.assertEqual(conflicts, [self.s1.pk])
+        self.assertEqual([result.student_id for result in created], [self.s2.pk])
+        grades = dict(Result.objects.filter(course=self.course).values_list('student__student_id', 'grade'))
+        self.assertEqual(grades, {'GB1': 'B', 'GB2': 'C'})
+
+    def test_filter_form_has_every_cohort_field(self):
+        resp = self.client.get(self.url)
+        for field in ('program', 'department', 'faculty'):
+            self.assertContains(resp, f'name="{field}"')
+
+    def test_unassigned_lecturer_is_forbidden(self):
+        from django.contrib.auth import get_user_model
+        get_user_model().objects.create_user(username='gbx', password='pw')
+        self.client.login(username='gbx', password='pw')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        get_user_model().objects.create_superuser(username='ac', email='ac@x.com', password='pw')
+        self.client.login(username='ac', password='pw')
+        for i in range(30):
+            Student.objects.create(student_id=f'AC{i:03d}', first_name='Auto', last_name=f'Complete{i}')
+        self.course = Course.objects.create(code='AC101', name='Autocomplete', credits=3)
+
+    def test_student_endpoint_matches_prefix_and_caps_page(self):
+        data = self.client.get(reverse('eturesultapp:autocomplete_students'), {'q': 'AC00'}).json()
+        self.assertEqual([r['text'].split(' - ')[0] for r in data['results']], [f'AC00{i}' for i in range(10)])
+        data = self.client.get(reverse('eturesultapp:autocomplete_students'), {'q': 'AC'}).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['pagination']['more'])
+
+    def test_course_endpoint_matches_name(self):
+        data = self.client.get(reverse('eturesultapp:autocomplete_courses'), {'q': 'auto'}).json()
+        self.assertEqual(data['results'], [{'id': self.course.pk, 'text': str(self.course)}])
+
+    def test_result_form_renders_only_selected_options(self):
+        resp = self.client.get(reverse('eturesultapp:result_create'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotContains(resp, 'AC000')
+        self.assertContains(resp, 'data-autocomplete-url')
+
+        result = Result.objects.create(student=Student.objects.get(student_id='AC007'), course=self.course, grade='A', semester='2025-1')
+        resp = self.client.get(reverse('eturesultapp:result_edit', args=[result.pk]))
+        self.assertContains(resp, 'AC007')
+        self.assertNotContains(resp, 'AC008')
+
+    def test_invalid_choice_is_rerendered(self):
+        resp = self.client.post(reverse('eturesultapp:result_create'), {'student': 'abc', 'course': self.course.pk, 'grade': 'A'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['form'].errors['student'])
+
+    def test_name_search_is_case_insensitive_and_needs_permission(self):
+        from django.contrib.auth import get_user_model
+        data = self.client.get(reverse('eturesultapp:autocomplete_students'), {'q': 'complete1'}).json()
+        self.assertEqual(len(data['results']), 11)
+        get_user_model().objects.create_user(username='acstudent', password='pw')
+        self.client.login(username='acstudent', password='pw')
+        for name in ('autocomplete_students', 'autocomplete_courses', 'autocomplete_lecturers'):
+            self.assertEqual(self.client.get(reverse(f'eturesultapp:{name}'), {'q': 'A'}).status_code, 403)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.contrib.auth import get_user_model
+        cache.clear()
+        User = get_user_model()
+        User.objects.create_user(username='fcs', email='fcs@x.com', password='pw')
+        self.student = Student.objects.create(student_id='FC1', first_name='Frag', last_name='Ment', email='fcs@x.com')
+        self.course = Course.objects.create(code='FC101', name='Caching', credits=3)
+        self.client.login(username='fcs', password='pw')
+
+    def test_student_dashboard_served_from_cache_until_results_change(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('eturesultapp:dashboard_student')
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            resp = self.client.get(url)
+        self.assertLess(len(warm), len(cold))
+        self.assertContains(resp, 'No results posted yet')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+        resp = self.client.get(url)
+        self.assertContains(resp, 'FC101')
+        self.assertNotContains(resp, 'No results posted yet')
+
+    def test_versions_are_bumped_only_after_commit(self):
+        from .cache_versions import get_version
+        versions = lambda: (get_version('student_results', self.student.pk), get_version('courses'), get_version('site'))
+        before = versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+            self.course.save()
+            # A request reading now still sees the old rows, so it must not cache them under a new version
+            self.assertEqual(versions(), before)
+        self.assertTrue(all(after > old for after, old in zip(versions(), before)))
+
+    def test_lecturer_fragments_follow_course_assignment(self):
+        from django.contrib.auth import get_user_model
+        from .models import Lecturer
+        user = get_user_model().objects.create_user(username='fcl', email='fcl@x.com', password='pw')
+        lecturer = Lecturer.objects.create(user=user, staff_id='FCL1', department='CS')
+        self.client.login(username='fcl', password='pw')
+        url = reverse('eturesultapp:dashboard_lecturer')
+        self.assertContains(self.client.get(url), 'No courses assigned yet')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.lecturers.add(lecturer)
+        self.assertContains(self.client.get(url), 'FC101')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = 'Renamed Course'
+            self.course.save()
+        self.assertContains(self.client.get(url), 'Renamed Course')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.lecturers.clear()
+        self.assertContains(self.client.get(url), 'No courses assigned yet')
+
+
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        from . import assets
+        self.assets = assets
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        assets.is_vendored.cache_clear()
+        self.addCleanup(assets.is_vendored.cache_clear)
+
+    def test_asset_tag_falls_back_to_cdn_until_vendored(self):
+        from unittest import mock
+        from django.template import Context, Template
+        template = Template('{% load etu_assets %}{% asset "bootstrap.css" %}')
+        with mock.patch.object(self.assets, 'VENDOR_DIR', self.root):
+            self.assertEqual(template.render(Context()), self.assets.VENDOR_ASSETS['bootstrap.css'][0])
+            target = self.root / self.assets.VENDOR_ASSETS['bootstrap.css'][1]
+            target.parent.mkdir(parents=True)
+            target.write_text('body{}')
+            self.assets.is_vendored.cache_clear()
+            self.assertEqual(template.render(Context()), '/static/eturesultapp/vendor/bootstrap-5.1.3/bootstrap.min.css')
+
+    def test_source_map_comments_are_stripped(self):
+        self.assertEqual(self.assets.strip_source_map(b'a{}\n/*# sourceMappingURL=x.css.map */'), b'a{}')
+        self.assertEqual(self.assets.strip_source_map(b'f();\n//# sourceMappingURL=x.js.map'), b'f();')
+
+    def test_collectstatic_minifies_fingerprints_and_precompresses(self):
+        import json
+        from django.core.management import call_command
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'eturesultapp.storage.OptimizedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=self.root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        manifest = json.loads((self.root / 'staticfiles.json').read_text())['paths']
+        hashed = manifest['eturesultapp/css/dashboard.css']
+        self.assertNotEqual(hashed, 'eturesultapp/css/dashboard.css')
+        css = (self.root / hashed).read_text()
+        self.assertNotIn('/* Dashboard Styles */', css)
+        self.assertNotIn('\n', css)
+        self.assertTrue((self.root / (hashed + '.gz')).is_file())
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.admin = get_user_model().objects.create_superuser(username='asy', email='asy@x.com', password='pw')
+        self.client.login(username='asy', password='pw')
+        course = Course.objects.create(code='AS101', name='Async', credits=3)
+        for i in range(25):
+            student = Student.objects.create(student_id=f'AS{i:03d}', first_name='Async', last_name=f'S{i}')
+            Result.objects.create(student=student, course=course, grade='B', semester='2025-1')
+
+    def test_admin_dashboard_matches_sync_view(self):
+        sync = self.client.get(reverse('eturesultapp:dashboard_admin'))
+        resp = self.client.get(reverse('eturesultapp:async_dashboard_admin'))
+        self.assertEqual(resp.status_code, 200)
+        for key in ('total_students', 'total_courses', 'total_lecturers', 'total_results'):
+            value = sync.context[key]
+            self.assertEqual(resp.context[key], value() if callable(value) else value)
+        self.assertEqual(len(resp.context['recent_results']), 5)
+
+    def test_list_endpoints_match_drf_payload(self):
+        for name, params in (('student', {}), ('student', {'page': 2, 'search': 'async'}), ('result', {'search': 'AS00'})):
+            expected = self.client.get(f'/api/{name}s/', params).json()
+            data = self.client.get(reverse(f'eturesultapp:async_{name}_list'), params).json()
+            for link in ('next', 'previous'):
+                self.assertEqual(*(d[link] and d[link].split('?')[-1] for d in (data, expected)))
+                data.pop(link), expected.pop(link)
+            self.assertEqual(data, expected)
+        self.assertEqual(self.client.get(reverse('eturesultapp:async_student_list'), {'page': 9}).status_code, 404)
+
+    def test_list_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('eturesultapp:async_course_list')).status_code, 403)
+
+
+class AsyncGatherTests(TransactionTestCase):
+    def test_queries_run_on_separate_threads_outside_transactions(self):
+        import threading
+        from asgiref.sync import async_to_sync
+        from .async_views import gather
+        barrier = threading.Barrier(2, timeout=5)
+
+        def query():
+            # Only passes if both callables are running at the same time
+            barrier.wait()
+            return Student.objects.count()
+
+        self.assertEqual(async_to_sync(gather)(a=query, b=query), {'a': 0, 'b': 0})
+
+    def test_async_admin_dashboard_overlaps_its_queries(self):
+        import threading
+        import time
+        from unittest import mock
+        from django.contrib.auth import get_user_model
+        from django.db.backends.utils import CursorWrapper
+        get_user_model().objects.create_superuser(username='lat', email='lat@x.com', password='pw')
+        self.client.login(username='lat', password='pw')
+        spans = []
+        execute = CursorWrapper.execute
+
+        def slow_execute(cursor, sql, params=None):
+            started = time.perf_counter()
+            time.sleep(0.05)
+            try:
+                return execute(cursor, sql, params)
+            finally:
+                spans.append((threading.get_ident(), started, time.perf_counter()))
+
+        with mock.patch.object(CursorWrapper, 'execute', slow_execute):
+            resp = self.client.get(reverse('eturesultapp:async_dashboard_admin'))
+        self.assertEqual(resp.status_code, 200)
+        # Run one after another, no query would start before the previous one ended
+        overlapping = max(sum(s <= started < e for _, s, e in spans) for _, started, _ in spans)
+        self.assertGreater(overlapping, 1)
+        self.assertGreater(len({thread for thread, _, _ in spans}), 2)
+
+
+class FastSerializerTests(APITestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_user(username='fast', password='pw')
+        self.client.force_authenticate(user)
+        courses = [Course.objects.create(code=f'FS{i}', name=f'Fast “{i}” ', credits=i) for i in range(3)]
+        for i in range(12):
+            student = Student.objects.create(
+                student_id=f'FS{i:03d}', first_name='Zoë', last_name=f'Ñ{i}',
+                email=f'fs{i}@x.com' if i % 2 else None,
+            )
+            Result.objects.create(student=student, course=courses[i % 3], grade='A', semester='2025-1')
+
+    def test_output_is_byte_identical_to_drf(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+        from .serializers import FastListSerializer, ResultSerializer, StudentSerializer
+        for serializer_class, queryset in (
+            (ResultSerializer, Result.objects.select_related('student', 'course').order_by('-recorded_at')),
+            (StudentSerializer, Student.objects.order_by('student_id')),
+        ):
+            fast = FastListSerializer.for_class(serializer_class)
+            expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+            self.assertEqual(ORJSONRenderer().render(fast.data(fast.values(queryset))), expected)
+
+    def test_results_share_course_objects(self):
+        from .serializers import FastListSerializer, ResultSerializer
+        fast = FastListSerializer.for_class(ResultSerializer)
+        rows = fast.data(fast.values(Result.objects.order_by('id')))
+        self.assertIs(rows[0]['course'], rows[3]['course'])
+
+    def test_ndjson_streams_every_row(self):
+        import json
+        resp = self.client.get('/api/results/', {'format': 'ndjson', 'search': 'FS00'})
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])['student']['first_name'], 'Zoë')
+
+    def test_benchmark_command_reports_identical_output(self):
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('benchmark_serializers', rows=200, rounds=1, stdout=out)
+        self.assertIn('identical output: True', out.getvalue())
+        self.assertFalse(Result.objects.filter(course__code__startswith='BM').exists())
+
+
+class CohortRankTests(APITestCase):
+    def setUp(self):
+        import datetime
+        self.math = Course.objects.create(code='CR101', name='Ranked', credits=3)
+        self.lab = Course.objects.create(code='CR102', name='Ranked Lab', credits=1)
+        intake = datetime.date(2022, 9, 1)
+        self.students = {}
+        for sid, grades, program in (
+            ('CR0', ('A', 'A'), 'CS'), ('CR1', ('B', 'A'), 'CS'), ('CR2', ('B', 'A'), 'CS'), ('CR3', ('C', 'F'), 'EE'),
+        ):
+            student = Student.objects.create(
+                student_id=sid, first_name='Rank', last_name=sid, program=program,
+                department='Engineering', enrollment_date=intake,
+            )
+            Result.objects.create(student=student, course=self.math, grade=grades[0], semester='2025-1')
+            Result.objects.create(student=student, course=self.lab, grade=grades[1], semester='2025-1')
+            self.students[sid] = student
+        Student.objects.create(student_id='CR9', first_name='No', last_name='Grades', program='CS')
+
+    def test_refresh_ranks_each_cohort_in_one_pass(self):
+        from .models import CohortRank
+        from .ranking import refresh_cohort_ranks
+        self.assertEqual(refresh_cohort_ranks(), 4)
+        ranks = {rank.student.student_id: rank for rank in CohortRank.objects.select_related('student')}
+        self.assertEqual(ranks['CR1'].gpa, 3.25)
+        self.assertEqual((ranks['CR1'].program_rank, ranks['CR1'].program_dense_rank, ranks['CR1'].program_size), (2, 2, 3))
+        self.assertEqual(ranks['CR1'].program_percentile, 66.67)
+        self.assertEqual(ranks['CR3'].program_rank, 1)
+        self.assertEqual((ranks['CR3'].department_rank, ranks['CR3'].department_dense_rank), (4, 3))
+        self.assertIsNone(ranks['CR0'].faculty_rank)
+        self.assertEqual(ranks['CR0'].entry_year, 2022)
+
+    def test_grade_changes_mark_years_and_refresh_once(self):
+        from unittest import mock
+        from . import ranking
+        from .models import CohortRank, StaleRankYear
+        ranking.refresh_cohort_ranks()
+        self.assertFalse(StaleRankYear.objects.exists())
+        result = Result.objects.get(student=self.students['CR1'], course=self.math)
+        with mock.patch.object(ranking, 'refresh_cohort_ranks', wraps=ranking.refresh_cohort_ranks) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for grade in ('B', 'A-', 'A'):
+                    result.grade = grade
+                    result.save()
+                # Nothing is written, or locked, until the grade entry commits
+                self.assertFalse(StaleRankYear.objects.exists())
+            refresh.assert_not_called()
+            self.assertEqual(list(StaleRankYear.objects.values_list('entry_year', flat=True)), [2022])
+            self.assertEqual(CohortRank.objects.get(student=self.students['CR1']).department_rank, 2)
+
+            self.assertEqual(ranking.refresh_stale_ranks(), 4)
+            self.assertEqual(ranking.refresh_stale_ranks(), 0)
+        refresh.assert_called_once_with({2022})
+        self.assertFalse(StaleRankYear.objects.exists())
+        self.assertEqual(CohortRank.objects.get(student=self.students['CR1']).department_rank, 1)
+        self.assertEqual(CohortRank.objects.get(student=self.students['CR2']).department_rank, 3)
+
+    @override_settings(ETU_COHORT_RANKS_AUTO_REFRESH=True)
+    def test_auto_refresh_runs_on_commit(self):
+        from .models import CohortRank
+        from .ranking import refresh_cohort_ranks
+        refresh_cohort_ranks()
+        result = Result.objects.get(student=self.students['CR1'], course=self.math)
+        with self.captureOnCommitCallbacks(execute=True):
+            result.grade = 'A'
+            result.save()
+        self.assertEqual(CohortRank.objects.get(student=self.students['CR1']).department_rank, 1)
+
+    def test_api_and_dashboard_read_precomputed_rank(self):
+        from django.contrib.auth import get_user_model
+        from .ranking import refresh_cohort_ranks
+        refresh_cohort_ranks()
+        user = get_user_model().objects.create_user(username='cr0', email='cr0@x.com', password='pw')
+        self.students['CR0'].email = 'cr0@x.com'
+        self.students['CR0'].save()
+        self.client.force_authenticate(user)
+        data = self.client.get(f"/api/students/{self.students['CR0'].pk}/rank/").json()
+        self.assertEqual((data['program_rank'], data['program_percentile']), (1, 100.0))
+        missing = Student.objects.get(student_id='CR9')
+        self.assertEqual(self.client.get(f'/api/students/{missing.pk}/rank/').status_code, 404)
+
+        self.client.login(username='cr0', password='pw')
+        self.assertContains(self.client.get(reverse('eturesultapp:dashboard_student')), '<strong>1</strong> of 3')
+
+
+class AcademicStandingTests(TestCase):
+    def setUp(self):
+        self.courses = [Course.objects.create(code=f'AS{i}', name=f'Standing {i}', credits=4) for i in range(4)]
+        self.students = {}
+        for sid, grades in (('AS0', 'AAAA'), ('AS1', 'AAAF'), ('AS2', 'DDFF'), ('AS3', 'BBCC')):
+            student = Student.objects.create(student_id=sid, first_name='Standing', last_name=sid, program='CS')
+            for course, grade in zip(self.courses, grades):
+                Result.objects.create(student=student, course=course, grade=grade, semester='2025-2')
+            self.students[sid] = student
+        # An earlier term counts towards the cumulative GPA and credits only
+        Result.objects.create(student=self.students['AS3'], course=self.courses[0], grade='F', semester='2025-1')
+
+    def test_rules(self):
+        from .standing import DEFAULT_RULES, evaluate_student
+        rows = [(1, 'A', 1, 60), (2, 'A', 2, 12), (2, 'B', 3, 48)]
+        outcome = evaluate_student(rows, 2, DEFAULT_RULES)
+        self.assertEqual((outcome['standing'], outcome['term_gpa'], outcome['credits_earned']), ('good', 3.2, 120))
+        self.assertTrue(outcome['graduation_eligible'])
+        outcome = evaluate_student(rows[:2], 2, {**DEFAULT_RULES, 'deans_list_min_credits': 10})
+        self.assertEqual(outcome['standing'], 'deans_list')
+        self.assertFalse(outcome['graduation_eligible'])
+
+    def test_evaluate_term_writes_standings_and_reports_progress(self):
+        from .models import AcademicStanding
+        from .standing import evaluate_term
+        calls = []
+        total = evaluate_term(workers=1, partition_size=3, progress=lambda done, total, _: calls.append((done, total)))
+        self.assertEqual(total, 4)
+        self.assertEqual(calls, [(3, 4), (4, 4)])
+        standings = {row.student.student_id: row for row in AcademicStanding.objects.select_related('student')}
+        self.assertEqual(standings['AS0'].standing, 'deans_list')
+        self.assertEqual(standings['AS1'].standing, 'good')
+        self.assertEqual(standings['AS2'].standing, 'probation')
+        self.assertEqual((standings['AS3'].term_gpa, standings['AS3'].cumulative_gpa), (2.5, 2.0))
+        self.assertEqual(standings['AS3'].credits_earned, 16)
+
+        # Re-running replaces rather than duplicates
+        evaluate_term('2025-2', workers=1)
+        self.assertEqual(AcademicStanding.objects.filter(term__code='2025-2').count(), 4)
+
+    def test_command(self):
+        from django.core.management import call_command
+        from .models import AcademicStanding
+        out = StringIO()
+        call_command('evaluate_standing', '--term', '2025-1', '--workers', '1', stdout=out)
+        self.assertIn('Evaluated standing for 4 students in 2025-1', out.getvalue())
+        self.assertEqual(AcademicStanding.objects.get(student=self.students['AS3'], term__code='2025-1').standing, 'probation')
+
+    def test_partitions_keep_cohorts_together(self):
+        from .standing import partition_students
+        for sid, program in (('AS4', 'EE'), ('AS5', 'EE'), ('AS6', 'ME')):
+            self.students[sid] = Student.objects.create(student_id=sid, first_name='Standing', last_name=sid, program=program)
+        ids = lambda *sids: [self.students[sid].pk for sid in sids]
+        self.assertEqual(list(partition_students(size=3)), [ids('AS0', 'AS1', 'AS2'), ids('AS3'), ids('AS4', 'AS5', 'AS6')])
+        self.assertEqual(list(partition_students(size=5)), [ids('AS0', 'AS1', 'AS2', 'AS3'), ids('AS4', 'AS5', 'AS6')])
+
+
+@skipUnless(settings.DATABASES['default'].get('TEST', {}).get('NAME'), 'worker processes need a file-backed test database')
+@skipUnless(multiprocessing.get_start_method() == 'fork', 'workers must inherit the test database settings')
+class AcademicStandingPoolTests(TransactionTestCase):
+    def test_workers_match_single_process(self):
+        from .models import AcademicStanding
+        from .standing import evaluate_term
+        courses = [Course.objects.create(code=f'ASP{i}', name=f'Pool {i}', credits=4) for i in range(3)]
+        for i, grades in enumerate(('AAA', 'ABF', 'DDF', 'BCC', 'AAB', 'FFD')):
+            student = Student.objects.create(student_id=f'ASP{i}', first_name='Pool', last_name=str(i), program='CS EE ME'.split()[i % 3])
+            for course, grade in zip(courses, grades):
+                Result.objects.create(student=student, course=course, grade=grade, semester='2025-2')
+        fields = ('student_id', 'standing', 'term_gpa', 'cumulative_gpa', 'credits_earned')
+
+        self.assertEqual(evaluate_term('2025-2', workers=1, partition_size=2), 6)
+        single = sorted(AcademicStanding.objects.values_list(*fields))
+        self.assertEqual(evaluate_term('2025-2', workers=3, partition_size=2), 6)
+        self.assertEqual(sorted(AcademicStanding.objects.values_list(*fields)), single)
+        self.assertEqual(AcademicStanding.objects.count(), 6)
+
+
+class IdentityLookupTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.user = get_user_model().objects.create_user(username='ident', email='Ada.Lovelace@Example.com', password='pw')
+        self.student = Student.objects.create(student_id='ID1', first_name='Ada', last_name='Lovelace', email=' ADA.lovelace@example.COM ')
+
+    def test_student_email_is_stored_normalized(self):
+        self.assertEqual(self.student.email, 'ada.lovelace@example.com')
+        Student.objects.bulk_create([Student(student_id='ID2', first_name='B', last_name='C', email='Bulk@Example.com')])
+        self.assertEqual(Student.objects.get(student_id='ID2').email, 'bulk@example.com')
+        self.assertTrue(Student.objects.filter(email='BULK@example.com').exists())
+
+    def test_lookups_match_case_insensitively(self):
+        from . import identity
+        self.assertEqual(identity.student_for_user(self.user), self.student)
+        self.assertEqual(identity.user_for_email('ada.lovelace@EXAMPLE.com'), self.user)
+        self.assertEqual(identity.email_registered('ADA.LOVELACE@example.com'), (True, True))
+        self.assertEqual(identity.email_registered(''), (False, False))
+        self.assertTrue(identity.owns_student(self.user, self.student))
+
+        self.client.login(username='ident', password='pw')
+        self.assertEqual(self.client.get(reverse('eturesultapp:dashboard_student')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('eturesultapp:student_download', args=[self.student.pk])).status_code, 200)
+
+    def test_registration_rejects_email_in_other_case(self):
+        from .forms import StudentRegistrationForm
+        form = StudentRegistrationForm(data={
+            'username': 'ada2', 'student_id': 'ID9', 'first_name': 'Ada', 'last_name': 'L',
+            'email': 'ADA.LOVELACE@example.com', 'password1': 'Str0ng-pass-123', 'password2': 'Str0ng-pass-123',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('A student with this email already exists.', form.errors['email'])
+
+    @skipUnless(settings.DATABASES['default']['ENGINE'].endswith('sqlite3'), 'SQLite query plan')
+    def test_lookups_use_lower_email_indexes(self):
+        from django.db import connection
+        from . import identity
+        for queryset, index in (
+            (identity.students_with_email('X@y.com'), 'student_email_lower_idx'),
+            (identity.users_with_email('X@y.com'), 'auth_user_email_lower_idx'),
+        ):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertIn(index, plan)
+
+
+class RosterImportTests(TestCase):
+    ROSTER = (
+        'Student_ID,First_Name,Last_Name,Email,Program,Enrollment_Date\n'
+        'RI001,Grace,Hopper,Grace@Example.com,CS,2026-09-01\n'
+        'RI002,Alan,Turing,alan@example.com,CS,\n'
+        'RI003,Dup,Email,GRACE@example.com,CS,\n'
+        'EX1,Taken,Id,new@example.com,CS,\n'
+        'RI004,Taken,Email,Existing@Example.com,CS,\n'
+        'RI005,Bad,Row,not-an-email,CS,01/09/2026\n'
+    )
+
+    def setUp(self):
+        Student.objects.create(student_id='EX1', first_name='Ex', last_name='Isting', email='existing@example.com')
+
+    def read(self, text=None):
+        from .roster import read_roster
+        return read_roster(StringIO(text or self.ROSTER))
+
+    def test_validation_is_set_wise(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .roster import validate_roster
+        with CaptureQueriesContext(connection) as queries:
+            valid, errors = validate_roster(self.read())
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual([row['student_id'] for row in valid], ['RI001', 'RI002'])
+        self.assertEqual([line for line, _ in errors], [4, 5, 6, 7])
+        self.assertIn('appears more than once', errors[0][1])
+        self.assertIn('already registered', errors[1][1])
+        self.assertIn('already registered', errors[2][1])
+        self.assertIn('YYYY-MM-DD', errors[3][1])
+
+    def test_command_is_all_or_nothing_unless_skipping(self):
+        import tempfile
+        from django.core.management import CommandError, call_command
+        from .models import ChangeLogEntry, OutboundEmail
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.ROSTER)
+        with self.assertRaises(CommandError):
+            call_command('import_roster', handle.name, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Student.objects.count(), 1)
+
+        out = StringIO()
+        call_command('import_roster', handle.name, '--skip-invalid', '--base-url', 'https://results.example.edu', stdout=out, stderr=StringIO())
+        self.assertIn('Created 2 students', out.getvalue())
+        student = Student.objects.select_related('user').get(student_id='RI001')
+        self.assertEqual((student.email, student.user.username, student.user.email), ('grace@example.com', 'RI001', 'grace@example.com'))
+        self.assertFalse(student.user.is_active)
+        self.assertFalse(student.user.has_usable_password())
+        self.assertEqual(str(student.enrollment_date), '2026-09-01')
+        self.assertEqual(ChangeLogEntry.objects.filter(model='student', action='create', object_id=student.pk).count(), 1)
+        mail = OutboundEmail.objects.get(to='grace@example.com')
+        self.assertIn('https://results.example.edu/activate/', mail.body)
+
+    def test_staff_upload_then_activation_and_first_password(self):
+        import re
+        from django.contrib.auth import get_user_model
+        from django.core import mail
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.core.management import call_command
+        staff = get_user_model().objects.create_superuser('registrar', 'registrar@x.com', 'pw')
+        self.client.force_login(staff)
+        upload = SimpleUploadedFile('intake.csv', self.ROSTER.encode(), content_type='text/csv')
+        response = self.client.post(reverse('eturesultapp:student_import'), {'roster': upload, 'skip_invalid': '1'})
+        self.assertContains(response, 'Created 2 students')
+        self.assertContains(response, 'Rejected rows (4 of 6)')
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alan@example.com', 'grace@example.com'])
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+        self.client.logout()
+        body = next(message.body for message in mail.outbox if message.to == ['alan@example.com'])
+        link = re.search(r'https?://\S+', body).group()
+        response = self.client.get(link.split('testserver', 1)[1])
+        self.assertRedirects(response, reverse('eturesultapp:set_password'), fetch_redirect_response=False)
+        response = self.client.post(reverse('eturesultapp:set_password'), {'new_password1': 'Intake-2026-pw', 'new_password2': 'Intake-2026-pw'})
+        self.assertEqual(response.status_code, 302)
+        self.client.logout()
+        self.assertTrue(self.client.login(username='RI002', password='Intake-2026-pw'))
+
+    def test_senders_claim_disjoint_batches(self):
+        import datetime
+        from django.core import mail
+        from django.utils import timezone
+        from .models import OutboundEmail
+        from .outbox import claim, queue_mail, send_queued
+        queue_mail([(f'q{i}@example.com', 'Hello', 'Body') for i in range(5)])
+        first, second = claim(limit=3), claim(limit=3)
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertFalse({m.pk for m in first} & {m.pk for m in second})
+        self.assertEqual(send_queued(), (0, 0))
+
+        # A sender that died mid-batch leaves its claim to expire
+        OutboundEmail.objects.filter(pk=first[0].pk).update(claimed_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(send_queued(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, [first[0].to])
+        self.assertEqual(OutboundEmail.objects.get(pk=first[0].pk).claimed_by, '')
+
+
+@modify_settings(MIDDLEWARE={'append': 'eturesultapp.middleware.ProfilingMiddleware'})
+class ProfilingTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.contrib.auth import get_user_model
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(__import__('shutil').rmtree, self.profile_dir, True)
+        settings_override = override_settings(ETU_PROFILE_DIR=self.profile_dir, ETU_PROFILE_INTERVAL=0.001)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        User = get_user_model()
+        self.staff = User.objects.create_user('profiler', 'p@x.com', 'pw', is_staff=True)
+        self.plain = User.objects.create_user('plain', 'plain@x.com', 'pw')
+
+    def test_staff_header_profiles_request(self):
+        from . import profiling
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('eturesultapp:student_list'), HTTP_X_ETU_PROFILE='cprofile')
+        profile_id = response['X-ETU-Profile-Id']
+        document = profiling.load_profile(profile_id)
+        self.assertEqual((document['path'], document['status'], document['mode']), ('/students/', 200, 'cprofile'))
+        self.assertGreater(document['query_count'], 0)
+        self.assertTrue(document['functions'])
+
+        listing = self.client.get(reverse('eturesultapp:profile_list'))
+        self.assertContains(listing, reverse('eturesultapp:profile_detail', args=[profile_id]))
+        self.assertContains(self.client.get(reverse('eturesultapp:profile_detail', args=[profile_id])), 'Slowest SQL')
+        self.assertEqual(self.client.get(reverse('eturesultapp:profile_detail', args=['..etc'])).status_code, 404)
+
+    def test_header_ignored_for_non_staff_and_sampling(self):
+        import os
+        from . import profiling
+        self.client.force_login(self.plain)
+        response = self.client.get(reverse('eturesultapp:dashboard'), HTTP_X_ETU_PROFILE='sample')
+        self.assertNotIn('X-ETU-Profile-Id', response)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+        self.assertEqual(self.client.get(reverse('eturesultapp:profile_list')).status_code, 302)
+
+        with override_settings(ETU_PROFILE_SAMPLE_RATE=1, ETU_PROFILE_KEEP=2):
+            for _ in range(3):
+                self.client.get(reverse('eturesultapp:dashboard'))
+        self.assertEqual(len(profiling.list_profiles()), 2)
+        self.assertEqual(len(os.listdir(self.profile_dir)), 4)
+
+    def test_sampler_output_is_flame_graph_ready(self):
+        import time
+        from . import profiling
+        with profiling.Profile(profiling.SAMPLE) as profile:
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        folded = profiling.collapsed_stacks({'stacks': profile.stacks()})
+        self.assertIn('test_sampler_output_is_flame_graph_ready', folded)
+        stack, count = folded.splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(count.isdigit() and ';' in stack)
+
+
+class TermTests(APITestCase):
+    def test_spellings_share_one_dated_term(self):
+        from datetime import date
+        from .models import canonical_term_code
+        fall = Term.objects.resolve('Fall 2025')
+        self.assertEqual((fall.code, fall.name, fall.start_date, fall.end_date), ('2025-2', 'Fall 2025', date(2025, 8, 1), date(2025, 12, 31)))
+        for spelling in ('2025-2', '2025/2', 'fall 2025', '2025 Fall', 'Autumn Semester 2025'):
+            self.assertEqual(Term.objects.resolve(spelling), fall)
+        self.assertEqual(canonical_term_code('Spring 2026'), '2026-1')
+        odd = Term.objects.resolve('Summer school')
+        self.assertEqual((odd.code, odd.ordinal), ('Summer school', None))
+        self.assertIsNone(Term.objects.resolve('  '))
+        self.assertIsNone(Term.objects.find('2030-1'))
+
+    def test_terms_order_and_filter_chronologically(self):
+        course = Course.objects.create(code='TM101', name='Terms', credits=3, semester='Spring 2025')
+        self.assertEqual(course.semester, '2025-1')
+        student = Student.objects.create(student_id='TM1', first_name='Term', last_name='One')
+        for semester in ('2024-2', 'Spring 2025', '2025-2'):
+            Result.objects.create(student=student, course=course, grade='A', semester=semester)
+        spring = Term.objects.get(code='2025-1')
+        self.assertEqual(list(Term.objects.values_list('code', flat=True)), ['2024-2', '2025-1', '2025-2'])
+        self.assertEqual(Result.objects.filter(term__ordinal__lte=spring.ordinal).count(), 2)
+        self.assertEqual(spring.courses.get(), course)
+
+    def test_current_term_is_cached(self):
+        from .views import get_current_semester
+        Term.objects.clear_cache()
+        current = Term.objects.current()
+        self.assertEqual(current.code, get_current_semester())
+        with self.assertNumQueries(0):
+            self.assertEqual(Term.objects.current(), current)
+
+    def test_api_accepts_any_spelling(self):
+        from django.contrib.auth.models import User
+        user = User.objects.create_superuser('termadmin', 'termadmin@example.com', 'pw')
+        self.client.force_authenticate(user)
+        course = Course.objects.create(code='TM201', name='Terms', credits=3)
+        student = Student.objects.create(student_id='TM2', first_name='Term', last_name='Two')
+        response = self.client.post('/api/results/', {
+            'student_id': student.pk, 'course_id': course.pk, 'grade': 'B', 'semester': 'Fall 2025',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(response.json()['semester'], '2025-2')
+        self.assertEqual(Result.objects.get().term.code, '2025-2')
+        listed = self.client.get('/api/results/', {'search': 'Fall 2025'}).json()
+        rows = listed['results'] if isinstance(listed, dict) else listed
+        self.assertEqual([row['semester'] for row in rows], ['2025-2'])
+
+    def test_reading_and_rejected_writes_create_no_terms(self):
+        from django.contrib.auth.models import User
+        user = User.objects.create_superuser('termreader', 'termreader@example.com', 'pw')
+        course = Course.objects.create(code='TM301', name='Terms', credits=3)
+        student = Student.objects.create(student_id='TM3', first_name='Term', last_name='Three', is_active=True)
+        self.client.force_login(user)
+        url = reverse('eturesultapp:course_gradebook', args=[course.pk])
+        response = self.client.get(url, {'semester': 'garbage'})
+        self.assertContains(response, 'TM3')
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/results/', {
+            'student_id': student.pk, 'course_id': course.pk, 'grade': 'Z', 'semester': 'Fall 2031',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Term.objects.exists())
+
+        # The first saved grade creates the term
+        response = self.client.post(f'{url}?semester=Spring 2032', {'student': [student.pk], f'grade_{student.pk}': 'A'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Result.objects.get().term.code, '2032-1')
+
+
+@override_settings(ETU_API_CACHE_TIMEOUT=60)
+class APIResponseCacheTests(APITestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        cache.clear()
+        self.course = Course.objects.create(code='RC101', name='Cached', credits=3)
+        self.student = Student.objects.create(student_id='RC1', first_name='Cache', last_name='Student')
+        self.spring = Result.objects.create(student=self.student, course=self.course, grade='B', semester='2025-1')
+        self.admin = User.objects.create_superuser('cacheadmin', 'cacheadmin@example.com', 'pw')
+
+    def get(self, url, **params):
+        return self.client.get(url, params)
+
+    def test_hits_until_a_tagged_model_changes(self):
+        first = self.get('/api/courses/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/courses/')['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.last_name = 'Renamed'
+            self.student.save()
+        self.assertEqual(self.get('/api/courses/')['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/results/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/results/').json()['results'][0]['student']['last_name'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(code='RC102', name='New', credits=3)
+        response = self.get('/api/courses/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_semester_pages_expire_independently(self):
+        other = Course.objects.create(code='RC103', name='Other', credits=3)
+        self.assertEqual(self.get('/api/results/', semester='Spring 2025').json()['count'], 1)
+        self.get('/api/results/', semester='2025-1')
+        self.get('/api/results/', semester='2025-2')
+        self.get(f'/api/courses/{self.course.pk}/stats/', semester='2025-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.create(student=self.student, course=other, grade='A', semester='2025-2')
+        self.assertEqual(self.get('/api/results/', semester='2025-1')['X-Cache'], 'HIT')
+        self.assertEqual(self.get(f'/api/courses/{self.course.pk}/stats/', semester='2025-1')['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/results/', semester='2025-2').json()['count'], 1)
+
+        from .gradebook import save_gradebook
+        with self.captureOnCommitCallbacks(execute=True):
+            save_gradebook(self.course, self.spring.term, {self.student.pk: {
+                'grade': 'A', 'remarks': '', 'version': self.spring.updated_at.isoformat(),
+            }})
+        response = self.get(f'/api/courses/{self.course.pk}/stats/', semester='2025-1')
+        self.assertEqual((response['X-Cache'], response.json()['histogram']['A']), ('MISS', 1))
+        self.assertEqual(self.get(f'/api/results/{self.spring.pk}/').json()['grade'], 'A')
+
+    def test_scoped_by_permissions_and_counted(self):
+        self.get('/api/students/')
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.get('/api/students/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/students/')['X-Cache'], 'HIT')
+        stats = self.get(reverse('eturesultapp:api_cache_stats')).json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get(reverse('eturesultapp:api_cache_stats')).status_code, 403)
+
+    def test_hits_on_detail_routes_still_check_object_permissions(self):
+        from unittest import mock
+        from rest_framework.permissions import BasePermission
+        from .api import ResultViewSet
+
+        class OnlyGradeB(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.grade == 'B'
+
+        url = f'/api/results/{self.spring.pk}/'
+        with mock.patch.object(ResultViewSet, 'permission_classes', [OnlyGradeB]):
+            self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+            self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+            # A queryset update sends no signals, so the cached entry stays current
+            Result.objects.filter(pk=self.spring.pk).update(grade='C')
+            self.assertEqual(self.get(url).status_code, 403)
+
+
+@override_settings(AUTHENTICATION_BACKENDS=['eturesultapp.backends.CachedPermissionBackend'])
+class CachedPermissionBackendTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import Group, Permission, User
+        from django.core.cache import cache
+        cache.clear()
+        self.add_student = Permission.objects.get(codename='add_student')
+        self.registrars = Group.objects.create(name='Registrars')
+        self.registrars.permissions.add(self.add_student)
+        self.user = User.objects.create_user('registrar', password='pw')
+        self.user.groups.add(self.registrars)
+
+    def fresh_user(self):
+        from django.contrib.auth.models import User
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permission_sets_are_shared_across_requests(self):
+        self.assertTrue(self.fresh_user().has_perm('eturesultapp.add_student'))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('eturesultapp.add_student'))
+            self.assertFalse(user.has_perm('eturesultapp.delete_student'))
+
+        self.client.login(username='registrar', password='pw')
+        self.client.get(reverse('eturesultapp:student_create'))  # login saved the user, so refill once
+        with self.assertNumQueries(2):  # session and user only
+            self.assertEqual(self.client.get(reverse('eturesultapp:student_create')).status_code, 200)
+
+    def test_membership_and_group_changes_invalidate(self):
+        from django.contrib.auth.models import Group, Permission
+        from .cache_versions import get_version
+        self.assertTrue(self.fresh_user().has_perm('eturesultapp.add_student'))
+        before = get_version('permissions')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.registrars.permissions.remove(self.add_student)
+            # Versions move only on commit, so a concurrent read of the old rows isn't cached as current
+            self.assertEqual(get_version('permissions'), before)
+        self.assertNotEqual(get_version('permissions'), before)
+        self.assertFalse(self.fresh_user().has_perm('eturesultapp.add_student'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            editors = Group.objects.create(name='Editors')
+            editors.permissions.add(Permission.objects.get(codename='change_student'))
+            editors.user_set.add(self.user)
+        self.assertTrue(self.fresh_user().has_perm('eturesultapp.change_student'))
+        with self.captureOnCommitCallbacks(execute=True):
+            editors.user_set.clear()
+        self.assertFalse(self.fresh_user().has_perm('eturesultapp.change_student'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.add_student)
+        self.assertTrue(self.fresh_user().has_perm('eturesultapp.add_student'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertFalse(self.fresh_user().has_perm('eturesultapp.add_student'))
+
+
+@override_settings(ETU_PUSH_POLL_INTERVAL=0)
+class ResultPushTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.user = User.objects.create_user('pushed', password='pw')
+        self.course = Course.objects.create(code='PS101', name='Push', credits=3)
+        self.student = Student.objects.create(user=self.user, student_id='PS1', first_name='Push', last_name='Student')
+        self.other = Student.objects.create(student_id='PS2', first_name='Other', last_name='Student')
+
+    def test_publish_wakes_only_that_students_streams(self):
+        import asyncio
+        import threading
+        from asgiref.sync import async_to_sync
+        from .push import hub
+
+        async def woken():
+            mine, theirs = hub.subscribe(self.student.pk), hub.subscribe(self.other.pk)
+            thread = threading.Thread(target=hub.publish, args=([self.student.pk],))
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            hub.unsubscribe(self.student.pk, mine)
+            hub.unsubscribe(self.other.pk, theirs)
+            return mine.is_set(), theirs.is_set()
+
+        self.assertEqual(async_to_sync(woken)(), (True, False))
+        self.assertEqual(hub.student_ids(), set())
+
+    def test_single_and_bulk_writes_publish_after_commit(self):
+        from unittest import mock
+        from .push import hub
+        from .signals import results_bulk_saved
+        with mock.patch.object(hub, 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                result = Result.objects.create(student=self.student, course=self.course, grade='B', semester='2025-1')
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+            publish.assert_called_with({self.student.pk})
+
+            with self.captureOnCommitCallbacks(execute=True):
+                results_bulk_saved.send(sender=Result, changes=[(result, (self.course.pk, result.term_id, 'C', self.other.pk))])
+            publish.assert_called_with({self.student.pk, self.other.pk})
+
+    def test_change_log_follower_finds_students_written_elsewhere(self):
+        from .push import changed_students, latest_change
+        cursor = latest_change()
+        result = Result.objects.create(student=self.student, course=self.course, grade='B', semester='2025-1')
+        self.assertEqual(changed_students(cursor), ({self.student.pk}, latest_change()))
+        cursor = latest_change()
+        self.assertEqual(changed_students(cursor), (set(), cursor))
+        result.delete()
+        self.assertEqual(changed_students(cursor)[0], set())
+
+    async def test_stream_sends_the_new_version_when_a_result_is_saved(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from .cache_versions import get_version
+        from .push import hub
+
+        def record_result():
+            with self.captureOnCommitCallbacks(execute=True):
+                Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+            return get_version('student_results', self.student.pk)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('eturesultapp:result_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = asyncio.Queue()
+
+        async def read():
+            async for chunk in response.streaming_content:
+                chunks.put_nowait(chunk)
+
+        reader = asyncio.create_task(read())
+        self.assertIn(b'event: results', await asyncio.wait_for(chunks.get(), 5))
+        version = await sync_to_async(record_result)()
+        pushed = await asyncio.wait_for(chunks.get(), 5)
+        self.assertIn(f'"version": {version}'.encode(), pushed)
+        reader.cancel()  # the client went away
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(hub.student_ids(), set())
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('eturesultapp:result_events')).status_code, 204)
+
+    async def test_stream_needs_a_student(self):
+        from django.contrib.auth.models import User
+        url = reverse('eturesultapp:result_events')
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+        staff = await User.objects.acreate(username='pushstaff', email='pushstaff@example.com')
+        await self.async_client.aforce_login(staff)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        cache.clear()
+        self.user = get_user_model().objects.create_user('pager', password='pw')
+        self.client.force_login(self.user)
+        course = Course.objects.create(code='KP101', name='Keyset', credits=3)
+        students = Student.objects.bulk_create(
+            Student(student_id=f'KP{i:03d}', first_name='Key', last_name=f'Set{i}') for i in range(25)
+        )
+        Result.objects.bulk_create(Result(student=s, course=course, grade='B', semester='2025-1') for s in students)
+        # Ties on recorded_at must not drop or repeat rows at page boundaries
+        first = Result.objects.order_by('id')[:12].values('id')
+        Result.objects.filter(id__in=first).update(recorded_at=Result.objects.order_by('id').first().recorded_at)
+
+    def walk(self, url, direction='next_url', start=None):
+        pages, query = [], start or ''
+        while query is not None:
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, 200)
+            pages.append([obj.pk for obj in response.context['page_obj']])
+            query = getattr(response.context['page_obj'], direction)
+        return pages
+
+    def test_pages_cover_every_row_once_in_both_directions(self):
+        url = reverse('eturesultapp:result_list')
+        expected = list(Result.objects.order_by('-recorded_at', '-id').values_list('id', flat=True))
+        forward = self.walk(url)
+        self.assertEqual([len(page) for page in forward], [10, 10, 5])
+        self.assertEqual(sum(forward, []), expected)
+        backward = self.walk(url, 'previous_url', start='?last=1')
+        self.assertEqual(sum(backward[::-1], []), expected)
+
+    def test_deep_pages_run_no_count_or_offset(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('eturesultapp:student_list')
+        second = self.client.get(url).context['page_obj'].next_url
+        self.client.get(url + second)  # fills the approximate total
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + second)
+        self.assertEqual([s.student_id for s in response.context['students']][0], 'KP010')
+        self.assertEqual(response.context['approximate_total'], 25)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_cursor_keeps_search_and_rejects_garbage(self):
+        url = reverse('eturesultapp:student_list')
+        response = self.client.get(url, {'search': 'Set1'})
+        self.assertEqual(len(response.context['students']), 10)
+        self.assertIn('search=Set1', response.context['page_obj'].next_url)
+        self.assertEqual(len(self.client.get(url + response.context['page_obj'].next_url).context['students']), 1)
+        self.assertEqual(self.client.get(url, {'after': 'not-a-cursor'}).status_code, 404)
+
+
+class BackupRestoreTests(TransactionTestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.contrib.auth.models import User
+        from .models import Lecturer
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.course = Course.objects.create(code='BK101', name='Backup', credits=3, semester='2025-1')
+        user = User.objects.create_user('bkstudent', email='bk@example.com', password='pw')
+        self.student = Student.objects.create(user=user, student_id='BK1', first_name='Back', last_name='Up')
+        lecturer = Lecturer.objects.create(user=User.objects.create_user('bklecturer'), staff_id='BKL1', department='CS')
+        lecturer.courses.add(self.course)
+        User.objects.create_superuser('bkadmin', 'bkadmin@example.com', 'pw')  # not linked, not backed up
+        self.result = Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+
+    def snapshot(self):
+        from .models import Lecturer
+        return {
+            'results': list(Result.objects.values_list('id', 'student_id', 'course_id', 'term__code', 'grade', 'grade_points', 'recorded_at')),
+            'students': list(Student.objects.values_list('id', 'student_id', 'user__username', 'user__password')),
+            'teaching': list(Lecturer.objects.values_list('staff_id', 'courses__code', 'user__username')),
+        }
+
+    def test_round_trip_restores_rows_keys_and_timestamps(self):
+        from django.core.management import call_command
+        from .models import GradeDistribution
+        before = self.snapshot()
+        call_command('backup_results', self.directory, stdout=StringIO())
+        with self.assertRaisesMessage(Exception, 'already hold data'):
+            call_command('restore_results', self.directory, stdout=StringIO())
+
+        call_command('restore_results', self.directory, '--replace', stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(GradeDistribution.objects.get().count, 1)
+        # Sequences continue after the restored keys
+        Result.objects.create(student=self.student, course=Course.objects.create(code='BK102', name='Next', credits=3), grade='B')
+
+    def test_round_trip_keeps_memberships_and_publication_state(self):
+        from django.contrib.auth.models import Group, Permission, User
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from .models import Publication
+        lecturer = User.objects.get(username='bklecturer')
+        lecturer.groups.add(Group.objects.create(name='Backup lecturers'))
+        lecturer.user_permissions.add(Permission.objects.get(codename='view_result'))
+        Publication.objects.create(course=self.course, term=self.result.term, published_by=lecturer)
+        call_command('backup_results', self.directory, stdout=StringIO())
+
+        # Groups are matched by name, not by key
+        Group.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'Backup lecturers'):
+            call_command('restore_results', self.directory, '--replace', stdout=StringIO())
+        Group.objects.create(name='Unrelated')
+        Group.objects.create(name='Backup lecturers')
+        call_command('restore_results', self.directory, '--replace', stdout=StringIO())
+
+        lecturer = User.objects.get(username='bklecturer')
+        self.assertEqual(list(lecturer.groups.values_list('name', flat=True)), ['Backup lecturers'])
+        self.assertEqual(list(lecturer.user_permissions.values_list('codename', flat=True)), ['view_result'])
+        publication = Publication.objects.get()
+        self.assertFalse(publication.is_published)
+        self.assertEqual(publication.published_by, lecturer)
+
+    def test_damaged_file_is_refused_before_anything_changes(self):
+        import os
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        call_command('backup_results', self.directory, '--workers', '1', stdout=StringIO())
+        with open(os.path.join(self.directory, 'result.jsonl.gz'), 'ab') as f:
+            f.write(b'junk')
+        with self.assertRaisesMessage(CommandError, 'does not match its checksum'):
+            call_command('restore_results', self.directory, '--replace', stdout=StringIO())
+        self.assertTrue(Result.objects.filter(pk=self.result.pk).exists())
+
+
+@override_settings(ETU_STAGED_PUBLICATION=True, ETU_PUSH_POLL_INTERVAL=0)
+class PublicationTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.contrib.auth.models import User
+        cache.clear()
+        self.user = User.objects.create_user('staged', password='pw')
+        self.student = Student.objects.create(user=self.user, student_id='PB1', first_name='Staged', last_name='Student')
+        self.course = Course.objects.create(code='PB101', name='Publishing', credits=3)
+        self.client.login(username='staged', password='pw')
+
+    def test_drafts_stay_hidden_until_published(self):
+        from .cache_versions import get_version
+        from .models import Publication
+        from .publication import publish
+        Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+        draft = Publication.objects.get()
+        self.assertFalse(draft.is_published)
+        self.assertEqual(self.student.calculate_gpa(), 0.0)
+
+        dashboard = reverse('eturesultapp:dashboard_student')
+        download = reverse('eturesultapp:student_download', args=[self.student.pk])
+        self.assertNotContains(self.client.get(dashboard), 'PB101')
+        self.assertNotContains(self.client.get(download), 'PB101')
+        version = get_version('student_results', self.student.pk)
+        Result.objects.filter(student=self.student).get().save()
+        self.assertEqual(get_version('student_results', self.student.pk), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(publish([draft], user=self.user, workers=1), {self.student.pk})
+        draft.refresh_from_db()
+        self.assertEqual(draft.published_by, self.user)
+        self.assertContains(self.client.get(dashboard), 'PB101')
+        self.assertContains(self.client.get(download), 'PB101')
+        self.assertEqual(self.student.calculate_gpa(), 4.0)
+
+        # Published pairs take corrections straight away
+        Result.objects.filter(student=self.student).update(grade='B')
+        Result.objects.get().save()
+        self.assertEqual(Publication.objects.count(), 1)
+        self.assertGreater(get_version('student_results', self.student.pk), version)
+
+    @override_settings(ETU_API_CACHE_TIMEOUT=60)
+    def test_result_lists_hide_drafts_from_students(self):
+        from django.contrib.auth.models import User
+        from .models import Publication
+        from .publication import publish
+        Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+        staff = self.client_class()
+        staff.force_login(User.objects.create_user('pbstaff', is_staff=True))
+
+        self.assertNotContains(self.client.get(reverse('eturesultapp:result_list')), 'PB101')
+        self.assertEqual(self.client.get('/api/results/').json()['count'], 0)  # and cached for students
+        self.assertContains(staff.get(reverse('eturesultapp:result_list')), 'PB101')
+        self.assertEqual(staff.get('/api/results/').json()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(Publication.objects.all(), workers=1)
+        self.assertContains(self.client.get(reverse('eturesultapp:result_list')), 'PB101')
+        self.assertEqual(self.client.get('/api/results/').json()['count'], 1)
+
+    @override_settings(ETU_API_CACHE_TIMEOUT=60)
+    def test_course_stats_leave_drafts_out_for_students(self):
+        from django.contrib.auth.models import User
+        from .models import Publication
+        from .publication import publish
+        Result.objects.create(student=self.student, course=self.course, grade='F', semester='2025-1')
+        url = f'/api/courses/{self.course.pk}/stats/'
+        staff = self.client_class()
+        staff.force_login(User.objects.create_user('pbstats', is_staff=True))
+        self.assertEqual(staff.get(url).json()['histogram']['F'], 1)
+        self.assertEqual(self.client.get(url).json()['total'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(Publication.objects.all(), workers=1)
+        self.assertEqual(self.client.get(url).json()['histogram']['F'], 1)
+
+    def test_change_feed_hides_drafts_from_students(self):
+        from django.contrib.auth.models import User
+        start = self.client.get('/api/results/changes/').json()['next_cursor']
+        Result.objects.create(student=self.student, course=self.course, grade='F', semester='2025-1')
+        feed = self.client.get('/api/results/changes/', {'since': start, 'models': 'result'}).json()
+        self.assertEqual(feed['results'], [])
+        self.assertGreater(feed['next_cursor'], start)
+
+        staff = self.client_class()
+        staff.force_login(User.objects.create_user('pbfeed', is_staff=True))
+        feed = staff.get('/api/results/changes/', {'since': start, 'models': 'result'}).json()
+        self.assertEqual([change['data']['grade'] for change in feed['results']], ['F'])
+
+    def test_release_reaches_followers_in_other_processes(self):
+        from .cache_versions import get_version
+        from .models import Publication
+        from .publication import RELEASE_STEP, publish
+        from .push import changed_students, latest_change
+        Result.objects.create(student=self.student, course=self.course, grade='A', semester='2025-1')
+        version = get_version('student_results', self.student.pk)
+        cursor = latest_change()
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(Publication.objects.all(), workers=1)
+        # What the change-log follower of another worker process reads
+        self.assertEqual(changed_students(cursor)[0], {self.student.pk})
+        feed = self.client.get('/api/results/changes/', {'since': cursor}).json()
+        self.assertEqual([change['data']['grade'] for change in feed['results']], ['A'])
+        # The release's own entries do not push the student past the warmed copies
+        self.assertEqual(get_version('student_results', self.student.pk), version + RELEASE_STEP)
+
+    def test_publish_warms_the_dashboard_before_the_flip(self):
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        Result.objects.create(student=self.student, course=self.course, grade='B+', semester='2025-1')
+        url = reverse('eturesultapp:dashboard_student')
+        self.client.get(url)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('publish_results', '2025-1', '--workers', '1', stdout=out)
+        self.assertIn('Published PB101 for 1 students', out.getvalue())
+        with CaptureQueriesContext(connection) as warm:
+            resp = self.client.get(url)
+        self.assertContains(resp, 'PB101')
+        cache.clear()
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        self.assertLess(len(warm), len(cold))
+
+
+class ResultsSnapshotTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.course = Course.objects.create(code='SN101', name='Snapshots', credits=3)
+        self.first = Student.objects.create(student_id='SN1', first_name='Static', last_name='Page')
+        self.second = Student.objects.create(student_id='SN2', first_name='Other', last_name='Page')
+        self.result = Result.objects.create(student=self.first, course=self.course, grade='A', semester='2025-1')
+
+    def read(self, student, name):
+        import os
+        from .snapshot import token
+        with open(os.path.join(self.root, token(student.pk), name), encoding='utf-8-sig') as f:
+            return f.read()
+
+    def test_only_changed_students_are_rendered_again(self):
+        from django.core.management import call_command
+        from .snapshot import publish_snapshot, token
+        out = StringIO()
+        call_command('publish_results_snapshot', self.root, '--workers', '1', stdout=out)
+        self.assertIn('Snapshot of 2 students: 2 rendered, 0 removed', out.getvalue())
+        self.assertIn('SN101', self.read(self.first, 'index.html'))
+        self.assertIn('SN101,Snapshots,A', self.read(self.first, 'results.csv'))
+        self.assertNotIn('SN101', self.read(self.second, 'index.html'))
+        self.assertNotEqual(token(self.first.pk), token(self.second.pk))
+
+        self.assertEqual(publish_snapshot(self.root, workers=1).rendered, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.result.grade = 'C'
+            self.result.save()
+        report = publish_snapshot(self.root, workers=1)
+        self.assertEqual((report.rendered, report.removed), (1, 0))
+        self.assertIn('SN101,Snapshots,C', self.read(self.first, 'results.csv'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        report = publish_snapshot(self.root, workers=1)
+        self.assertEqual((report.students, report.rendered, report.removed), (1, 0, 1))
+        self.assertEqual(publish_snapshot(self.root, workers=1, force=True).rendered, 1)
+
+    @override_settings(ETU_SNAPSHOT_URL='https://results.example.edu/s/')
+    def test_dashboard_links_to_the_students_page(self):
+        from django.contrib.auth.models import User
+        from .snapshot import token
+        user = User.objects.create_user('snap', password='pw')
+        self.first.user = user
+        self.first.save()
+        self.client.login(username='snap', password='pw')
+        resp = self.client.get(reverse('eturesultapp:dashboard_student'))
+        self.assertContains(resp, f'https://results.example.edu/s/{token(self.first.pk)}/')
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@skipUnless(numpy is not None, 'requires NumPy')
+class ResultColumnsTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.math = Course.objects.create(code='CL101', name='Columns', credits=4)
+        self.lab = Course.objects.create(code='CL102', name='Lab', credits=2)
+        self.ada = Student.objects.create(student_id='CL1', first_name='Ada', last_name='L', program='CS')
+        self.bob = Student.objects.create(student_id='CL2', first_name='Bob', last_name='M', program='EE')
+        Result.objects.create(student=self.ada, course=self.math, grade='A', semester='2025-1')
+        Result.objects.create(student=self.ada, course=self.lab, grade='C', semester='2025-2')
+        self.bob_math = Result.objects.create(student=self.bob, course=self.math, grade='B', semester='2025-1')
+
+    def assertMatchesDatabase(self, columns):
+        from django.db.models import Count
+        expected = dict(Result.objects.values_list('grade').annotate(n=Count('id')).order_by())
+        self.assertEqual({grade: n for grade, n in columns.grade_counts().items() if n}, expected)
+        pks, gpas = columns.student_gpas()
+        self.assertEqual(
+            {pk: round(gpa, 2) for pk, gpa in zip(pks.tolist(), gpas.tolist())},
+            {student.pk: student.calculate_gpa() for student in Student.objects.filter(results__isnull=False).distinct()},
+        )
+
+    def test_incremental_build_matches_the_database(self):
+        from django.core.management import call_command
+        from .columnar import ResultColumns, build
+        out = StringIO()
+        call_command('build_result_columns', self.root, stdout=out)
+        self.assertIn('Full build: 3 results, 2 students', out.getvalue())
+        columns = ResultColumns(self.root)
+        self.assertMatchesDatabase(columns)
+        self.assertEqual(columns.grade_counts(course=self.math.pk, term='2025-1')['A'], 1)
+        self.assertEqual(columns.cohort_gpas('program'), {'CS': (1, (4.0 * 4 + 2.0 * 2) / 6), 'EE': (1, 3.0)})
+        self.assertEqual(columns.term_trend(course=self.math.pk), [('2025-1', 2, 3.5)])
+
+        self.bob_math.grade = 'A+'
+        self.bob_math.save()
+        Result.objects.filter(course=self.lab).delete()
+        Result.objects.create(student=self.bob, course=self.lab, grade='D', semester='2025-2')
+        meta = build(self.root)
+        self.assertTrue(meta['incremental'])
+        self.assertEqual(meta['rows'], 3)
+        self.assertMatchesDatabase(ResultColumns(self.root))
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'eturesultapp.middleware.MetricsMiddleware'})
+class MetricsTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from . import metrics
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(ETU_METRICS_DIR=self.directory, ETU_METRICS_TOKEN='scrape-me')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics.registry._reset()
+        self.addCleanup(metrics.registry._reset)
+        self.staff = User.objects.create_user('metrics', password='pw', is_staff=True)
+        user = User.objects.create_user('mstudent', password='pw')
+        Student.objects.create(user=user, student_id='MT1', first_name='Met', last_name='Rics')
+
+    def test_requests_queries_and_cache_lookups_are_exported(self):
+        self.client.login(username='mstudent', password='pw')
+        for _ in range(2):
+            self.client.get(reverse('eturesultapp:dashboard_student'))
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('eturesultapp:metrics')).status_code, 403)
+
+        resp = self.client.get(reverse('eturesultapp:metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(resp['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = resp.content.decode()
+        view = 'view="eturesultapp:dashboard_student"'
+        self.assertIn(f'etu_request_duration_seconds_count{{method="GET",{view}}} 2', body)
+        self.assertIn(f'etu_request_duration_seconds_bucket{{method="GET",{view},le="+Inf"}} 2', body)
+        self.assertIn(f'etu_requests_total{{method="GET",status="2xx",{view}}} 2', body)
+        self.assertIn(f'etu_db_queries_total{{{view}}}', body)
+        # The first dashboard renders every fragment, the second reads them all from the cache
+        self.assertIn('etu_cache_hit_ratio{cache="fragment"} 0.5', body)
+
+    def test_files_of_other_processes_are_added_up(self):
+        import json
+        import os
+        from django.core.management import call_command
+        from . import metrics
+        metrics.record_cache('api', True)
+        with metrics.timed_export('results_csv'):
+            pass
+        with open(os.path.join(self.directory, '99999-other.json'), 'w') as f:
+            json.dump({
+                'counters': [['etu_cache_requests_total', {'cache': 'api', 'result': 'hit'}, 3]],
+                'histograms': [['etu_export_duration_seconds', {'export': 'results_csv'}, {
+                    'buckets': list(metrics.EXPORT_BUCKETS), 'counts': [0] * 9 + [1], 'sum': 1000.0,
+                }]],
+            }, f)
+        self.client.login(username='metrics', password='pw')
+        body = self.client.get(reverse('eturesultapp:metrics')).content.decode()
+        self.assertIn('etu_cache_requests_total{cache="api",result="hit"} 4', body)
+        self.assertIn('etu_export_duration_seconds_bucket{export="results_csv",le="0.1"} 1', body)
+        self.assertIn('etu_export_duration_seconds_count{export="results_csv"} 2', body)
+
+        out = StringIO()
+        call_command('clear_metrics', stdout=out)
+        self.assertIn('Removed 2 metrics files', out.getvalue())
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @override_settings(ETU_METRICS_DIR=None)
+    def test_without_a_directory_only_this_process_is_reported(self):
+        import os
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from . import metrics
+        metrics.record_cache('api', True)
+        metrics.registry.flush(force=True)
+        self.client.login(username='metrics', password='pw')
+        body = self.client.get(reverse('eturesultapp:metrics')).content.decode()
+        self.assertIn('etu_cache_requests_total{cache="api",result="hit"} 1', body)
+        self.assertEqual(os.listdir(self.directory), [])
+        with self.assertRaisesMessage(CommandError, 'ETU_METRICS_DIR is not set'):
+            call_command('clear_metrics', stdout=StringIO())
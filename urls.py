@@ -1,7 +1,7 @@
 from django.urls import path, include
 from django.views.generic import RedirectView
 from rest_framework.routers import DefaultRouter
-from . import views, api
+from . import async_views, views, api
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -18,6 +18,11 @@ urlpatterns = [
     path('dashboard/admin/', views.admin_dashboard_view, name='dashboard_admin'),
     path('dashboard/lecturer/', views.lecturer_dashboard_view, name='dashboard_lecturer'),
     path('dashboard/student/', views.student_dashboard_view, name='dashboard_student'),
+    # Async (ASGI) variants that run independent dashboard queries concurrently
+    path('async/dashboard/', async_views.dashboard, name='async_dashboard'),
+    path('async/dashboard/admin/', async_views.admin_dashboard, name='async_dashboard_admin'),
+    path('async/dashboard/lecturer/', async_views.lecturer_dashboard, name='async_dashboard_lecturer'),
+    path('async/events/results/', async_views.result_events, name='result_events'),
     # Support legacy /dashboard/ URL by redirecting to the canonical dashboard at '/'
     path('dashboard/', RedirectView.as_view(pattern_name='eturesultapp:dashboard', permanent=False), name='dashboard_redirect'),
     
@@ -27,9 +32,15 @@ urlpatterns = [
     path('register/admin/', views.register_admin_view, name='register_admin'),
     path('register/complete/', views.registration_complete, name='registration_complete'),
     path('activate/<uidb64>/<token>/', views.activate_account, name='activate'),
+    path('activate/password/', views.InitialPasswordView.as_view(), name='set_password'),
     # Admin settings (edit / delete own admin account)
     path('admin/settings/', views.AdminSettingsUpdateView.as_view(), name='admin_settings'),
     path('admin/settings/delete/', views.AdminDeleteView.as_view(), name='admin_delete'),
+    # Request profiles captured by ProfilingMiddleware (staff only)
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/<str:profile_id>/', views.profile_detail, name='profile_detail'),
+    # Prometheus metrics aggregated over worker processes (staff or bearer token)
+    path('metrics/', views.metrics_view, name='metrics'),
     
     # Lecturers
     path('lecturers/', views.LecturerListView.as_view(), name='lecturer_list'),
@@ -41,6 +52,7 @@ urlpatterns = [
     # Students
     path('students/', views.StudentListView.as_view(), name='student_list'),
     path('students/add/', views.StudentCreateView.as_view(), name='student_create'),
+    path('students/import/', views.RosterImportView.as_view(), name='student_import'),
     path('students/<int:pk>/', views.StudentDetailView.as_view(), name='student_detail'),
     path('students/<int:pk>/edit/', views.StudentUpdateView.as_view(), name='student_edit'),
     path('students/<int:pk>/edit-self/', views.StudentSelfUpdateView.as_view(), name='student_edit_self'),
@@ -48,15 +60,25 @@ urlpatterns = [
     path('students/<int:pk>/download/', views.student_results_download, name='student_download'),
     path('export/results/', views.export_all_results, name='export_results'),
 
+    # Autocomplete (used by the search-as-you-type select widgets)
+    path('autocomplete/students/', views.autocomplete_students, name='autocomplete_students'),
+    path('autocomplete/courses/', views.autocomplete_courses, name='autocomplete_courses'),
+    path('autocomplete/lecturers/', views.autocomplete_lecturers, name='autocomplete_lecturers'),
+
     # API URLs
     path('', include(router.urls)),
+    path('api/cache-stats/', api.cache_stats, name='api_cache_stats'),
     path('api-auth/', include('rest_framework.urls')),
+    path('async/api/students/', async_views.student_list, name='async_student_list'),
+    path('async/api/courses/', async_views.course_list, name='async_course_list'),
+    path('async/api/results/', async_views.result_list, name='async_result_list'),
 
     # Courses
     path('courses/', views.CourseListView.as_view(), name='course_list'),
         path('courses/add/', views.CourseCreateView.as_view(), name='course_create'),
     path('courses/<int:pk>/edit/', views.CourseUpdateView.as_view(), name='course_edit'),
     path('courses/<int:pk>/delete/', views.CourseDeleteView.as_view(), name='course_delete'),
+    path('courses/<int:pk>/gradebook/', views.GradebookView.as_view(), name='course_gradebook'),
 
     # Results
     path('results/', views.ResultListView.as_view(), name='result_list'),
@@ -2,14 +2,22 @@ from django.views import generic
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q, Count
+from django.db.models import Q, Count, F, Prefetch, Sum
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.urls import reverse_lazy
 from datetime import datetime
-from . import models, forms
+from functools import partial
+from . import analytics, gradebook, identity, metrics, models, forms, profiling, publication, roster, routers
+from .pagination import KeysetPaginationMixin
+from .snapshot import snapshot_url
 from django.contrib.auth.views import LoginView
-from django.contrib.auth import login
+from django.contrib.auth import login, update_session_auth_hash
+from django.contrib.auth.forms import SetPasswordForm
+from django.utils.crypto import constant_time_compare
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
@@ -17,8 +25,11 @@ from django.template.loader import render_to_string
 from django.core.mail import send_mail
 from django.urls import reverse
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.core.cache import cache
+from .cache_versions import get_version
 import csv
+import io
 
 class SidebarContextMixin:
     """Mixin to add sidebar context to views."""
@@ -44,12 +55,11 @@ class DashboardView(LoginRequiredMixin, generic.View):
             lecturer = models.Lecturer.objects.get(user=request.user)
             return self.lecturer_dashboard(request, lecturer)
         except models.Lecturer.DoesNotExist:
-            try:
-                student = models.Student.objects.get(email=request.user.email)
+            student = identity.student_for_user(request.user)
+            if student is not None:
                 return self.student_dashboard(request, student)
-            except models.Student.DoesNotExist:
-                # Redirect to a default view if user type cannot be determined
-                return self.admin_dashboard(request)  # Show admin view as default
+            # Show admin view as default if user type cannot be determined
+            return self.admin_dashboard(request)
 
     def admin_dashboard(self, request):
         context = {
@@ -71,37 +81,7 @@ class DashboardView(LoginRequiredMixin, generic.View):
         return render(request, 'eturesultapp/lecturer_dashboard.html', context)
 
     def student_dashboard(self, request, student):
-        # Prefetch related course data to optimize queries
-        results = student.results.select_related('course').order_by('-recorded_at')
-        
-        # Calculate semester summary
-        semester_summary = {}
-        for result in results:
-            if result.semester not in semester_summary:
-                semester_summary[result.semester] = {
-                    'total_courses': 0,
-                    'total_points': 0,
-                    'gpa': 0.0
-                }
-            semester_summary[result.semester]['total_courses'] += 1
-            semester_summary[result.semester]['total_points'] += result.get_grade_points()
-        
-        # Calculate GPA for each semester
-        for semester in semester_summary:
-            total_courses = semester_summary[semester]['total_courses']
-            if total_courses > 0:
-                semester_summary[semester]['gpa'] = (
-                    semester_summary[semester]['total_points'] / total_courses
-                )
-
-        context = {
-            'student': student,
-            'results': results,
-            'semester_summary': semester_summary,
-            'total_courses': results.count(),
-            'recent_results': results[:5]  # Last 5 results
-        }
-        return render(request, 'eturesultapp/student_dashboard.html', context)
+        return render(request, 'eturesultapp/student_dashboard.html', student_dashboard_context(student))
 
 
 class CustomLoginView(LoginView):
@@ -126,9 +106,7 @@ class CustomLoginView(LoginView):
 
         # Student -> student dashboard (prefer user relation, fallback to email match)
         try:
-            if models.Student.objects.filter(user=user).exists():
-                return reverse_lazy('eturesultapp:dashboard_student')
-            if user.email and models.Student.objects.filter(email=user.email).exists():
+            if identity.student_for_user(user) is not None:
                 return reverse_lazy('eturesultapp:dashboard_student')
         except Exception:
             pass
@@ -181,14 +159,15 @@ def register_admin_view(request):
     return render(request, 'eturesultapp/register_admin.html', {'form': form})
 
 @login_required
+@metrics.timed_export('transcript_csv')
 def student_results_download(request, pk):
     """Allow a student to download their results as CSV. Staff can download any student's results."""
     # Ensure permission: student can download their own only, staff can download any
     student = get_object_or_404(models.Student, pk=pk)
 
-    # If user is not staff/superuser, ensure their email matches the student record
+    # If user is not staff/superuser, ensure this is their own student record
     if not (request.user.is_staff or request.user.is_superuser):
-        if request.user.email != (student.email or ''):
+        if not identity.owns_student(request.user, student):
             return HttpResponse('Forbidden', status=403)
 
     # Build CSV
@@ -198,21 +177,44 @@ def student_results_download(request, pk):
     filename = f"results_{student.student_id}.csv"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
-    writer = csv.writer(response)
-    # Header
+    response.write(transcript_header(student))
+    # Results section, cached until the student's published results change
+    key = transcript_cache_key(student.pk, get_version('student_results', student.pk))
+    rows = cache.get(key)
+    metrics.record_cache('transcript', rows is not None)
+    if rows is None:
+        rows = transcript_rows(student)
+        cache.set(key, rows, getattr(settings, 'ETU_FRAGMENT_CACHE_TIMEOUT', 86400))
+    response.write(rows)
+    return response
+
+
+def transcript_header(student):
+    """CSV text of the transcript's student block, followed by a blank row."""
+    out = io.StringIO()
+    writer = csv.writer(out)
     writer.writerow(['Student ID', 'Full Name', 'Program', 'Department', 'Faculty'])
     writer.writerow([student.student_id, f"{student.first_name} {student.last_name}", student.program or '', student.department or '', student.faculty or ''])
     writer.writerow([])
-    # Results header
-    writer.writerow(['Course Code', 'Course Name', 'Grade', 'Grade Points', 'Semester', 'Recorded At', 'Remarks'])
+    return out.getvalue()
 
-    for r in student.results.select_related('course').all():
-        writer.writerow([r.course.code, r.course.name, r.grade, r.get_grade_points(), r.semester, r.recorded_at.isoformat(), r.remarks])
 
-    return response
+def transcript_cache_key(student_pk, version):
+    return f'etu:transcript:{student_pk}:{version}'
+
+
+def transcript_rows(student, releasing=()):
+    """CSV text of the student's published results, with its header row."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Course Code', 'Course Name', 'Grade', 'Grade Points', 'Semester', 'Recorded At', 'Remarks'])
+    for r in student.results.published(releasing).select_related('course', 'term'):
+        writer.writerow([r.course.code, r.course.name, r.grade, r.get_grade_points(), r.semester, r.recorded_at.isoformat(), r.remarks])
+    return out.getvalue()
 
 
 @login_required
+@metrics.timed_export('results_csv')
 def export_all_results(request):
     # Only allow staff or users with view_result permission
     if not (request.user.is_staff or request.user.has_perm('eturesultapp.view_result')):
@@ -223,9 +225,11 @@ def export_all_results(request):
     response['Content-Disposition'] = 'attachment; filename="results_export.csv"'
     writer = csv.writer(response)
     writer.writerow(['Student ID', 'Student Name', 'Course Code', 'Course Name', 'Grade', 'Grade Points', 'Semester', 'Recorded At'])
-    qs = models.Result.objects.select_related('student', 'course').all().order_by('student__student_id')
-    for r in qs:
-        writer.writerow([r.student.student_id, f"{r.student.first_name} {r.student.last_name}", r.course.code, r.course.name, r.grade, r.get_grade_points(), r.semester, r.recorded_at.isoformat()])
+    qs = models.Result.objects.select_related('student', 'course', 'term').all().order_by('student__student_id')
+    # Exports don't need read-your-writes, so they may use a replica even for sticky sessions
+    with routers.replica_reads():
+        for r in qs:
+            writer.writerow([r.student.student_id, f"{r.student.first_name} {r.student.last_name}", r.course.code, r.course.name, r.grade, r.get_grade_points(), r.semester, r.recorded_at.isoformat()])
     return response
 
 
@@ -233,11 +237,13 @@ def admin_dashboard_view(request):
     """Public wrapper to render admin dashboard (used for direct redirects)."""
     if not request.user.is_authenticated or not request.user.is_superuser:
         return redirect('eturesultapp:dashboard')
+    # Counts are passed as callables so the cached dashboard fragment only
+    # runs them on a cache miss.
     context = {
-        'total_students': models.Student.objects.count(),
-        'total_courses': models.Course.objects.filter(is_active=True).count(),
-        'total_lecturers': models.Lecturer.objects.count(),
-        'total_results': models.Result.objects.count(),
+        'total_students': models.Student.objects.count,
+        'total_courses': models.Course.objects.filter(is_active=True).count,
+        'total_lecturers': models.Lecturer.objects.count,
+        'total_results': models.Result.objects.count,
         'recent_results': models.Result.objects.select_related('student', 'course').order_by('-recorded_at')[:5]
     }
     return render(request, 'eturesultapp/admin_dashboard.html', context)
@@ -360,18 +366,43 @@ def activate_account(request, uidb64, token):
             pass
         # Log the user in and redirect to role-specific dashboard
         login(request, user)
+        # Roster-imported accounts have no password yet
+        if not user.has_usable_password():
+            return redirect('eturesultapp:set_password')
         # Redirect based on role
         if user.is_superuser:
             return redirect('eturesultapp:dashboard_admin')
         if models.Lecturer.objects.filter(user=user).exists():
             return redirect('eturesultapp:dashboard_lecturer')
-        if models.Student.objects.filter(user=user).exists() or (user.email and models.Student.objects.filter(email=user.email).exists()):
+        if identity.student_for_user(user) is not None:
             return redirect('eturesultapp:dashboard_student')
         return redirect('eturesultapp:dashboard')
     else:
         return render(request, 'eturesultapp/activation_invalid.html')
 
 
+class InitialPasswordView(LoginRequiredMixin, generic.FormView):
+    """Let an activated account that has no password yet (roster import) choose one."""
+    template_name = 'eturesultapp/set_password.html'
+    form_class = SetPasswordForm
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and request.user.has_usable_password():
+            return redirect('eturesultapp:dashboard')
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        user = form.save()
+        update_session_auth_hash(self.request, user)
+        messages.success(self.request, 'Your password has been set.')
+        return redirect('eturesultapp:dashboard')
+
+
 def send_activation_email(request, user, to_email):
     """Helper to send activation email with tokenized link."""
     if not to_email:
@@ -399,11 +430,15 @@ def lecturer_dashboard_view(request):
         lecturer = models.Lecturer.objects.get(user=request.user)
     except models.Lecturer.DoesNotExist:
         return redirect('eturesultapp:dashboard')
+    courses = list(lecturer.courses.select_related('term'))
+    grade_stats = analytics.stats_for_courses([course.pk for course in courses])
     context = {
         'lecturer': lecturer,
         'total_students': models.Student.objects.count(),
         'total_courses': models.Course.objects.filter(is_active=True).count(),
-        'total_results': models.Result.objects.filter(course__in=lecturer.courses.all()).count()
+        # Graded-result totals come from the grade-distribution cube
+        'total_results': sum(stats['total'] for stats in grade_stats.values()),
+        'course_stats': [(course, grade_stats[course.pk]) for course in courses],
     }
     return render(request, 'eturesultapp/lecturer_dashboard.html', context)
 
@@ -411,20 +446,59 @@ def lecturer_dashboard_view(request):
 def student_dashboard_view(request):
     if not request.user.is_authenticated:
         return redirect('eturesultapp:dashboard')
-    try:
-        student = models.Student.objects.get(email=request.user.email)
-    except models.Student.DoesNotExist:
+    student = identity.student_for_user(request.user)
+    if student is None:
         return redirect('eturesultapp:dashboard')
-    context = {'student': student}
+    context = student_dashboard_context(student)
+    context['cohort_rank'] = models.CohortRank.objects.filter(student=student).first()
     return render(request, 'eturesultapp/student_dashboard.html', context)
 
 
-class LecturerListView(LoginRequiredMixin, PermissionRequiredMixin, generic.ListView):
+def student_dashboard_context(student, releasing=()):
+    """Context for the cached fragments of ``student_dashboard.html``: published results only.
+
+    Left unevaluated, so a cache hit runs none of the queries. ``releasing``
+    is passed on to ``Result.objects.published()``.
+    """
+    results = student.results.published(releasing).select_related('course', 'term').order_by('-recorded_at')
+    return {
+        'student': student,
+        'results': results,
+        'gpa': partial(student.calculate_gpa, results),
+        'semester_summary': partial(semester_summary, results),
+        'total_courses': results.count,
+        'recent_results': results[:5],
+        'snapshot_url': snapshot_url(student.pk),
+    }
+
+
+def semester_summary(results):
+    """Courses taken, grade points and average grade points per semester, newest first.
+
+    Summed in the database from the stored ``grade_points`` column.
+    """
+    rows = (
+        results.values('term__code')
+        .annotate(total_courses=Count('id'), total_points=Sum('grade_points'))
+        .order_by(F('term__ordinal').desc(nulls_last=True), '-term__code')
+    )
+    return {
+        row['term__code'] or '': {
+            'total_courses': row['total_courses'],
+            'total_points': round(row['total_points'], 2),
+            'gpa': row['total_points'] / row['total_courses'],
+        }
+        for row in rows
+    }
+
+
+class LecturerListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, generic.ListView):
     model = models.Lecturer
     permission_required = 'eturesultapp.view_lecturer'
     template_name = 'eturesultapp/lecturer_list.html'
     context_object_name = 'lecturers'
     paginate_by = 10
+    keyset_ordering = ('staff_id',)
 
     def get_queryset(self):
         queryset = super().get_queryset().select_related('user')
@@ -449,7 +523,7 @@ class LecturerCreateView(LoginRequiredMixin, PermissionRequiredMixin, generic.Cr
     model = models.Lecturer
     permission_required = 'eturesultapp.add_lecturer'
     template_name = 'eturesultapp/lecturer_form.html'
-    fields = ['staff_id', 'department', 'is_admin_assistant', 'courses']
+    form_class = forms.LecturerForm
     success_url = reverse_lazy('lecturer_list')
 
 
@@ -457,7 +531,7 @@ class LecturerUpdateView(LoginRequiredMixin, PermissionRequiredMixin, generic.Up
     model = models.Lecturer
     permission_required = 'eturesultapp.change_lecturer'
     template_name = 'eturesultapp/lecturer_form.html'
-    fields = ['staff_id', 'department', 'is_admin_assistant', 'courses']
+    form_class = forms.LecturerForm
     success_url = reverse_lazy('lecturer_list')
 
 
@@ -468,11 +542,12 @@ class LecturerDeleteView(LoginRequiredMixin, PermissionRequiredMixin, generic.De
     success_url = reverse_lazy('lecturer_list')
 
 
-class StudentListView(generic.ListView):
+class StudentListView(KeysetPaginationMixin, generic.ListView):
     model = models.Student
     template_name = 'eturesultapp/student_list.html'
     context_object_name = 'students'
     paginate_by = 10
+    keyset_ordering = ('student_id',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -489,6 +564,12 @@ class StudentDetailView(generic.DetailView):
     template_name = 'eturesultapp/student_detail.html'
     context_object_name = 'student'
 
+    def get_queryset(self):
+        results = models.Result.objects.select_related('course', 'term')
+        if not publication.sees_drafts(self.request.user):
+            results = results.published()
+        return models.Student.objects.prefetch_related(Prefetch('results', queryset=results))
+
 
 class StudentSelfUpdateView(LoginRequiredMixin, generic.UpdateView):
     """Allow a student to edit their own profile (program/department/faculty/email).
@@ -505,8 +586,8 @@ class StudentSelfUpdateView(LoginRequiredMixin, generic.UpdateView):
         if request.user.is_staff or request.user.has_perm('eturesultapp.change_student'):
             return super().dispatch(request, *args, **kwargs)
 
-        # For regular users, ensure the logged-in user's email matches the student record
-        if request.user.email and self.object.email and request.user.email.lower() == self.object.email.lower():
+        # Regular users may only edit their own record
+        if identity.owns_student(request.user, self.object):
             return super().dispatch(request, *args, **kwargs)
 
         return HttpResponse('Forbidden', status=403)
@@ -567,11 +648,12 @@ class CourseDeleteView(LoginRequiredMixin, PermissionRequiredMixin, SidebarConte
     success_url = '/courses/'
 
 
-class ResultListView(LoginRequiredMixin, SidebarContextMixin, generic.ListView):
+class ResultListView(LoginRequiredMixin, SidebarContextMixin, KeysetPaginationMixin, generic.ListView):
     model = models.Result
     template_name = 'eturesultapp/result_list.html'
     context_object_name = 'results'
     paginate_by = 10
+    keyset_ordering = ('-recorded_at', '-id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -583,11 +665,13 @@ class ResultListView(LoginRequiredMixin, SidebarContextMixin, generic.ListView):
                 models.Q(student__last_name__icontains=search) |
                 models.Q(course__code__icontains=search)
             )
+        if not publication.sees_drafts(self.request.user):
+            queryset = queryset.published()
         return queryset.select_related('student', 'course').order_by('-recorded_at')
 class ResultCreateView(LoginRequiredMixin, PermissionRequiredMixin, SidebarContextMixin, generic.CreateView):
     model = models.Result
     permission_required = 'eturesultapp.add_result'
-    fields = ['student', 'course', 'grade', 'semester']
+    form_class = forms.ResultForm
     template_name = 'eturesultapp/result_form.html'
     success_url = '/results/'
 
@@ -595,7 +679,7 @@ class ResultCreateView(LoginRequiredMixin, PermissionRequiredMixin, SidebarConte
 class ResultUpdateView(LoginRequiredMixin, PermissionRequiredMixin, SidebarContextMixin, generic.UpdateView):
     model = models.Result
     permission_required = 'eturesultapp.change_result'
-    fields = ['student', 'course', 'grade', 'semester']
+    form_class = forms.ResultForm
     template_name = 'eturesultapp/result_form.html'
     success_url = '/results/'
 
@@ -607,16 +691,155 @@ class ResultDeleteView(LoginRequiredMixin, PermissionRequiredMixin, SidebarConte
     success_url = '/results/'
 
 
+class GradebookView(LoginRequiredMixin, SidebarContextMixin, generic.TemplateView):
+    """Editable grid of every result for one course and semester, saved in one request."""
+    template_name = 'eturesultapp/gradebook.html'
+    cohort_fields = ('program', 'department', 'faculty')
+
+    def dispatch(self, request, *args, **kwargs):
+        self.course = get_object_or_404(models.Course, pk=kwargs['pk'])
+        self.semester = request.GET.get('semester', self.course.semester)
+        if request.user.is_authenticated and not self.can_grade(request.user):
+            return HttpResponse('Forbidden', status=403)
+        self.term = None
+        if request.user.is_authenticated:
+            # Only look the term up; save_gradebook creates it with its first result
+            self.term = models.Term.objects.find(self.semester) or (self.semester or '').strip() or None
+        return super().dispatch(request, *args, **kwargs)
+
+    def can_grade(self, user):
+        if user.has_perms(['eturesultapp.add_result', 'eturesultapp.change_result']):
+            return True
+        return models.Lecturer.objects.filter(user=user, courses=self.course).exists()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cohort = {field: self.request.GET.get(field, '') for field in self.cohort_fields}
+        students, results = gradebook.load_gradebook(self.course, self.term, **cohort)
+        context.update({
+            'course': self.course,
+            'semester': self.semester,
+            'cohort': cohort,
+            'grade_choices': models.Result.GRADE_CHOICES,
+            'rows': [
+                (student, results.get(student.pk), gradebook.version_token(results.get(student.pk)))
+                for student in students
+            ],
+            'conflicts': set(self.request.session.pop('gradebook_conflicts', [])),
+        })
+        return context
+
+    def post(self, request, *args, **kwargs):
+        rows = {}
+        for pk in request.POST.getlist('student'):
+            if not pk.isdigit():
+                continue
+            rows[int(pk)] = {
+                'grade': request.POST.get(f'grade_{pk}', ''),
+                'remarks': request.POST.get(f'remarks_{pk}', ''),
+                'version': request.POST.get(f'version_{pk}', ''),
+            }
+        created, updated, conflicts = gradebook.save_gradebook(self.course, self.term, rows)
+        messages.success(request, f'Saved {len(created)} new and {len(updated)} changed results.')
+        if conflicts:
+            request.session['gradebook_conflicts'] = conflicts
+            messages.warning(request, f'{len(conflicts)} rows were changed by someone else or were invalid and were not saved; they are highlighted below.')
+        return redirect(request.get_full_path())
+
+
+class RosterImportView(LoginRequiredMixin, PermissionRequiredMixin, SidebarContextMixin, generic.TemplateView):
+    """Upload an intake roster CSV and create its students' accounts in bulk."""
+    permission_required = 'eturesultapp.add_student'
+    template_name = 'eturesultapp/roster_import.html'
+
+    def post(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        upload = request.FILES.get('roster')
+        if upload is None:
+            messages.error(request, 'Choose a CSV file to import.')
+            return self.render_to_response(context)
+        try:
+            rows = roster.read_roster(upload.file)
+        except (ValueError, UnicodeDecodeError) as exc:
+            messages.error(request, f'Could not read the roster: {exc}')
+            return self.render_to_response(context)
+        report = roster.import_roster(
+            rows, base_url=request.build_absolute_uri('/'), skip_invalid=bool(request.POST.get('skip_invalid')),
+        )
+        if report.created:
+            messages.success(request, f'Created {report.created} students; activation emails are queued for delivery.')
+        elif report.errors:
+            messages.error(request, f'{len(report.errors)} of {report.rows} rows are invalid; nothing was imported.')
+        context['report'] = report
+        return self.render_to_response(context)
+
+
+AUTOCOMPLETE_LIMIT = 20
+
+
+def _prefix_match(queryset, column, term):
+    """Rows whose ``column`` starts with ``term``, as a range an index on ``column`` can scan.
+
+    ``column`` is a field name (case-sensitive) or a ``Lower(...)`` expression
+    matching one of the model's functional indexes (case-insensitive).
+    """
+    if isinstance(column, Lower):
+        term = term.lower()
+        queryset, column = queryset.alias(prefix_key=column), 'prefix_key'
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return queryset.filter(**{f'{column}__gte': term, f'{column}__lt': upper}).order_by().values('pk')
+
+
+def _autocomplete(request, queryset, columns, perms, label=str):
+    """Prefix-search ``queryset`` and answer in the Select2/admin autocomplete format.
+
+    Needs any one of ``perms``. Each column is searched on its own and the
+    matches are combined with UNION, so every search can use its index.
+    """
+    if not any(request.user.has_perm(f'eturesultapp.{perm}') for perm in perms):
+        return HttpResponse('Forbidden', status=403)
+    term = request.GET.get('q', '').strip()
+    if term:
+        matches = [_prefix_match(queryset.model.objects.all(), column, term) for column in columns]
+        queryset = queryset.filter(pk__in=matches[0].union(*matches[1:]))
+    page = list(queryset[:AUTOCOMPLETE_LIMIT + 1])
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': label(obj)} for obj in page[:AUTOCOMPLETE_LIMIT]],
+        'pagination': {'more': len(page) > AUTOCOMPLETE_LIMIT},
+    })
+
+
+@login_required
+def autocomplete_students(request):
+    queryset = models.Student.objects.only('student_id', 'first_name', 'last_name').order_by('student_id')
+    return _autocomplete(
+        request, queryset, ['student_id', Lower('last_name'), Lower('first_name')],
+        perms=['view_student', 'add_result', 'change_result'],
+    )
+
+
+@login_required
+def autocomplete_courses(request):
+    queryset = models.Course.objects.only('code', 'name').order_by('code')
+    return _autocomplete(
+        request, queryset, [Lower('code'), Lower('name')],
+        perms=['view_course', 'add_result', 'change_result', 'add_lecturer', 'change_lecturer'],
+    )
+
+
+@login_required
+def autocomplete_lecturers(request):
+    queryset = models.Lecturer.objects.select_related('user').order_by('staff_id')
+    # auth_user has no name indexes, but the lecturer table is small
+    return _autocomplete(
+        request, queryset, ['staff_id', Lower('user__last_name'), Lower('user__first_name')],
+        perms=['view_lecturer'],
+    )
+
+
 def get_current_semester():
-    current_date = timezone.now()
-    year = current_date.year
-    month = current_date.month
-    
-    if month >= 8:  # August onwards is Fall semester
-        semester = f"{year}-2"
-    else:  # January to July is Spring semester
-        semester = f"{year}-1"
-    return semester
+    # Computed from the date alone so async views can call it without a query
+    return models.term_code(*models.term_for_date(timezone.localdate()))
 
 
 class DashboardView(LoginRequiredMixin, SidebarContextMixin, generic.TemplateView):
@@ -638,13 +861,10 @@ class DashboardView(LoginRequiredMixin, SidebarContextMixin, generic.TemplateVie
         )
         
         # Get top performers (students with highest GPAs)
-        top_students = models.Student.objects.filter(is_active=True)
-        top_students = sorted(
-            [(student, student.calculate_gpa()) for student in top_students],
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-        context['top_performers'] = [student for student, _ in top_students]
+        context['top_performers'] = list(
+            models.Student.objects.filter(is_active=True).with_gpa()
+            .filter(gpa__isnull=False).order_by('-gpa', 'student_id')[:5]
+        )
         
         return context
 
@@ -686,3 +906,50 @@ class AdminDeleteView(LoginRequiredMixin, generic.DeleteView):
         # After deleting self, redirect to public home
         return reverse_lazy('eturesultapp:home')
 
+
+@staff_member_required
+def profile_list(request):
+    """Stored request profiles, slowest first (``?order=recent`` for newest)."""
+    order = 'recent' if request.GET.get('order') == 'recent' else 'slowest'
+    return render(request, 'eturesultapp/profile_list.html', {
+        'title': 'Request profiles',
+        'profiles': profiling.list_profiles(order=order),
+        'order': order,
+        'sample_rate': getattr(settings, 'ETU_PROFILE_SAMPLE_RATE', 0),
+        'header': getattr(settings, 'ETU_PROFILE_HEADER', 'X-ETU-Profile'),
+    })
+
+
+@staff_member_required
+def profile_detail(request, profile_id):
+    """One profile; ``?format=folded`` downloads collapsed stacks for a flame graph, ``?format=json`` the raw data."""
+    document = profiling.load_profile(profile_id)
+    if document is None:
+        raise Http404('No such profile')
+    export = request.GET.get('format')
+    if export == 'folded':
+        response = HttpResponse(profiling.collapsed_stacks(document), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{profile_id}.folded"'
+        return response
+    if export == 'json':
+        return JsonResponse(document)
+    stacks = sorted(document['stacks'].items(), key=lambda item: item[1], reverse=True)
+    samples = sum(count for _, count in stacks)
+    return render(request, 'eturesultapp/profile_detail.html', {
+        'title': f"{document['method']} {document['path']}",
+        'profile': document,
+        'hot_stacks': [(stack.split(';'), count, round(count * 100 / samples, 1)) for stack, count in stacks[:15]],
+        'samples': samples,
+    })
+
+
+def metrics_view(request):
+    """Prometheus text metrics of every worker process, for staff or ``Authorization: Bearer <ETU_METRICS_TOKEN>``."""
+    token = getattr(settings, 'ETU_METRICS_TOKEN', None)
+    scraper = bool(token) and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    if not (scraper or (request.user.is_authenticated and request.user.is_staff)):
+        return HttpResponse('Forbidden', status=403)
+    return HttpResponse(
+        metrics.render_prometheus(*metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+